@@ -1,6 +1,11 @@
 # tablet_volumes.py
 import pandas as pd
-import os
+import os, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+from volume_engine import (KNOWN_TRIADS, unit_liters, tablet_totals, commodity_matrix,
+                           triad_columns, normalize_ratios, match_triads)
 
 # --- Define unit volume assumptions (liters) ---
 UNIT_TO_LITERS = {
@@ -13,58 +18,27 @@ UNIT_TO_LITERS = {
     "unit?": 1            # unknown, keep minimal
 }
 
-# --- Known target triad ratios (grain:oil:wine) ---
-KNOWN_TRIADS = [
-    (12, 1, 6),   # storage/offering ratio
-    (10, 1, 5),   # ration variant
-]
-
 def load_data(file="tablet_totals.csv"):
     return pd.read_csv(file)
 
 def compute_volumes(df):
-    records = []
-    summaries = {}
-
-    for _, row in df.iterrows():
-        tablet = row["file"]
-        commodity = row["commodity"]
-        unit = row["unit"]
-        n = row["n"]
-
-        liters = n * UNIT_TO_LITERS.get(unit, 1)
-
-        records.append({
-            "file": tablet,
-            "commodity": commodity,
-            "unit": unit,
-            "count": n,
-            "liters": liters
-        })
-
-        if tablet not in summaries:
-            summaries[tablet] = {}
-        summaries[tablet].setdefault(commodity, 0)
-        summaries[tablet][commodity] += liters
-
-    return pd.DataFrame(records), summaries
-
-def normalize_ratio(values, precision=1):
-    """Normalize commodity liters into ratios (integers)."""
-    if not values or sum(values) == 0:
-        return None
-    base = min([v for v in values if v > 0])
-    return tuple(round(v / base, precision) for v in values)
-
-def detect_triad(grain, oil, wine):
-    """Check if ratio matches a known triad (approx)."""
-    if not (grain and oil and wine):
-        return None
-    ratio = normalize_ratio([grain, oil, wine])
-    for triad in KNOWN_TRIADS:
-        if all(abs(r - t) <= 1 for r, t in zip(ratio, triad)):
-            return triad
-    return None
+    vol = pd.DataFrame({
+        "file": df["file"],
+        "commodity": df["commodity"],
+        "unit": df["unit"],
+        "count": df["n"],
+        "liters": df["n"] * unit_liters(df["unit"], UNIT_TO_LITERS, default=1),
+    })
+    return vol, tablet_totals(vol, sort=False)
+
+def triad_report(totals):
+    """Per tablet: (matched triad or None, grain:oil:wine ratio); None where a commodity is missing."""
+    G = triad_columns(commodity_matrix(totals.reset_index(), sort=False))
+    ratios = normalize_ratios(G)
+    match = match_triads(ratios)
+    files = totals.index.get_level_values("file").unique()
+    return {f: (KNOWN_TRIADS[m] if m >= 0 else None, tuple(r.tolist()))
+            for f, g, r, m in zip(files, G, ratios, match) if (g > 0).all()}
 
 def write_outputs(df, summaries, outdir="out"):
     os.makedirs(outdir, exist_ok=True)
@@ -73,23 +47,19 @@ def write_outputs(df, summaries, outdir="out"):
     df.to_csv(os.path.join(outdir, "tablet_volumes.csv"), index=False)
 
     # --- Human-readable summaries ---
+    triads = triad_report(summaries)
     with open(os.path.join(outdir, "tablet_volumes.txt"), "w") as f:
-        for tablet, commodities in summaries.items():
+        for tablet, commodities in summaries.groupby(level="file", sort=False):
             f.write(f"Tablet {tablet} — volume totals:\n")
-            for comm, liters in commodities.items():
+            for (_, comm), liters in commodities.items():
                 f.write(f"  • {comm:10s} {liters:.1f} L\n")
 
             # Check triad ratios
-            grain = commodities.get("grain", 0)
-            oil = commodities.get("oil", 0)
-            wine = commodities.get("wineA", 0) + commodities.get("wineB", 0)
-
-            if grain > 0 and oil > 0 and wine > 0:
-                triad = detect_triad(grain, oil, wine)
+            if tablet in triads:
+                triad, norm = triads[tablet]
                 if triad:
                     f.write(f"    → Matches triad ratio {triad}\n")
                 else:
-                    norm = normalize_ratio([grain, oil, wine])
                     f.write(f"    → Grain:Oil:Wine ratio ≈ {norm}\n")
             f.write("\n")
 
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
+import argparse
 import pandas as pd
-from pathlib import Path
-import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
+from plotting import PlotQueue, add_plot_args
+
+def main(matrix_csv="out/tables/stem_ending_matrix.csv", out_png="out/plots/stem_clusters.png", plots=None):
+    from sklearn.decomposition import PCA
 
-def main(matrix_csv="out/tables/stem_ending_matrix.csv", out_png="out/plots/stem_clusters.png"):
     df = pd.read_csv(matrix_csv)
 
     # Keep stem column separate
@@ -15,21 +16,16 @@ def main(matrix_csv="out/tables/stem_ending_matrix.csv", out_png="out/plots/stem
     pca = PCA(n_components=2)
     coords = pca.fit_transform(X)
 
-    # Make plot
-    plt.figure(figsize=(8,6))
-    plt.scatter(coords[:,0], coords[:,1], c="blue")
-
-    for i, label in enumerate(stems):
-        plt.text(coords[i,0]+0.02, coords[i,1]+0.02, label, fontsize=8)
-
-    plt.title("Linear A Stems (PCA projection)")
-    plt.xlabel("PC1")
-    plt.ylabel("PC2")
-
-    out_path = Path(out_png)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path, dpi=300, bbox_inches="tight")
-    print(f"Wrote PCA plot to {out_path}")
+    # Queue plot
+    plots = plots or PlotQueue()
+    plots.add("scatter", out_png, dict(x=coords[:,0], y=coords[:,1], labels=list(stems)),
+              figsize=(8,6), color="blue", fontsize=8, dpi=300, bbox="tight",
+              title="Linear A Stems (PCA projection)", xlabel="PC1", ylabel="PC2")
+    plots.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="PCA projection of stems over their endings.")
+    ap.add_argument("-i","--matrix", default="out/tables/stem_ending_matrix.csv")
+    ap.add_argument("-o","--out", default="out/plots/stem_clusters.png")
+    a = add_plot_args(ap).parse_args()
+    main(a.matrix, a.out, PlotQueue.from_args(a))
\ No newline at end of file
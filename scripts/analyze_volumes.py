@@ -2,10 +2,10 @@
 import csv
 from pathlib import Path
 import numpy as np
+import argparse
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt
+from plotting import PlotQueue, add_plot_args
+from instrument import timed, current
 
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / "outputs"
@@ -16,18 +16,13 @@ RATIO_CSV = OUT / "volume_clusters.csv"
 SCATTER_PNG = OUT / "volume_clusters_scatter.png"
 DENDRO_PNG = OUT / "volume_clusters_dendrogram.png"  # left in case you want to add linkage later
 
-def main():
-    if not VOL_CSV.exists():
-        raise SystemExit(f"Missing {VOL_CSV}. Run compute_volumes_from_subs.py first.")
-
-    df = pd.read_csv(VOL_CSV)
-
+def ratio_frame(df):
+    """tablet_volumes rows -> (file, grain, oil, wine) liters per tablet."""
     # Keep only the three anchor commodities for ratios; everything else is ignored here
-    df["commodity_norm"] = df["commodity"].str.lower()
-    df["commodity_norm"] = df["commodity_norm"].replace({
+    df = df.assign(commodity_norm=df["commodity"].str.lower().replace({
         "winea": "wine",
         "wineb": "wine"
-    })
+    }))
 
     piv = (df[df["commodity_norm"].isin(["grain","oil","wine"])]
            .pivot_table(index="file", columns="commodity_norm", values="liters", aggfunc="sum"))
@@ -36,7 +31,29 @@ def main():
     for col in ["grain","oil","wine"]:
         if col not in piv.columns:
             piv[col] = 0.0
-    piv = piv[["grain","oil","wine"]].fillna(0.0)
+    return piv[["grain","oil","wine"]].fillna(0.0)
+
+def shares(liters):
+    """Row-normalize (n, 3) liters to shares; rows with total 0 stay 0."""
+    total = liters.sum(axis=1, keepdims=True)
+    return np.divide(liters, total, out=np.zeros_like(liters, dtype=float), where=total > 0)
+
+def cluster_ratios(X, k=2, sample_weight=None):
+    """KMeans on standardized ratios; k=2 (triadic vs grain-dominant previously worked)."""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    X_scaled = StandardScaler().fit_transform(X, sample_weight=sample_weight)
+    kmeans = KMeans(n_clusters=k, n_init="auto", random_state=42)
+    return kmeans.fit_predict(X_scaled, sample_weight=sample_weight)
+
+@timed()
+def main(plots=None):
+    if not VOL_CSV.exists():
+        raise SystemExit(f"Missing {VOL_CSV}. Run compute_volumes_from_subs.py first.")
+
+    vol = pd.read_csv(VOL_CSV)
+    st = current(); st.input(VOL_CSV); st.output(RATIO_CSV); st.rows_in = len(vol)
+    piv = ratio_frame(vol)
 
     # Drop tablets with total liters == 0 (avoid 0/0 -> NaN)
     totals = piv.sum(axis=1)
@@ -52,6 +69,7 @@ def main():
         ratio_df = ratio_df.drop(columns=["total"]).reset_index()
         ratio_df["cluster"] = 0
         ratio_df.to_csv(RATIO_CSV, index=False)
+        st.rows_out = len(ratio_df)
         print(f"✔ wrote {RATIO_CSV} (no clustering: not enough tablets)")
         return
 
@@ -62,34 +80,27 @@ def main():
         ratio_df[col] = ratio_df[col] / ratio_df["total"]
     ratio_df = ratio_df.drop(columns=["total"]).reset_index()  # columns: file, grain, oil, wine
 
-    # KMeans on standardized ratios; k=2 (triadic vs grain-dominant previously worked)
     X = ratio_df[["grain","oil","wine"]].values
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
     k = 2 if len(ratio_df) >= 2 else 1
-    kmeans = KMeans(n_clusters=k, n_init="auto", random_state=42)
-    ratio_df["cluster"] = kmeans.fit_predict(X_scaled) if k > 1 else 0
+    ratio_df["cluster"] = cluster_ratios(X, k) if k > 1 else 0
 
     # Write CSV
     ratio_df.to_csv(RATIO_CSV, index=False)
+    st.rows_out = len(ratio_df)
     print(f"✔ wrote {RATIO_CSV}")
 
     # Scatter (grain vs wine; point size ~ oil share)
-    plt.figure(figsize=(6,5))
-    plt.scatter(ratio_df["grain"], ratio_df["wine"], s=200*ratio_df["oil"]+30, alpha=0.8)
-    for _, row in ratio_df.iterrows():
-        plt.annotate(row["file"].replace(".txt",""), (row["grain"], row["wine"]), xytext=(3,3), textcoords="offset points")
-    plt.xlabel("Grain share")
-    plt.ylabel("Wine share")
-    plt.title("Tablet commodity share (size = Oil share)")
-    plt.grid(True, linestyle=":")
-    plt.tight_layout()
-    plt.savefig(SCATTER_PNG, dpi=150)
-    plt.close()
-    print(f"✔ saved {SCATTER_PNG}")
+    plots = plots or PlotQueue()
+    plots.add("scatter", SCATTER_PNG,
+              dict(x=ratio_df["grain"], y=ratio_df["wine"], s=200*ratio_df["oil"]+30,
+                   labels=list(ratio_df["file"].str.replace(".txt","", regex=False))),
+              figsize=(6,5), alpha=0.8, label_offset=(3,3), offset_points=True, fontsize=10,
+              grid=":", tight_layout=True, dpi=150,
+              title="Tablet commodity share (size = Oil share)", xlabel="Grain share", ylabel="Wine share")
+    plots.close()
 
     # (Optional) Dendrogram placeholder: not computing linkage here; keep file absent by default.
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Grain/oil/wine shares per tablet, KMeans clusters and scatter.")
+    main(PlotQueue.from_args(add_plot_args(ap).parse_args()))
\ No newline at end of file
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 import re, csv, argparse
 from pathlib import Path
+from sign_matcher import SignMatcher
+from streaming import write_csv_stream
+from instrument import timed, current
 
 # --- Patterns (same conventions as your other scripts) ---
 AB    = re.compile(r"\bAB\d{1,3}\b", re.I)
@@ -66,53 +69,62 @@ def last_number(tokens):
             return tokens, None
     return tokens, None
 
-def annotate_dir(indir: Path, out_csv: Path, min_stem_len=1):
-    rows = []
+def link_matcher(links=("AB22",)):
+    """Automaton over the link sign(s) that separate stem and ending."""
+    return SignMatcher.from_patterns(links, kind="link")
+
+LEDGER_FIELDS = ["file","line_label","segment_index","stem","ending","number","example"]
+
+def annotate_line(fname, raw, matcher, min_stem_len=1):
+    """Yield ledger rows for one raw line."""
+    label, tail = split_label_and_tail(raw)
+    toks = tokenize_tail(tail)
+    if not toks:
+        return
+    toks_wo_num, trailing_num = last_number(toks)
+    segs = parse_line_to_segments(toks_wo_num)
+
+    # For each segment, find [STEM] LINK [ENDING]
+    for si, seg in enumerate(segs, start=1):
+        # one pass over the segment finds every link occurrence
+        for m in matcher.longest(seg):
+            i = m.start
+            stem = seg[:i] if i >= min_stem_len else []
+            ending = seg[m.end] if m.end < len(seg) else ""
+            if stem and ending:
+                yield {
+                    "file": fname,
+                    "line_label": label,
+                    "segment_index": si,
+                    "stem": " ".join(stem),
+                    "ending": ending,
+                    "number": trailing_num if trailing_num is not None else "",
+                    "example": f"{' '.join(stem)} {' '.join(m.pattern)} {ending}" + (f" {trailing_num}" if trailing_num is not None else "")
+                }
+
+def iter_annotations(indir: Path, min_stem_len=1, links=("AB22",)):
+    """Stream ledger rows file by file, line by line."""
+    matcher = link_matcher(links)
     for f in sorted(indir.glob("*.txt")):
-        for raw in f.read_text(encoding="utf-8").splitlines():
-            label, tail = split_label_and_tail(raw)
-            toks = tokenize_tail(tail)
-            if not toks:
-                continue
-            toks_wo_num, trailing_num = last_number(toks)
-            segs = parse_line_to_segments(toks_wo_num)
+        with f.open(encoding="utf-8") as fh:
+            for raw in fh:
+                yield from annotate_line(f.name, raw.rstrip("\n"), matcher, min_stem_len)
 
-            # For each segment, find [STEM] AB22 [ENDING]
-            for si, seg in enumerate(segs, start=1):
-                # scan for AB22 in the segment
-                for i, tok in enumerate(seg):
-                    if tok == "AB22":
-                        stem = seg[:i] if i >= min_stem_len else []
-                        ending = seg[i+1] if i + 1 < len(seg) else ""
-                        if stem and ending:
-                            rows.append({
-                                "file": f.name,
-                                "line_label": label,
-                                "segment_index": si,
-                                "stem": " ".join(stem),
-                                "ending": ending,
-                                "number": trailing_num if trailing_num is not None else "",
-                                "example": f"{' '.join(stem)} AB22 {ending}" + (f" {trailing_num}" if trailing_num is not None else "")
-                            })
-                        # continue scanning in case there are multiple AB22s
-    # write CSV
-    out_csv.parent.mkdir(parents=True, exist_ok=True)
-    with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=[
-            "file","line_label","segment_index","stem","ending","number","example"
-        ])
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+@timed()
+def annotate_dir(indir: Path, out_csv: Path, min_stem_len=1, links=("AB22",)):
+    """Write the ledger CSV in chunks; returns the row count."""
+    current().input(indir); current().output(out_csv)
+    return write_csv_stream(out_csv, LEDGER_FIELDS, iter_annotations(indir, min_stem_len, links))
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Annotate [STEM] AB22 [UNIT] NUMBER patterns into a ledger CSV.")
     ap.add_argument("-d", "--dir", required=True, help="Input folder (e.g., data/clean)")
     ap.add_argument("-o", "--out", default="out/tables/annotated_ledger.csv")
     ap.add_argument("--min-stem-len", type=int, default=1, help="Minimum tokens before AB22 to accept as stem")
+    ap.add_argument("--link", action="append", default=None, help='Link sign(s) between stem and ending (repeatable; default "AB22")')
     args = ap.parse_args()
 
     indir = Path(args.dir)
     out_csv = Path(args.out)
-    annotate_dir(indir, out_csv, min_stem_len=args.min_stem_len)
+    annotate_dir(indir, out_csv, min_stem_len=args.min_stem_len, links=args.link or ("AB22",))
     print(f"Wrote {out_csv}")
\ No newline at end of file
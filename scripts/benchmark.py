@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark of the core stages on synthetic corpora (synth_corpus.py).
+
+  stats         la_stats.analyze + write_out (not run by default, see below)
+  segmentation  words_from_segments.read_segments over every tablet
+  annotation    annotate_ledger.annotate_dir
+  cooccurrence  cooccurrence_full.main
+  bundles       bundle_analysis.main -> build_bundle_matrix.main -> cluster_bundles.pca_kmeans
+  volumes       streaming.run (parse -> annotate -> substitute -> liters)
+  rendering     render_translations.main + build_publications.main (force, into the work dir)
+
+Every stage runs once on data/clean first (imports, caches), then --repeat
+times per scale; the best wall time is kept. Results go to
+out/bench/benchmark.csv. Each stage is compared with the committed baseline
+(data/benchmark_baseline.json): a stage more than --tolerance times and
+--min-delta seconds slower is flagged '!'. The table also prints the growth
+exponent between scales (1.0 = linear in lines). Baseline timings are
+machine-specific; re-save them on the machine that runs the comparison.
+
+`stats` is left out of the default stages and the baseline: la_stats skips
+"Line N:" rows as labels, and every synthetic line is one, so it would time
+a no-op (0 rows). Pass --stages stats to run it anyway.
+
+  python3 scripts/benchmark.py                          # 10×, 100×, 1000×
+  python3 scripts/benchmark.py --scales 10 100 --stages annotation volumes
+  python3 scripts/benchmark.py --save-baseline          # after an intended change
+  python3 scripts/benchmark.py --fail                   # exit 1 on a regression
+"""
+import os, io, sys, json, time, math, argparse, platform, tracemalloc
+from pathlib import Path
+from contextlib import contextmanager, redirect_stdout
+
+os.environ.setdefault("LINA_METRICS", "")      # keep stage instrumentation out of outputs/metrics.jsonl
+
+import pandas as pd
+from synth_corpus import Sampler, write_corpus
+import la_stats, words_from_segments, annotate_ledger, cooccurrence_full
+import bundle_analysis, build_bundle_matrix, cluster_bundles, streaming
+import render_translations, build_publications
+
+ROOT = Path(__file__).resolve().parents[1]
+BASELINE = ROOT / "data" / "benchmark_baseline.json"
+BENCH = Path("out/bench")
+
+@contextmanager
+def patched(module, **attrs):
+    """Point a script's module-level paths somewhere else for one call."""
+    old = {k: getattr(module, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(module, k, v)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            setattr(module, k, v)
+
+# stage(corpus dir, work dir) -> rows processed
+def stage_stats(corpus, work):
+    res = la_stats.analyze(corpus)
+    la_stats.write_out(res, work / "stats")
+    return sum(res["freqs"].values()) + sum(res["bigr"].values())
+
+def stage_segmentation(corpus, work):
+    return sum(len(words_from_segments.read_segments(f)) for f in sorted(corpus.glob("*.txt")))
+
+def stage_annotation(corpus, work):
+    return annotate_ledger.annotate_dir(corpus, work / "annotated_ledger.csv")
+
+def stage_cooccurrence(corpus, work):
+    cooccurrence_full.main(str(corpus), work / "cooccurrence_full.csv")
+    return len(pd.read_csv(work / "cooccurrence_full.csv")) if (work / "cooccurrence_full.csv").stat().st_size > 1 else 0
+
+def stage_bundles(corpus, work):
+    bundle_analysis.main(str(corpus), work / "bundles.csv")
+    build_bundle_matrix.main(work / "bundles.csv", work / "bundle_item_matrix.csv", work / "bundle_item_matrix_weighted.csv")
+    m = pd.read_csv(work / "bundle_item_matrix_weighted.csv", index_col=0)
+    if len(m) >= 3:
+        cluster_bundles.pca_kmeans(m.values, 3)
+    return len(m)
+
+def stage_volumes(corpus, work):
+    return streaming.run(corpus, work)["substituted"]
+
+def stage_rendering(corpus, work):
+    subs = work / "tablets_substituted.csv"
+    if not subs.exists():
+        stage_volumes(corpus, work)
+    with patched(render_translations, IN_CSV=str(subs), TRANS_DIR=str(work / "proto_translations"),
+                 MASTER_CSV=str(work / "proto_translations.csv")):
+        render_translations.main(force=True)
+    with patched(build_publications, SUBS_CSV=subs, VOL_CSV=work / "tablet_volumes.csv", PUB=work / "publication"):
+        build_publications.main(force=True)
+    return len(pd.read_csv(subs))
+
+STAGES = {"stats": stage_stats, "segmentation": stage_segmentation, "annotation": stage_annotation,
+          "cooccurrence": stage_cooccurrence, "bundles": stage_bundles, "volumes": stage_volumes,
+          "rendering": stage_rendering}
+DEFAULT_STAGES = [s for s in STAGES if s != "stats"]    # la_stats counts no "Line N:" row yet
+
+def measure(fn, corpus, work, repeat=3, memory=False):
+    best = None
+    for _ in range(repeat):
+        c0, t0 = time.process_time(), time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            rows = fn(corpus, work)
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        if best is None or wall < best[0]:
+            best = (wall, cpu, rows)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        with redirect_stdout(io.StringIO()):
+            fn(corpus, work)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return best + (peak,)
+
+def corpus_for(scale, seed, sampler):
+    """Cached synthetic corpus for one scale: (dir, tablets, lines, bytes)."""
+    d = BENCH / "corpus" / f"x{scale:g}-s{seed}"
+    meta = d / "corpus.json"
+    n = max(1, round(scale * sampler.real_tablets))
+    if meta.exists():
+        m = json.loads(meta.read_text())
+        if m["tablets"] == n:
+            return d, m["tablets"], m["lines"], m["bytes"]
+    files, lines, size = write_corpus(d, n, seed, sampler)
+    meta.write_text(json.dumps({"tablets": files, "lines": lines, "bytes": size}))
+    return d, files, lines, size
+
+def compare(df, baseline, tolerance=1.25, min_delta=0.05):
+    """Printable table + list of regressed (stage, scale)."""
+    base = baseline.get("results", {}) if baseline else {}
+    lines, regressed = [], []
+    head = f"{'stage':<13} {'scale':>6} {'lines':>8} {'wall s':>8} {'cpu s':>8} {'rows/s':>10} {'growth':>6} {'base s':>8} {'ratio':>6}"
+    lines += [head, "-" * len(head)]
+    for stage, g in df.groupby("stage", sort=False):
+        prev = None
+        for r in g.itertuples(index=False):
+            growth = ""
+            if prev is not None and r.lines > prev.lines and prev.wall_s > 0:
+                growth = f"{math.log(r.wall_s / prev.wall_s) / math.log(r.lines / prev.lines):.2f}"
+            b = base.get(f"x{r.scale:g}", {}).get(stage)
+            ratio, flag = "", ""
+            if b:
+                ratio = f"{r.wall_s / b:.2f}"
+                if r.wall_s > b * tolerance and r.wall_s - b > min_delta:
+                    flag = " !"
+                    regressed.append((stage, r.scale))
+            lines.append(f"{stage:<13} {r.scale:>6g} {r.lines:>8} {r.wall_s:>8.3f} {r.cpu_s:>8.3f} "
+                         f"{r.rows / r.wall_s if r.wall_s else 0:>10.0f} {growth:>6} {b if b else '':>8} {ratio:>6}{flag}")
+            prev = r
+    return "\n".join(lines), regressed
+
+def main(scales=(10, 100, 1000), stages=None, seed=0, repeat=3, memory=False,
+         baseline_path=BASELINE, save=False, tolerance=1.25, min_delta=0.05):
+    stages = stages or DEFAULT_STAGES
+    sampler = Sampler()
+    work = BENCH / "work"
+    for name in stages:                               # warm-up on the real corpus
+        w = work / "warmup"; w.mkdir(parents=True, exist_ok=True)
+        with redirect_stdout(io.StringIO()):
+            STAGES[name](Path("data/clean"), w)
+
+    rows = []
+    for scale in scales:
+        corpus, tablets, lines, size = corpus_for(scale, seed, sampler)
+        w = work / f"x{scale:g}"; w.mkdir(parents=True, exist_ok=True)
+        for name in stages:
+            wall, cpu, n, peak = measure(STAGES[name], corpus, w, repeat, memory)
+            rows.append({"scale": scale, "tablets": tablets, "lines": lines, "mb": round(size / 2**20, 3),
+                         "stage": name, "wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "rows": n,
+                         "py_peak_mb": round(peak, 2) if peak is not None else None})
+            print(f"x{scale:g} {name:<13} {wall:8.3f}s", file=sys.stderr)
+    df = pd.DataFrame(rows)
+    BENCH.mkdir(parents=True, exist_ok=True)
+    df.to_csv(BENCH / "benchmark.csv", index=False)
+
+    baseline = json.loads(Path(baseline_path).read_text()) if Path(baseline_path).exists() else None
+    table, regressed = compare(df, baseline, tolerance, min_delta)
+    print(table)
+    print(f"Wrote {BENCH / 'benchmark.csv'}")
+    if save:
+        results = baseline.get("results", {}) if baseline else {}
+        for r in rows:
+            results.setdefault(f"x{r['scale']:g}", {})[r["stage"]] = r["wall_s"]
+        Path(baseline_path).write_text(json.dumps({
+            "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                     "cpus": os.cpu_count(), "seed": seed, "repeat": repeat,
+                     "saved": time.strftime("%Y-%m-%d")},
+            "results": results}, indent=2, sort_keys=True) + "\n")
+        print(f"Wrote {baseline_path}")
+    elif regressed:
+        print(f"{len(regressed)} stage(s) slower than baseline × {tolerance}: "
+              + ", ".join(f"{s}@x{sc:g}" for s, sc in regressed))
+    return regressed
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Time the core stages on 10×/100×/1000× synthetic corpora against a baseline.")
+    ap.add_argument("--scales", type=float, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--stages", nargs="+", choices=list(STAGES), default=None,
+                    help=f"default: {' '.join(DEFAULT_STAGES)}")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per stage and scale (best wall time kept)")
+    ap.add_argument("--memory", action="store_true", help="one extra tracemalloc pass per stage for the Python heap peak")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--save-baseline", action="store_true", help="write these timings into the baseline file")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="slower than baseline × this = regression")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="ignore slowdowns smaller than this many seconds")
+    ap.add_argument("--fail", action="store_true", help="exit 1 when a stage regressed")
+    a = ap.parse_args()
+    regressed = main(a.scales, a.stages, a.seed, a.repeat, a.memory, a.baseline, a.save_baseline, a.tolerance, a.min_delta)
+    sys.exit(1 if a.fail and regressed else 0)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Bootstrap stability of glossary assignments, volume shares and cluster labels.
+
+Tablets are resampled with replacement; a replicate is a vector of
+multinomial tablet weights. Per-tablet contributions are computed once and
+cached (out/tables/bootstrap_contrib.npz, keyed on a hash of the inputs):
+
+  stem×ending counts       (tablets × cells)    from annotate_ledger.iter_annotations
+  bundle counts            (tablets × bundles)  from bundle_analysis.line_bundles
+  grain/oil/wine liters    (tablets × 3)        from volume_engine.aggregate + analyze_volumes.ratio_frame
+
+so every replicate is a weighted sum (one matmul for all replicates) instead
+of a reparse. Per replicate it then
+  - takes the top ending of every stem (the basis of a glossary entry),
+  - recomputes corpus commodity shares,
+  - refits analyze_volumes' KMeans (resampled tablets as sample weights) and
+    cluster_bundles' PCA+KMeans on the resampled bundle counts, in parallel,
+and reports per-assignment stability frequencies and the adjusted Rand
+index of each replicate's clustering against the full-data one.
+
+  python3 scripts/bootstrap_stability.py -d data/clean -n 500 --workers 4
+"""
+import hashlib, argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from sklearn.metrics import adjusted_rand_score
+
+import profiling
+
+ROOT = Path(__file__).resolve().parents[1]
+SUBS = ROOT / "outputs" / "tablets_substituted.csv"
+
+def tablet_id(name):
+    return Path(str(name)).stem     # "HT13.txt" (ledger) and "HT13" (syllabic rows) are one tablet
+
+def inputs_key(indir: Path, subs: Path):
+    h = hashlib.sha1()
+    for p in sorted(indir.glob("*.txt")) + ([subs] if subs.exists() else []):
+        h.update(p.name.encode()); h.update(p.read_bytes())
+    return h.hexdigest()
+
+def _index(counter_by_tablet, tablets):
+    keys = sorted({k for c in counter_by_tablet.values() for k in c})
+    col = {k: j for j, k in enumerate(keys)}
+    M = np.zeros((len(tablets), len(keys)), np.float32)
+    for i, t in enumerate(tablets):
+        for k, n in counter_by_tablet.get(t, {}).items():
+            M[i, col[k]] = n
+    return keys, M
+
+def contributions(indir: Path, subs: Path):
+    from annotate_ledger import iter_annotations
+    from bundle_analysis import line_bundles
+
+    se, bundles = {}, {}
+    for r in iter_annotations(indir):
+        if r["stem"] and r["ending"]:
+            se.setdefault(tablet_id(r["file"]), Counter())[(r["stem"], r["ending"])] += 1
+    for f in sorted(indir.glob("*.txt")):
+        c = bundles.setdefault(tablet_id(f.name), Counter())
+        for line in f.read_text(encoding="utf-8").splitlines():
+            c.update(line_bundles(line.strip().split())[1])
+
+    liters = pd.DataFrame(columns=["grain","oil","wine"])
+    if subs.exists():
+        from volume_engine import aggregate, load_volumes
+        from analyze_volumes import ratio_frame
+        vol = aggregate(pd.read_csv(subs, dtype=str, keep_default_na=False), load_volumes())
+        liters = ratio_frame(vol)
+        liters.index = [tablet_id(f) for f in liters.index]
+        liters = liters.groupby(level=0).sum()
+
+    tablets = sorted(set(se) | set(bundles) | set(liters.index))
+    cells, SE = _index(se, tablets)
+    bkeys, BT = _index(bundles, tablets)
+    L = liters.reindex(tablets, fill_value=0.0).to_numpy(float)
+    return {"tablets": np.array(tablets), "stems": np.array([c[0] for c in cells]),
+            "endings": np.array([c[1] for c in cells]), "SE": SE,
+            "bundles": np.array(bkeys), "BT": BT, "L": L}
+
+def load_contributions(indir: Path, subs: Path, cache: Path):
+    key = inputs_key(indir, subs)
+    if cache.exists():
+        z = np.load(cache, allow_pickle=False)
+        if str(z["key"]) == key:
+            return {k: z[k] for k in z.files if k != "key"}, True
+    c = contributions(indir, subs)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(cache, key=key, **c)
+    return c, False
+
+# --- stem -> ending ------------------------------------------------------------
+
+def top_endings(R, starts, big):
+    """R: (replicates, cells) with cells grouped by stem -> (winning cell, max count) per stem.
+    Ties go to the first ending (cells are sorted), as in the full-data argmax."""
+    R = np.atleast_2d(R)
+    mx = np.maximum.reduceat(R, starts, axis=1)
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, R.shape[1]]))
+    idx = np.where(R == mx[:, seg], np.arange(R.shape[1]), big)
+    return np.minimum.reduceat(idx, starts, axis=1), mx
+
+# --- clustering ------------------------------------------------------------------
+
+def aligned_agreement(ref, lab):
+    """Share of items whose replicate label maps (best one-to-one relabelling) to the reference."""
+    C = pd.crosstab(ref, lab)
+    r, c = linear_sum_assignment(-C.to_numpy())
+    m = dict(zip(C.columns[c], C.index[r]))
+    return np.array([m.get(l, -1) for l in lab]) == ref
+
+def volume_clusters(X, w, k):
+    from analyze_volumes import cluster_ratios
+    present = w > 0
+    if present.sum() <= k:
+        return None
+    lab = np.full(len(X), -1)
+    lab[present] = cluster_ratios(X[present], k, sample_weight=w[present])
+    return lab
+
+def bundle_clusters(membership, counts, k):
+    from cluster_bundles import pca_kmeans
+    present = counts > 0
+    if present.sum() <= max(k, 2):
+        return None
+    lab = np.full(len(counts), -1)
+    _, lab[present], _ = pca_kmeans(membership[present] * counts[present, None], k)
+    return lab
+
+_JOB = None
+def _init(job):
+    global _JOB
+    _JOB = job
+
+def _fit_chunk(rows):
+    X, vol_k, membership, bundle_k = _JOB["X"], _JOB["vol_k"], _JOB["membership"], _JOB["bundle_k"]
+    out = []
+    for w, bc in rows:
+        out.append((volume_clusters(X, w, vol_k) if X is not None else None,
+                    bundle_clusters(membership, bc, bundle_k) if membership is not None else None))
+    return out
+
+def fit_replicates(job, W_vol, BC, workers=1, chunk=25):
+    rows = list(zip(W_vol, BC))
+    parts = [rows[i:i+chunk] for i in range(0, len(rows), chunk)]
+    if workers > 1 and len(parts) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(job,)) as ex:
+            return [r for part in ex.map(profiling.wrap(_fit_chunk), parts) for r in part]
+    _init(job)
+    return [r for part in parts for r in _fit_chunk(part)]
+
+def stability_rows(name, items, ref, labels):
+    """Per-item stability + per-replicate ARI against the full-data labels."""
+    agree = np.zeros(len(items)); seen = np.zeros(len(items)); ari, reps = [], []
+    for i, lab in enumerate(labels):
+        if lab is None:
+            continue
+        m = lab >= 0
+        if len(np.unique(ref[m])) < 2:
+            continue
+        ari.append(adjusted_rand_score(ref[m], lab[m])); reps.append(i)
+        agree[m] += aligned_agreement(ref[m], lab[m]); seen[m] += 1
+    items_df = pd.DataFrame({"analysis": name, "item": items, "cluster": ref, "replicates": seen.astype(int),
+                             "stability": np.divide(agree, seen, out=np.full(len(items), np.nan), where=seen > 0)})
+    return items_df, pd.DataFrame({"analysis": name, "replicate": reps, "ari": ari})
+
+def load_glossary(path):
+    if not Path(path).exists():
+        return pd.DataFrame(columns=["stem","hypothesis","confidence"])
+    g = pd.read_csv(path, sep="\t")
+    return g.rename(columns={"token": "stem"})[["stem","hypothesis","confidence"]]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Bootstrap (tablet resampling) stability of assignments and clusters.")
+    ap.add_argument("-d","--dir", default="data/clean")
+    ap.add_argument("--subs", default=str(SUBS), help="tablets_substituted.csv for volume shares/clusters")
+    ap.add_argument("--glossary", default="out/tables/glossary_hypothesis.tsv")
+    ap.add_argument("-n","--replicates", type=int, default=200)
+    ap.add_argument("--volume-k", type=int, default=2)
+    ap.add_argument("--bundle-k", type=int, default=3)
+    ap.add_argument("--no-clusters", action="store_true", help="skip the KMeans refits")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--cache", default="out/tables/bootstrap_contrib.npz")
+    ap.add_argument("-o","--outdir", default="out/tables")
+    a = ap.parse_args()
+
+    c, cached = load_contributions(Path(a.dir), Path(a.subs), Path(a.cache))
+    tablets = c["tablets"]
+    print(f"{len(tablets)} tablets, {len(c['stems'])} stem×ending cells, {len(c['bundles'])} bundles"
+          f" ({'cached' if cached else 'computed'} contributions)")
+    rng = np.random.default_rng(a.seed)
+    W = rng.multinomial(len(tablets), np.full(len(tablets), 1 / len(tablets)), size=a.replicates).astype(np.float32)
+    out = Path(a.outdir); out.mkdir(parents=True, exist_ok=True)
+
+    # stem -> top ending (cells are sorted by stem, then ending)
+    stems, endings = c["stems"], c["endings"]
+    starts = np.flatnonzero(np.r_[True, stems[1:] != stems[:-1]]) if len(stems) else np.array([], int)
+    if len(stems):
+        ref_win, ref_max = top_endings(c["SE"].sum(axis=0), starts, len(stems))
+        win, mx = top_endings(W @ c["SE"], starts, len(stems))
+        present = mx > 0
+        same = (win == ref_win) & present
+        res = pd.DataFrame({"stem": stems[starts], "ending": endings[ref_win[0]], "count": ref_max[0].astype(int),
+                            "presence": present.mean(axis=0),
+                            "stability": same.sum(axis=0) / np.maximum(present.sum(axis=0), 1)})
+        res = res.merge(load_glossary(a.glossary), on="stem", how="left").sort_values(["stability","count"], ascending=False)
+        res.round(4).to_csv(out/"bootstrap_stem_endings.csv", index=False)
+        print(f"Wrote {out/'bootstrap_stem_endings.csv'}")
+
+    # corpus commodity shares
+    L = c["L"]
+    if L.sum() > 0:
+        S = W @ L
+        S = S / S.sum(axis=1, keepdims=True)
+        full = L.sum(axis=0) / L.sum()
+        shares = pd.DataFrame({"commodity": ["grain","oil","wine"], "share": full, "mean": S.mean(axis=0),
+                               "p2.5": np.percentile(S, 2.5, axis=0), "p97.5": np.percentile(S, 97.5, axis=0)})
+        shares.round(4).to_csv(out/"bootstrap_volume_shares.csv", index=False)
+        print(f"Wrote {out/'bootstrap_volume_shares.csv'}")
+
+    if not a.no_clusters:
+        from analyze_volumes import shares as row_shares
+        job = {"X": None, "vol_k": a.volume_k, "membership": None, "bundle_k": a.bundle_k}
+        eligible = L.sum(axis=1) > 0
+        if eligible.sum() > a.volume_k:
+            job["X"] = row_shares(L[eligible])
+        if len(c["bundles"]) > a.bundle_k:
+            items = sorted({i for b in c["bundles"] for i in b.split(" + ")})
+            col = {i: j for j, i in enumerate(items)}
+            job["membership"] = np.zeros((len(c["bundles"]), len(items)))
+            for r, b in enumerate(c["bundles"]):
+                job["membership"][r, [col[i] for i in b.split(" + ")]] = 1
+
+        W_vol = W[:, eligible]
+        BC = W @ c["BT"]
+        _init(job)
+        ref_vol = volume_clusters(job["X"], np.ones(eligible.sum()), a.volume_k) if job["X"] is not None else None
+        ref_bun = bundle_clusters(job["membership"], c["BT"].sum(axis=0), a.bundle_k) if job["membership"] is not None else None
+        fits = fit_replicates(job, W_vol, BC, a.workers)
+
+        frames, aris = [], []
+        if ref_vol is not None:
+            f, r = stability_rows("volumes", tablets[eligible], ref_vol, [v for v, _ in fits]); frames.append(f); aris.append(r)
+        if ref_bun is not None:
+            f, r = stability_rows("bundles", c["bundles"], ref_bun, [b for _, b in fits]); frames.append(f); aris.append(r)
+        if frames:
+            pd.concat(frames).round(4).to_csv(out/"bootstrap_cluster_stability.csv", index=False)
+            ari = pd.concat(aris)
+            ari.round(4).to_csv(out/"bootstrap_ari.csv", index=False)
+            for name, g in ari.groupby("analysis"):
+                print(f"{name}: ARI mean {g['ari'].mean():.3f} "
+                      f"[{g['ari'].quantile(0.025):.3f}, {g['ari'].quantile(0.975):.3f}] over {len(g)} replicates")
+            print(f"Wrote {out/'bootstrap_cluster_stability.csv'}, {out/'bootstrap_ari.csv'}")
@@ -7,15 +7,21 @@ Outputs (per tablet) to: outputs/publication/<TABLET>_publication.md
 Data sources:
 - outputs/tablets_substituted.csv   (raw spans + labels + numbers)
 - outputs/tablet_volumes.csv        (liters per commodity/unit)
-- outputs/proto_translations.csv    (optional; we derive from substituted if missing)
 
-No external deps beyond pandas.
+No external deps beyond pandas; --workers renders tablets in parallel.
 """
 
+import re, argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import textwrap
 
+from render_cache import RenderCache, compile_templates, group_digests
+from confidence import confidence_column, default_scorer
+from instrument import timed, current
+import profiling
+
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / "outputs"
 PUB = OUT / "publication"
@@ -23,27 +29,60 @@ PUB.mkdir(parents=True, exist_ok=True)
 
 SUBS_CSV = OUT / "tablets_substituted.csv"
 VOL_CSV  = OUT / "tablet_volumes.csv"
-PROTO_CSV = OUT / "proto_translations.csv"  # optional; we won’t fail if absent
 
-# --- Confidence rules (simple & consistent) -----------------------------------
-HIGH_STEMS  = {"grain", "oil", "wine", "winea", "wineb"}
-KNOWN_UNITS = {"small_jar", "big_jar", "amphoraa", "amphorab", "large_measure", "measure_tag"}
+# catch common forms: "... 7"  or "Line 3: ..." etc.
+LINE_KEY_RX = re.compile(r"(?:Line\s*)?(\d+)\b")
+NO_LINE = 1e9
+
+NOTES = textwrap.dedent("""\
+    - **High**: both stem (commodity) and unit are anchor readings recurring across tablets.
+    - **Medium**: the weaker side is only a tentative reading (e.g. a measure of unknown capacity).
+    - **Low**: at least one side is unidentified; treat as tentative.
+    - Tiers are set in `data/confidence_tiers.json`; a line takes the lower of its stem and unit tiers.
+""").strip()
+
+TEMPLATES = compile_templates(
+    publication="""\
+# $base — Parallel Text Publication
+
+_Exploratory hypothesis of commodities/units aligned with the original transcription._
+
+## Parallel text
+
+$table
+
+
+## Tablet summary
+
+$summary
+
+
+## Mini lexicon (this tablet)
+
+$lexicon
+
+
+## Notes on confidence
+
+$notes
+""",
+    index="""\
+# Linear A — Proto-decipherment Publication
 
-def infer_confidence(stem_label: str, unit_label: str) -> str:
-    s = (stem_label or "").strip().lower()
-    u = (unit_label or "").strip().lower()
+_Per-tablet, parallel-text edition generated by `scripts/build_publications.py`._
 
-    if s in HIGH_STEMS and u in KNOWN_UNITS:
-        return "high"
-    if s in HIGH_STEMS or u in KNOWN_UNITS:
-        return "medium"
-    return "low"
+$entries
+""")
 
-def fmt_qty_line(stem_label, unit_label, number, confidence, raw_span):
-    stem_label = stem_label or "commodity?"
-    unit_label = unit_label or "unit?"
-    conf_tag = {"high":"[high]","medium":"[medium]","low":"[low]"}[confidence]
-    return f"{stem_label} in {unit_label} ×{int(number)}   {conf_tag}   (raw: {raw_span})"
+def translation_column(df: pd.DataFrame) -> pd.Series:
+    """Per-line "<stem> in <unit> ×<n>   [<confidence>]   (raw: <span>)" text (labels are already filled)."""
+    return (df["stem_label"].astype(str) + " in " + df["ending_label"].astype(str)
+            + " ×" + df["number"].astype(int).astype(str)
+            + "   [" + df["confidence"] + "]   (raw: " + df["raw_span"].astype(str) + ")")
+
+def line_key_column(raw_spans: pd.Series) -> pd.Series:
+    """First number in each raw span (ordering key), NO_LINE if none."""
+    return raw_spans.astype(str).str.extract(LINE_KEY_RX, expand=False).astype(float).fillna(NO_LINE)
 
 def build_parallel_table(rows):
     """
@@ -63,17 +102,13 @@ def build_parallel_table(rows):
         lines.append(f"| {raw} | {tr} | {conf} |")
     return "\n".join(lines)
 
-def build_per_tablet_summary(vol_df, tablet_file):
-    """Returns markdown block with liters by commodity + percent for this tablet."""
-    df = vol_df[vol_df["file"] == tablet_file].copy()
-    if df.empty:
+def build_per_tablet_summary(summary):
+    """Markdown block with liters by commodity + percent; summary = [(commodity, liters, percent)]
+    sorted by liters (descending)."""
+    if not summary:
         return "_No volume data available for this tablet._\n"
 
-    # Sum liters by commodity
-    g = df.groupby("commodity", as_index=False)["liters"].sum()
-    g = g.sort_values("liters", ascending=False)
-    total = g["liters"].sum()
-    g["percent"] = g["liters"].pipe(lambda s: (s / total * 100).round(2))
+    total = sum(liters for _, liters, _ in summary)
 
     # Build a table
     md = []
@@ -81,55 +116,115 @@ def build_per_tablet_summary(vol_df, tablet_file):
     md.append("")
     md.append("| commodity | liters | share (%) |")
     md.append("|---|---:|---:|")
-    for _, r in g.iterrows():
-        md.append(f"| {r['commodity']} | {r['liters']:.1f} | {r['percent']:.2f} |")
+    for commodity, liters, percent in summary:
+        md.append(f"| {commodity} | {liters:.1f} | {percent:.2f} |")
     md.append("")
     md.append(f"_Total: {total:.1f} L_")
     md.append("")
     return "\n".join(md)
 
-def build_mini_lexicon(subs_df, tablet_file):
+def build_mini_lexicon(stems, units):
     """List the stems/units used on this tablet (what the reader needs)."""
-    d = subs_df[subs_df["file"] == tablet_file].copy()
-    if d.empty:
+    if not stems and not units:
         return "_No lexicon items found on this tablet._\n"
 
-    d["stem_label"] = d["stem_label"].fillna("commodity?")
-    d["ending_label"] = d["ending_label"].fillna("unit?")
-    stems = sorted(set(d["stem_label"]))
-    units = sorted(set(d["ending_label"]))
-
     md = []
     md.append("**Mini lexicon used on this tablet**\n")
     md.append("")
     md.append("**Stems → commodity (hypothesis):**")
-    for s in stems:
+    for s in sorted(set(stems)):
         md.append(f"- {s}")
     md.append("")
     md.append("**Endings → unit/measure (hypothesis):**")
-    for u in units:
+    for u in sorted(set(units)):
         md.append(f"- {u}")
     md.append("")
     return "\n".join(md)
 
-def main():
-    if not SUBS_CSV.exists():
-        raise SystemExit(f"Missing {SUBS_CSV}. Run the pipeline to create it.")
-
-    subs = pd.read_csv(SUBS_CSV)
-    # Ensure required columns exist, and fill/normalize
+def volume_summaries(vol: pd.DataFrame):
+    """{file: [(commodity, liters, percent)]} from one groupby over all tablets."""
+    if vol.empty:
+        return {}
+    g = vol.groupby(["file", "commodity"], as_index=False)["liters"].sum()
+    g["percent"] = (g["liters"] / g.groupby("file")["liters"].transform("sum") * 100).round(2)
+    g = g.sort_values(["file", "liters"], ascending=[True, False], kind="stable")
+    out = {}
+    for f, c, l, p in zip(g["file"], g["commodity"], g["liters"], g["percent"]):
+        out.setdefault(f, []).append((c, l, p))
+    return out
+
+def tablet_jobs(subs: pd.DataFrame, vol: pd.DataFrame):
+    """One pass over the sorted corpus -> [(tablet, rows, volume summary)] in tablet order."""
+    summaries = volume_summaries(vol)
+    # Order by the line number in raw_span within each tablet, else keep csv order
+    subs = subs.sort_values(["file", "line_key"], kind="stable")
+    jobs, cur, rows = [], None, None
+    for f, raw, tr, conf, stem, unit in zip(subs["file"], subs["raw_span"], subs["translation_line"],
+                                           subs["confidence"], subs["stem_label"], subs["ending_label"]):
+        if f != cur:
+            cur, rows = f, []
+            jobs.append((f, rows, summaries.get(f, [])))
+        rows.append({"raw_span": raw, "translation_line": tr, "confidence": conf,
+                     "stem_label": stem, "ending_label": unit})
+    return jobs
+
+def render_tablet(job):
+    """(tablet, its rows, its volume summary) -> markdown text."""
+    tablet, rows, summary = job
+    return TEMPLATES["publication"].substitute(
+        base=tablet.replace(".txt",""),
+        table=build_parallel_table(rows),
+        summary=build_per_tablet_summary(summary),
+        lexicon=build_mini_lexicon([r["stem_label"] for r in rows], [r["ending_label"] for r in rows]),
+        notes=NOTES)
+
+def prepare(subs: pd.DataFrame, src=SUBS_CSV) -> pd.DataFrame:
+    """Check the substituted columns and fill/normalize them in place."""
     for col in ["file","raw_span","stem_label","ending_label","number"]:
         if col not in subs.columns:
-            raise SystemExit(f"{SUBS_CSV} missing column: {col}")
+            raise SystemExit(f"{src} missing column: {col}")
     subs["stem_label"] = subs["stem_label"].fillna("commodity?")
     subs["ending_label"] = subs["ending_label"].fillna("unit?")
     subs["number"] = subs["number"].astype(int)
+    return subs
+
+def publication_file(tablet):
+    return f"{tablet.replace('.txt','')}_publication.md"
 
-    # Optional proto translations (not strictly needed)
-    if PROTO_CSV.exists():
-        proto = pd.read_csv(PROTO_CSV)
+def render_publications(cache, subs, vol, workers=1, chunksize=64):
+    """Render the tablets of subs whose substituted or volume rows changed into cache."""
+    tablets = sorted(subs["file"].unique())
+    subs_d = group_digests(subs, "file", ["raw_span","stem_label","ending_label","number"])
+    vol_d = group_digests(vol, "file")
+    keys = {t: cache.key(subs_d[t], vol_d.get(t, ""), NOTES, default_scorer().version) for t in tablets}
+    stale = [t for t in tablets if not cache.fresh(publication_file(t), keys[t])]
+    subs = subs[subs["file"].isin(stale)].copy()
+
+    # Per-row columns computed once for all stale tablets
+    subs["confidence"] = confidence_column(subs["stem_label"], subs["ending_label"])
+    subs["translation_line"] = translation_column(subs)
+    subs["line_key"] = line_key_column(subs["raw_span"])
+    jobs = tablet_jobs(subs, vol[vol["file"].isin(stale)])
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            texts = list(ex.map(profiling.wrap(render_tablet), jobs, chunksize=chunksize))
     else:
-        proto = pd.DataFrame(columns=["file","line","translation"])
+        texts = [render_tablet(j) for j in jobs]
+    for (tablet, _, _), text in zip(jobs, texts):
+        cache.put(publication_file(tablet), keys[tablet], text)
+
+def write_index(cache, tablets):
+    bases = [t.replace(".txt","") for t in tablets]
+    cache.put("index.md", cache.key(*bases), TEMPLATES["index"].substitute(
+        entries="\n".join(f"- [{b}]({b}_publication.md)" for b in bases)))
+
+@timed()
+def main(workers=1, chunksize=64, force=False):
+    if not SUBS_CSV.exists():
+        raise SystemExit(f"Missing {SUBS_CSV}. Run the pipeline to create it.")
+
+    subs = prepare(pd.read_csv(SUBS_CSV))
 
     # Volume data
     if VOL_CSV.exists():
@@ -137,75 +232,22 @@ def main():
     else:
         vol = pd.DataFrame(columns=["file","commodity","unit","count","liters"])
 
-    # Tablets present
     tablets = sorted(subs["file"].unique())
+    st = current(); st.input(SUBS_CSV, VOL_CSV); st.output(PUB); st.rows_in = len(subs)
+    with RenderCache(PUB, TEMPLATES.values(), force) as cache:
+        # Only tablets whose substituted or volume rows changed are rendered again
+        render_publications(cache, subs, vol, workers, chunksize)
+        write_index(cache, tablets)
 
-    index_lines = ["# Linear A — Proto-decipherment Publication",
-                   "",
-                   "_Per-tablet, parallel-text edition generated by `scripts/build_publications.py`._",
-                   ""]
-    for tablet in tablets:
-        base = tablet.replace(".txt","")
-        out_md = PUB / f"{base}_publication.md"
-
-        # Build parallel rows for this tablet
-        tdf = subs[subs["file"] == tablet].copy()
-        tdf["confidence"] = tdf.apply(
-            lambda r: infer_confidence(str(r["stem_label"]), str(r["ending_label"])), axis=1
-        )
-        tdf["translation_line"] = tdf.apply(
-            lambda r: fmt_qty_line(r["stem_label"], r["ending_label"], r["number"], r["confidence"], r["raw_span"]),
-            axis=1
-        )
-
-        # Order by line number if present in raw_span
-        # Try to extract trailing integer from raw_span, else keep csv order
-        import re
-        def line_key(s):
-            if not isinstance(s,str): return 1e9
-            # catch common forms: "... 7"  or "Line 3: ..." etc.
-            m = re.search(r"(?:Line\s*)?(\d+)\b", s)
-            if m:
-                try:
-                    return int(m.group(1))
-                except:
-                    return 1e9
-            return 1e9
-        tdf = tdf.sort_values(by="raw_span", key=lambda s: s.map(line_key))
-
-        rows = [{"raw_span": rs["raw_span"],
-                 "translation_line": rs["translation_line"],
-                 "confidence": rs["confidence"]} for _, rs in tdf.iterrows()]
-
-        # Build markdown
-        md = []
-        md.append(f"# {base} — Parallel Text Publication\n")
-        md.append("_Exploratory hypothesis of commodities/units aligned with the original transcription._\n")
-        md.append("## Parallel text\n")
-        md.append(build_parallel_table(rows))
-        md.append("\n")
-        md.append("## Tablet summary\n")
-        md.append(build_per_tablet_summary(vol, tablet))
-        md.append("\n")
-        md.append("## Mini lexicon (this tablet)\n")
-        md.append(build_mini_lexicon(subs, tablet))
-        md.append("\n")
-        md.append("## Notes on confidence\n")
-        md.append(textwrap.dedent("""\
-            - **High**: both stem (commodity) and unit match anchor patterns recurring across tablets.
-            - **Medium**: only the stem *or* the unit is on solid footing.
-            - **Low**: neither side has strong recurrence; treat as tentative.
-        """).strip())
-        md.append("")
-
-        out_md.write_text("\n".join(md), encoding="utf-8")
+    for out_md in cache.written:
         print(f"✔ wrote {out_md}")
-
-        index_lines.append(f"- [{base}]({out_md.relative_to(PUB)})")
-
-    # Small index
-    (PUB / "index.md").write_text("\n".join(index_lines) + "\n", encoding="utf-8")
-    print(f"✔ wrote {PUB/'index.md'}")
+    print(f"Publications: {cache.report()}")
+    st.rows_out = len(cache.written)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Per-tablet parallel-text publications.")
+    ap.add_argument("--workers", type=int, default=1, help="render tablets in worker processes")
+    ap.add_argument("--chunksize", type=int, default=64, help="tablets per worker task")
+    ap.add_argument("--force", action="store_true", help="ignore the render manifest and rewrite everything")
+    a = ap.parse_args()
+    main(a.workers, a.chunksize, a.force)
@@ -2,11 +2,13 @@
 import datetime
 from pathlib import Path
 import pandas as pd
+from instrument import timed, current
 
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / "outputs"
 OUT.mkdir(parents=True, exist_ok=True)
 
+@timed()
 def main():
     md_path = OUT / "LinearA_report.md"
 
@@ -82,6 +84,7 @@ def main():
 
     # Write Markdown
     md_path.write_text("".join(lines), encoding="utf-8")
+    current().output(md_path)
     print(f"✔ wrote {md_path}")
     print("⚠ Skipped PDF export (disabled to avoid dependency issues).")
 
@@ -12,6 +12,13 @@ def extract_stems(tokens):
             stems.append(f"{tokens[i]} {tokens[i+1]}")
     return stems
 
+def line_bundles(tokens):
+    """Pair and triple bundles of the distinct stems on one line -> (stems, [bundle keys])."""
+    stems = sorted(set(extract_stems(tokens)))  # unique stems per line
+    if len(stems) < 2:
+        return stems, []
+    return stems, [" + ".join(combo) for r in [2, 3] for combo in combinations(stems, r)]  # pairs and triples
+
 def main(clean_dir="data/clean", out_csv="out/tables/bundles.csv"):
     bundle_counts = {}
 
@@ -20,20 +27,14 @@ def main(clean_dir="data/clean", out_csv="out/tables/bundles.csv"):
             lines = f.readlines()
 
         for li, line in enumerate(lines, start=1):
-            tokens = line.strip().split()
-            stems = extract_stems(tokens)
-            stems = sorted(set(stems))  # unique stems per line
-
-            if len(stems) >= 2:
-                for r in [2, 3]:  # pairs and triples
-                    for combo in combinations(stems, r):
-                        key = " + ".join(combo)
-                        bundle_counts.setdefault(key, {"count":0, "examples":[]})
-                        bundle_counts[key]["count"] += 1
-                        if len(bundle_counts[key]["examples"]) < 3:
-                            bundle_counts[key]["examples"].append(
-                                f"{Path(filepath).name}: Line {li} => {', '.join(stems)}"
-                            )
+            stems, bundles = line_bundles(line.strip().split())
+            for key in bundles:
+                bundle_counts.setdefault(key, {"count":0, "examples":[]})
+                bundle_counts[key]["count"] += 1
+                if len(bundle_counts[key]["examples"]) < 3:
+                    bundle_counts[key]["examples"].append(
+                        f"{Path(filepath).name}: Line {li} => {', '.join(stems)}"
+                    )
 
     # Flatten into DataFrame
     rows = []
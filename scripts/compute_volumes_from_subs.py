@@ -1,102 +1,81 @@
 #!/usr/bin/env python3
-import csv, json
+import csv
 from pathlib import Path
 from collections import defaultdict
+import pandas as pd
+from volume_engine import load_volumes, aggregate, records
+from instrument import timed, current
 
 ROOT = Path(__file__).resolve().parents[1]
 OUT = ROOT / "outputs"
 OUT.mkdir(parents=True, exist_ok=True)
 
 SUBS = OUT / "tablets_substituted.csv"
-VOL_JSON = ROOT / "data" / "volumes.json"
 
-# Aliases: map raw endings → unit names
-UNIT_ALIASES = {
-    "AB22 AB67": "big_jar",
-    "AB22 AB03": "small_jar",
-    "AB22 AB09": "amphoraA",
-    "AB22 AB59": "amphoraB",
-    "AB22 AB28": "large_measure",
-    "AB22 AB40": "measure_tag",
-    "AB22 AB54": "unit?",
-    "AB22 AB69": "big_jar",   # guess
-}
+class VolumeAccumulator:
+    """Running counts per (file, commodity, ending_label, ending); memory ~ distinct keys.
+    Units and liters are resolved once per key by the volume engine."""
+    def __init__(self, volumes):
+        self.volumes = volumes
+        self.counts = defaultdict(int)
+        self.skipped = 0     # rows without a count (reported by the callers)
 
-# Default volumes if data/volumes.json not found
-DEFAULT_VOLUMES = {
-    "small_jar": 5.0,
-    "big_jar": 50.0,
-    "amphoraA": 30.0,
-    "amphoraB": 30.0,
-    "large_measure": 10.0,
-    "measure_tag": 1.0,
-    "unit?": 0.0,
-}
+    def add(self, row):
+        number = (row.get("number") or "")
+        if str(number).strip() == "":
+            self.skipped += 1
+            return
+        key = (row["file"], row.get("stem_label") or "", row.get("ending_label") or "", row.get("ending") or "")
+        self.counts[key] += int(number)
 
-def resolve_unit(row):
-    """Resolve ending → human-readable unit name"""
-    # prefer ending_label if it already matches a known unit
-    ending_label = (row.get("ending_label") or "").strip()
-    if ending_label in DEFAULT_VOLUMES:
-        return ending_label
-    # otherwise map the raw ending through aliases
-    raw_ending = (row.get("ending") or "").strip()
-    if raw_ending in UNIT_ALIASES:
-        return UNIT_ALIASES[raw_ending]
-    # fallback
-    return "unit?"
+    def frame(self):
+        return pd.DataFrame([(*k, n) for k, n in self.counts.items()],
+                            columns=["file","stem_label","ending_label","ending","number"])
 
-def main():
-    if not SUBS.exists():
-        raise SystemExit(f"Missing {SUBS}. Run the earlier steps first.")
-
-    if VOL_JSON.exists():
-        volumes = json.loads(VOL_JSON.read_text(encoding="utf-8"))
-    else:
-        volumes = DEFAULT_VOLUMES
+    def liters(self):
+        return records(aggregate(self.frame(), self.volumes))
 
-    rows = []
-    with SUBS.open(encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            rows.append(row)
+def volume_block(file, totals):
+    """One tablet's section of tablet_volumes.txt; totals = {commodity: liters}."""
+    return (f"Tablet {file} — volume totals:\n"
+            + "".join(f"  • {commodity:10s} {L:.1f} L\n" for commodity, L in sorted(totals.items(), key=lambda x: -x[1]))
+            + "\n")
 
-    # Aggregate per (file, commodity, resolved_unit)
-    agg = defaultdict(lambda: {"count": 0, "unit_name": None})
-    for row in rows:
-        file = row["file"]
-        commodity = (row.get("stem_label") or "").strip() or "commodity?"
-        unit_name = resolve_unit(row)
-        n = int(row["number"])
-        agg[(file, commodity, unit_name)]["count"] += n
-        agg[(file, commodity, unit_name)]["unit_name"] = unit_name
-
-    # Write tablet_volumes.csv
-    out_csv = OUT / "tablet_volumes.csv"
+def write_volumes(records, out_dir: Path):
+    """records: iterable of (file, commodity, unit, count, liters), sorted by key; returns the row count."""
+    out_csv = out_dir / "tablet_volumes.csv"
+    totals = defaultdict(lambda: defaultdict(float))
+    n = 0
     with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
+        w = csv.writer(f, lineterminator="\n")
         w.writerow(["file","commodity","unit","count","liters"])
-        for (file, commodity, unit), data in sorted(agg.items()):
-            count = data["count"]
-            liters = count * float(volumes.get(unit, 0.0))
+        for file, commodity, unit, count, liters in records:
             w.writerow([file, commodity, unit, count, liters])
+            totals[file][commodity] += liters
+            n += 1
     print(f"✔ wrote {out_csv}")
 
     # Pretty per-tablet text report (tablet_volumes.txt)
-    totals = defaultdict(lambda: defaultdict(float))
-    for (file, commodity, unit), data in agg.items():
-        count = data["count"]
-        liters = count * float(volumes.get(unit, 0.0))
-        totals[file][commodity] += liters
-
-    out_txt = OUT / "tablet_volumes.txt"
+    out_txt = out_dir / "tablet_volumes.txt"
     with out_txt.open("w", encoding="utf-8") as f:
         for file in sorted(totals):
-            f.write(f"Tablet {file} — volume totals:\n")
-            for commodity, L in sorted(totals[file].items(), key=lambda x: -x[1]):
-                f.write(f"  • {commodity:10s} {L:.1f} L\n")
-            f.write("\n")
+            f.write(volume_block(file, totals[file]))
     print(f"✔ wrote {out_txt}")
+    return n
+
+@timed()
+def main():
+    if not SUBS.exists():
+        raise SystemExit(f"Missing {SUBS}. Run the earlier steps first.")
+
+    # Aggregate per (file, commodity, resolved_unit) in one vectorized pass
+    subs = pd.read_csv(SUBS, dtype=str, keep_default_na=False)
+    st = current(); st.input(SUBS); st.output(OUT / "tablet_volumes.csv", OUT / "tablet_volumes.txt")
+    st.rows_in = len(subs)
+    st.rows_out = write_volumes(records(aggregate(subs, load_volumes())), OUT)
+    skipped = int((subs["number"].str.strip() == "").sum())
+    if skipped:
+        print(f"{skipped} rows without a count were not summed")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Confidence tiers for (stem label, unit label) pairs, shared by
+render_translations.py and build_publications.py.
+
+Tiers come from data/confidence_tiers.json:
+  levels        ordered low → high
+  stem          stem label  → tier
+  unit          unit name   → tier
+A raw ending (e.g. "AB22 AB67") scores as the unit volume_engine.UNIT_ALIASES
+maps it to.
+Labels are matched case-insensitively after stripping; anything unlisted
+(including the commodity?/unit? placeholders) gets the default tier. A row's confidence is the weaker of its two sides:
+
+    conf = levels[min(stem_code, unit_code)]
+
+Lookups go through categorical codes (one dictionary lookup per distinct
+label, not per row) and the two sides are combined with np.minimum.
+"""
+import json, hashlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from volume_engine import UNIT_ALIASES
+
+ROOT = Path(__file__).resolve().parents[1]
+TIERS_JSON = ROOT / "data" / "confidence_tiers.json"
+
+def _key(s):
+    return str(s).strip().lower()
+
+class ConfidenceScorer:
+    def __init__(self, config):
+        self.version = hashlib.sha1(json.dumps([config, UNIT_ALIASES], sort_keys=True).encode("utf-8")).hexdigest()
+        self.levels = list(config["levels"])
+        rank = {lvl: i for i, lvl in enumerate(self.levels)}
+        self.default = rank[config.get("default", self.levels[0])]
+        self.stem = {_key(k): rank[v] for k, v in config.get("stem", {}).items()}
+        self.unit = {_key(k): rank[v] for k, v in config.get("unit", {}).items()}
+        # an alias scores as the unit it names
+        for raw, name in UNIT_ALIASES.items():
+            self.unit.setdefault(_key(raw), self.unit.get(_key(name), self.default))
+
+    @classmethod
+    def load(cls, path=TIERS_JSON):
+        scorer = cls(json.loads(Path(path).read_text(encoding="utf-8")))
+        scorer.version = hashlib.sha1(Path(path).read_bytes() + json.dumps(UNIT_ALIASES, sort_keys=True).encode("utf-8")).hexdigest()
+        return scorer
+
+    def _codes(self, labels, table) -> np.ndarray:
+        cat = pd.Categorical(pd.Series(labels, dtype=object))
+        lut = np.array([table.get(_key(c), self.default) for c in cat.categories] + [self.default],
+                       dtype=np.int8)
+        return lut[cat.codes]        # code -1 (missing) hits the trailing default
+
+    def codes(self, stem_labels, unit_labels) -> np.ndarray:
+        """Ordinal tier per row (index into levels)."""
+        return np.minimum(self._codes(stem_labels, self.stem), self._codes(unit_labels, self.unit))
+
+    def labels(self, stem_labels, unit_labels) -> np.ndarray:
+        return np.asarray(self.levels, dtype=object)[self.codes(stem_labels, unit_labels)]
+
+_DEFAULT = None
+def default_scorer():
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = ConfidenceScorer.load()
+    return _DEFAULT
+
+def confidence_column(stem_labels, unit_labels) -> np.ndarray:
+    """Tier label per row with the default tiers file."""
+    return default_scorer().labels(stem_labels, unit_labels)
@@ -13,29 +13,38 @@ def extract_stems(tokens):
             stems.append(f"{tokens[i]} {tokens[i+1]}")
     return stems
 
-def main(clean_dir="data/clean", out_csv="out/tables/cooccurrence_full.csv"):
+def tablet_rows(filepath):
+    """Co-occurring stem pairs of one tablet, one row per pair and line."""
     results = []
-    for filepath in glob.glob(f"{clean_dir}/*.txt"):
-        with open(filepath, "r") as f:
-            lines = f.readlines()
+    with open(filepath, "r") as f:
+        lines = f.readlines()
 
-        for li, line in enumerate(lines, start=1):
-            tokens = line.strip().split()
-            stems = extract_stems(tokens)
-            if len(stems) < 2:
-                continue
+    for li, line in enumerate(lines, start=1):
+        tokens = line.strip().split()
+        stems = extract_stems(tokens)
+        if len(stems) < 2:
+            continue
 
-            for a, b in combinations(sorted(set(stems)), 2):
-                results.append({
-                    "file": Path(filepath).name,
-                    "line": li,
-                    "pair": f"{a} + {b}",
-                    "stems": ", ".join(stems)
-                })
+        for a, b in combinations(sorted(set(stems)), 2):
+            results.append({
+                "file": Path(filepath).name,
+                "line": li,
+                "pair": f"{a} + {b}",
+                "stems": ", ".join(stems)
+            })
+    return results
 
+def write(results, out_csv):
     out_path = Path(out_csv)
     out_path.parent.mkdir(parents=True, exist_ok=True)
     pd.DataFrame(results).to_csv(out_path, index=False)
+    return out_path
+
+def main(clean_dir="data/clean", out_csv="out/tables/cooccurrence_full.csv"):
+    results = []
+    for filepath in glob.glob(f"{clean_dir}/*.txt"):
+        results.extend(tablet_rows(filepath))
+    out_path = write(results, out_csv)
     print(f"Wrote co-occurrence table to {out_path}")
 
 if __name__ == "__main__":
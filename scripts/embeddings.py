@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Distributional embeddings for signs and stems.
+
+Builds PPMI-weighted sparse context matrices
+  - signs: from left/right neighbour counts within the AB runs of data/clean
+           (words_from_segments.read_segments, which reads "Line N:" tails)
+  - stems: from the stem × ending counts in out/tables/stem_ending_matrix.csv
+factors them with randomized truncated SVD and stores L2-normalized vectors
+as .npz. Cosine neighbours are then a single matrix-vector product.
+
+  python3 scripts/embeddings.py build
+  python3 scripts/embeddings.py query --kind stem --item "AB81 AB02" -k 5
+  python3 scripts/embeddings.py propose   # candidate glosses for unglossed stems
+"""
+import argparse
+from pathlib import Path
+from collections import Counter
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.utils.extmath import randomized_svd
+from words_from_segments import read_segments
+
+def sign_context_matrix(clean_dir: Path):
+    """Adjacent-sign counts (both directions) in the AB runs of every tablet -> (labels, ctx_labels, csr)."""
+    pairs = Counter()
+    for f in sorted(Path(clean_dir).glob("*.txt")):
+        for seg in read_segments(f):
+            for a, b in zip(seg, seg[1:]):
+                pairs[(a, b)] += 1; pairs[(b, a)] += 1
+    labels = sorted({a for a, _ in pairs})
+    idx = {s: i for i, s in enumerate(labels)}
+    r = [idx[a] for a, _ in pairs]; c = [idx[b] for _, b in pairs]
+    X = sparse.csr_matrix((np.fromiter(pairs.values(), float, len(pairs)), (r, c)), shape=(len(labels), len(labels)))
+    return labels, labels, X
+
+def stem_context_matrix(matrix_csv: Path):
+    """stem_ending_matrix.csv (stem + one column per ending) -> (labels, ctx_labels, csr)."""
+    df = pd.read_csv(matrix_csv)
+    key = "stem" if "stem" in df.columns else df.columns[0]
+    X = sparse.csr_matrix(df.drop(columns=[key]).to_numpy(dtype=float))
+    return df[key].astype(str).tolist(), [c for c in df.columns if c != key], X
+
+def ppmi(X, alpha=0.75):
+    """Positive PMI with context-distribution smoothing (c^alpha); stays sparse."""
+    X = sparse.coo_matrix(X, dtype=float)
+    total = X.sum()
+    if total == 0:
+        return X.tocsr()
+    row = np.asarray(X.sum(axis=1)).ravel()
+    col = np.asarray(X.sum(axis=0)).ravel() ** alpha
+    p_col = col / col.sum()
+    pmi = np.log((X.data / total) / ((row[X.row] / total) * p_col[X.col]))
+    keep = pmi > 0
+    return sparse.csr_matrix((pmi[keep], (X.row[keep], X.col[keep])), shape=X.shape)
+
+def factor(M, dim=50, seed=42):
+    """Randomized truncated SVD; returns row-normalized U·sqrt(S)."""
+    k = max(1, min(dim, *M.shape))
+    if M.nnz == 0:
+        return np.zeros((M.shape[0], k))
+    U, S, _ = randomized_svd(M, n_components=k, random_state=seed)
+    V = U * np.sqrt(S)
+    norms = np.linalg.norm(V, axis=1, keepdims=True)
+    return V / np.where(norms == 0, 1.0, norms)
+
+def save(path: Path, labels, vectors):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, labels=np.array(labels, dtype=str), vectors=vectors.astype(np.float32))
+
+class EmbeddingIndex:
+    """Cosine nearest neighbours over unit vectors (one matmul per query batch)."""
+    def __init__(self, labels, vectors):
+        self.labels = list(labels)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.index = {s: i for i, s in enumerate(self.labels)}
+
+    @classmethod
+    def load(cls, path: Path):
+        z = np.load(path)
+        return cls(z["labels"].tolist(), z["vectors"])
+
+    def neighbors_many(self, items, k=10):
+        idx = np.array([self.index[s] for s in items], dtype=int)
+        sims = self.vectors[idx] @ self.vectors.T
+        sims[np.arange(len(idx)), idx] = -np.inf   # drop self
+        k = min(k, len(self.labels) - 1)
+        if k <= 0:
+            return [[] for _ in items]
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        out = []
+        for r, cand in enumerate(top):
+            order = cand[np.argsort(-sims[r, cand])]
+            out.append([(self.labels[j], float(sims[r, j])) for j in order])
+        return out
+
+    def neighbors(self, item, k=10):
+        return self.neighbors_many([item], k)[0]
+
+def build(clean_dir, matrix_csv, outdir: Path, dim, alpha, seed):
+    for kind, loader, src in (("sign", sign_context_matrix, clean_dir),
+                              ("stem", stem_context_matrix, matrix_csv)):
+        if not Path(src).exists():
+            print(f"(skip) {kind}: missing {src}")
+            continue
+        labels, _, X = loader(Path(src))
+        if X.shape[0] == 0:
+            print(f"(skip) {kind}: {src} is empty")
+            continue
+        V = factor(ppmi(X, alpha), dim, seed)
+        out = outdir / f"embeddings_{kind}.npz"
+        save(out, labels, V)
+        print(f"Wrote {out} ({len(labels)} × {V.shape[1]})")
+
+def load_index(outdir: Path, kind):
+    """EmbeddingIndex written by `build`, or exit saying how to get one."""
+    path = outdir / f"embeddings_{kind}.npz"
+    if not path.exists():
+        why = " (build skips signs when no tablet has two adjacent AB signs)" if kind == "sign" else ""
+        raise SystemExit(f"Missing {path}: run `embeddings.py build` first{why}")
+    return EmbeddingIndex.load(path)
+
+def propose(outdir: Path, glossary, k, out_csv: Path):
+    """For every stem without a glossary entry, list its nearest glossed stems."""
+    ix = load_index(outdir, "stem")
+    gl = pd.read_csv(glossary, sep="\t")
+    gl = gl[gl["role"] == "commodity"].set_index("token")
+    known = [s for s in ix.labels if s in gl.index]
+    unknown = [s for s in ix.labels if s not in gl.index]
+    rows = []
+    if known and unknown:
+        K = EmbeddingIndex(known, ix.vectors[[ix.index[s] for s in known]])
+        sims = ix.vectors[[ix.index[s] for s in unknown]] @ K.vectors.T
+        kk = min(k, len(known))
+        top = np.argsort(-sims, axis=1)[:, :kk]
+        for r, stem in enumerate(unknown):
+            for rank, j in enumerate(top[r], start=1):
+                tok = known[j]
+                rows.append({"stem": stem, "rank": rank, "neighbor": tok,
+                             "cosine": round(float(sims[r, j]), 4),
+                             "candidate_gloss": gl.at[tok, "hypothesis"]})
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows, columns=["stem","rank","neighbor","cosine","candidate_gloss"]).to_csv(out_csv, index=False)
+    print(f"Wrote {out_csv} ({len(unknown)} unglossed stems)")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="PPMI + truncated-SVD sign/stem embeddings with cosine search.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build")
+    b.add_argument("-d", "--dir", default="data/clean", help="tablets for the sign contexts")
+    b.add_argument("--matrix", default="out/tables/stem_ending_matrix.csv")
+    b.add_argument("--dim", type=int, default=50)
+    b.add_argument("--alpha", type=float, default=0.75, help="context-distribution smoothing exponent")
+    b.add_argument("--seed", type=int, default=42)
+
+    q = sub.add_parser("query")
+    q.add_argument("--kind", choices=["sign","stem"], default="stem")
+    q.add_argument("--item", action="append", required=True, help='e.g. "AB81 AB02" (repeatable)')
+    q.add_argument("-k", type=int, default=10)
+
+    p = sub.add_parser("propose")
+    p.add_argument("--glossary", default="out/tables/glossary_hypothesis.tsv")
+    p.add_argument("-k", type=int, default=3)
+    p.add_argument("-o", "--out", default="out/tables/gloss_candidates.csv")
+
+    for s in (b, q, p):
+        s.add_argument("--outdir", default="out/tables")
+    a = ap.parse_args()
+
+    outdir = Path(a.outdir)
+    if a.cmd == "build":
+        build(a.dir, a.matrix, outdir, a.dim, a.alpha, a.seed)
+    elif a.cmd == "query":
+        ix = load_index(outdir, a.kind)
+        items = [" ".join(i.upper().split()) for i in a.item]
+        missing = [i for i in items if i not in ix.index]
+        if missing:
+            raise SystemExit(f"Not in {a.kind} vocabulary: {', '.join(missing)}")
+        for item, nbrs in zip(items, ix.neighbors_many(items, a.k)):
+            print(item)
+            for label, score in nbrs:
+                print(f"  {score:+.3f}  {label}")
+    else:
+        propose(outdir, a.glossary, a.k, Path(a.out))
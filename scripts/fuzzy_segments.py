@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Edit-distance search over distinct sign segments.
+
+Segments are the same ideogram/number-delimited chunks that
+words_from_segments.py counts. They are indexed in a BK-tree keyed on
+sign-level Levenshtein distance, so a query only visits subtrees whose
+distance band can still contain a hit; each search comparison is a banded
+Levenshtein that gives up once no child edge or hit is reachable (inserts
+need the exact distance and run unbanded).
+
+  python3 scripts/fuzzy_segments.py -d data/clean --query "AB81 AB02 AB22 AB67" --max-dist 2
+  python3 scripts/fuzzy_segments.py -d data/clean --cluster --max-dist 1 --workers 4
+"""
+import argparse, csv
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from words_from_segments import read_segments
+from near_duplicates import clusters
+import profiling
+
+def levenshtein(a, b, cutoff=None):
+    """Sign-level edit distance; returns cutoff+1 once the band is exceeded."""
+    if len(a) < len(b):
+        a, b = b, a
+    if cutoff is not None and len(a) - len(b) > cutoff:
+        return cutoff + 1
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, start=1):
+        cur = [i] + [0] * len(b)
+        lo = 1 if cutoff is None else max(1, i - cutoff)
+        hi = len(b) if cutoff is None else min(len(b), i + cutoff)
+        if lo > 1:
+            cur[lo-1] = (cutoff or 0) + 1
+        for j in range(lo, hi + 1):
+            cur[j] = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (x != b[j-1]))
+        if hi < len(b):
+            cur[hi+1:] = [(cutoff or 0) + 1] * (len(b) - hi)
+        if cutoff is not None and min(cur[lo-1:hi+1]) > cutoff:
+            return cutoff + 1
+        prev = cur
+    return prev[-1]
+
+class BKTree:
+    def __init__(self, items=()):
+        self.root = None   # (item, {distance: child})
+        for it in items:
+            self.add(it)
+
+    def add(self, item):
+        if self.root is None:
+            self.root = (item, {}); return
+        node = self.root
+        while True:
+            d = levenshtein(item, node[0])
+            if d == 0: return
+            if d not in node[1]:
+                node[1][d] = (item, {}); return
+            node = node[1][d]
+
+    def search(self, query, max_dist):
+        """Return [(distance, item)] sorted by distance."""
+        hits, stack = [], [self.root] if self.root else []
+        while stack:
+            item, children = stack.pop()
+            # past max(edge) + max_dist no child band [d - max_dist, d + max_dist] can be reached
+            cutoff = max(children, default=0) + max_dist
+            d = levenshtein(query, item, cutoff)
+            if d > cutoff:
+                continue                      # outside the radius and every child band
+            if d <= max_dist:
+                hits.append((d, item))
+            for k, child in children.items():
+                if d - max_dist <= k <= d + max_dist:
+                    stack.append(child)
+        return sorted(hits)
+
+def distinct_segments(indir: Path, min_len=2):
+    ctr = Counter()
+    for f in sorted(indir.glob("*.txt")):
+        ctr.update(tuple(s) for s in read_segments(f) if len(s) >= min_len)
+    return ctr
+
+_TREE = None
+def _init_worker(items):
+    global _TREE
+    _TREE = BKTree(items)
+
+def _search_batch(args):
+    batch, max_dist = args
+    return [(q, [it for d, it in _TREE.search(q, max_dist) if it != q]) for q in batch]
+
+def neighbour_pairs(items, max_dist, workers=1, batch=256):
+    """All (i, j) with distance <= max_dist; queries are fanned out to workers."""
+    index = {it: i for i, it in enumerate(items)}
+    jobs = [(items[i:i+batch], max_dist) for i in range(0, len(items), batch)]
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(items,)) as ex:
+            results = [r for part in ex.map(profiling.wrap(_search_batch), jobs) for r in part]
+    else:
+        _init_worker(items)
+        results = [r for job in jobs for r in _search_batch(job)]
+    pairs = set()
+    for q, hits in results:
+        for h in hits:
+            i, j = index[q], index[h]
+            pairs.add((min(i, j), max(i, j)))
+    return sorted(pairs)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fuzzy (edit-distance) search and clustering of sign segments.")
+    ap.add_argument("-d","--dir", required=True, help="data/clean")
+    ap.add_argument("--query", action="append", default=[], help='e.g. "AB81 AB02 AB22 AB67" (repeatable)')
+    ap.add_argument("--max-dist", type=int, default=1)
+    ap.add_argument("--cluster", action="store_true", help="cluster all distinct segments by edit distance")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--min-len", type=int, default=2)
+    ap.add_argument("-o","--out", default="out/tables/segment_edit_clusters.csv")
+    a = ap.parse_args()
+
+    counts = distinct_segments(Path(a.dir), a.min_len)
+    items = sorted(counts)
+
+    if a.query:
+        tree = BKTree(items)
+        for q in a.query:
+            qt = tuple(q.upper().split())
+            print(f"{' '.join(qt)}  (≤{a.max_dist})")
+            for d, it in tree.search(qt, a.max_dist):
+                print(f"  d={d}  {' '.join(it)}  ×{counts[it]}")
+
+    if a.cluster:
+        pairs = neighbour_pairs(items, a.max_dist, a.workers)
+        groups = sorted(clusters(len(items), pairs), key=len, reverse=True)
+        Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(a.out, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(["cluster","size","segment_tokens","count"])
+            for ci, g in enumerate(groups, start=1):
+                for i in sorted(g, key=lambda i: -counts[items[i]]):
+                    w.writerow([ci, len(g), " ".join(items[i]), counts[items[i]]])
+        print(f"{len(items)} distinct segments, {len(pairs)} pairs ≤ {a.max_dist}, {len(groups)} clusters")
+        print(f"Wrote {a.out}")
+
+    if not a.query and not a.cluster:
+        ap.error("nothing to do: pass --query and/or --cluster")
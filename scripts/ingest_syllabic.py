@@ -1,32 +1,78 @@
 #!/usr/bin/env python3
-import re, csv
+"""
+Collect the syllabic (transliterated, e.g. "QE-TU-RA 2") ledger lines from
+every tablet in data/clean. Each file is classified as syllabic or AB-sign
+from its own "Line N:" rows, and files are parsed concurrently.
+
+Rows carry the tablet stem and line number; syllabic_to_substituted.py
+replaces all syllabic rows of tablets_substituted.csv with them.
+"""
+import re, csv, argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from instrument import timed, current
+import profiling
 
 ROOT = Path(__file__).resolve().parents[1]
 CLEAN = ROOT / "data" / "clean"
 OUT   = ROOT / "outputs"
-OUT.mkdir(parents=True, exist_ok=True)
 
-targets = ["HT7.txt","HT8.txt","HT9.txt","HT10.txt","HT12.txt"]
-row_re = re.compile(r"^\s*Line\s*\d+\s*:\s*(.+?)\s+(-?\d+)\s*$", re.I)
+row_re = re.compile(r"^\s*Line\s*(\d+)\s*:\s*(.+?)\s+(-?\d+)\s*$", re.I)
+AB_TOKEN = re.compile(r"\bAB\d{1,3}\b", re.I)
+SYLLABIC_WORD = r"[A-Z*][A-Z0-9*]*(?:[-+][A-Z0-9*]+)*"       # QE-TU-RA, KU-RA2-TA, VIN+TE
+SYLLABIC_ITEM = re.compile(rf"{SYLLABIC_WORD}(?:\s+{SYLLABIC_WORD})*", re.I)
+
+def is_syllabic(rows):
+    """Most ledger rows carry a transliterated item and none is spelled in AB signs."""
+    if not rows:
+        return False
+    if any(AB_TOKEN.search(item) for _, item, _ in rows):
+        return False
+    return sum(bool(SYLLABIC_ITEM.fullmatch(item)) for _, item, _ in rows) * 2 > len(rows)
 
 def parse(p: Path):
+    """[(file, line, item, number, raw)] if p is a syllabic tablet, else []."""
     tablet = p.stem
+    rows, raws = [], []
     for line in p.read_text(encoding="utf-8").splitlines():
         m = row_re.match(line)
         if m:
-            yield (tablet, m.group(1).strip(), int(m.group(2)), line.strip())
-
-def main():
-    rows = []
-    for name in targets:
-        fp = CLEAN / name
-        if fp.exists():
-            rows.extend(parse(fp))
-    out_csv = OUT / "ht_syllabic_ledger.csv"
+            rows.append((int(m.group(1)), m.group(2).strip(), int(m.group(3))))
+            raws.append(line.strip())
+    if not is_syllabic(rows):
+        return []
+    return [(tablet, ln, item, num, raw) for (ln, item, num), raw in zip(rows, raws)]
+
+@timed()
+def main(clean=CLEAN, out=OUT, workers=1):
+    files = sorted(Path(clean).glob("*.txt"))
+    st = current(); st.input(*files); st.rows_in = len(files)
+    if workers > 1 and len(files) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            parsed = list(ex.map(profiling.wrap(parse), files, chunksize=16))
+    else:
+        parsed = [parse(p) for p in files]
+
+    # one row per (file, line); a repeated line number keeps its last reading
+    keyed = {}
+    for rows in parsed:
+        for r in rows:
+            keyed[r[:2]] = r
+    rows = [keyed[k] for k in sorted(keyed)]
+
+    out = Path(out); out.mkdir(parents=True, exist_ok=True)
+    out_csv = out / "ht_syllabic_ledger.csv"
     with out_csv.open("w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f); w.writerow(["file","item","number","raw"]); w.writerows(rows)
+        w = csv.writer(f); w.writerow(["file","line","item","number","raw"]); w.writerows(rows)
+    tablets = sorted({r[0] for r in rows})
+    print(f"Syllabic tablets: {', '.join(tablets) or '—'}")
     print(f"Wrote {out_csv} (rows={len(rows)})")
+    st.output(out_csv); st.rows_out = len(rows)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Detect syllabic tablets in data/clean and extract their ledger rows.")
+    ap.add_argument("-d","--dir", default=str(CLEAN))
+    ap.add_argument("-o","--outdir", default=str(OUT))
+    ap.add_argument("--workers", type=int, default=1)
+    a = ap.parse_args()
+    main(Path(a.dir), Path(a.outdir), a.workers)
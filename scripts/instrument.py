@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation: wall/CPU time, memory, rows and bytes per stage,
+appended as JSON lines to a metrics file.
+
+  with stage("annotate", inputs=[indir], outputs=[out_csv]) as st:
+      ...; st.rows_in, st.rows_out = n_lines, n_rows
+
+  @timed()                      # stage named <script>.<function>
+  def analyze(dirpath): ...     # rows_out = len(result) or an int result
+
+  current()                     # the innermost open stage (set rows/outputs from inside a @timed function)
+
+Each record: run, stage, parent, script, wall_s, cpu_s (self + waited-for
+children, e.g. process pools), max_rss_mb (process high-water mark at the end
+of the stage), rss_grow_mb (how much the stage raised it), py_peak_mb (only
+with LINA_TRACEMALLOC=1, which slows allocation), rows_in/rows_out and
+bytes_in/bytes_out of the listed paths (directories are summed).
+
+  LINA_METRICS      metrics file; unset or empty = off, except under `instrument.py run`
+                    (and so run_pipeline.sh), which default it to outputs/metrics.jsonl
+  LINA_RUN_ID       groups the stages of one pipeline run (run_pipeline.sh sets it)
+  LINA_PROFILE      1 (or a directory): cProfile every outermost stage (profiling.py)
+
+  python3 scripts/instrument.py run scripts/compute_volumes_from_subs.py   # whole script as a stage
+  python3 scripts/instrument.py run --profile scripts/build_publications.py --workers 4
+  python3 scripts/instrument.py summary                                    # last run vs the one before
+  python3 scripts/instrument.py summary --run 20261019T101500-123 --baseline none
+"""
+import os, sys, json, time, resource, tracemalloc, functools, argparse, runpy
+from pathlib import Path
+from contextlib import contextmanager
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_METRICS = ROOT / "outputs" / "metrics.jsonl"
+_env = os.environ.get("LINA_METRICS")
+METRICS = Path(_env) if _env else None     # direct runs of @timed scripts record nothing
+RUN_ID = os.environ.get("LINA_RUN_ID") or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+TRACE = os.environ.get("LINA_TRACEMALLOC") == "1"
+PROFILE = os.environ.get("LINA_PROFILE", "") not in ("", "0")   # cProfile per outermost stage (profiling.py)
+SLOWER = 1.25      # summary flags stages this much slower than the baseline
+
+_stack = []
+
+def _max_rss_mb():
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    child_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(self_kb, child_kb) / 1024      # Linux reports KiB
+
+def _size(paths):
+    total = 0
+    for p in map(Path, paths):
+        if p.is_file():
+            total += p.stat().st_size
+        elif p.is_dir():
+            total += sum(f.stat().st_size for f in p.rglob("*") if f.is_file())
+    return total
+
+def _cpu():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class Stage:
+    def __init__(self, name, inputs=(), outputs=(), rows_in=None, rows_out=None):
+        self.name, self.inputs, self.outputs = name, list(inputs), list(outputs)
+        self.rows_in, self.rows_out = rows_in, rows_out
+
+    def output(self, *paths):
+        self.outputs.extend(paths)
+
+    def input(self, *paths):
+        self.inputs.extend(paths)
+
+def current():
+    """Innermost open stage (a detached one if none is open, so callers need not check)."""
+    return _stack[-1] if _stack else Stage("-")
+
+def _write(rec):
+    if METRICS is None:
+        return
+    METRICS.parent.mkdir(parents=True, exist_ok=True)
+    with METRICS.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+
+@contextmanager
+def stage(name, inputs=(), outputs=(), rows_in=None):
+    st = Stage(name, inputs, outputs, rows_in)
+    parent = _stack[-1].name if _stack else None
+    started_trace = TRACE and not tracemalloc.is_tracing()
+    if started_trace:
+        tracemalloc.start()
+    elif TRACE:
+        tracemalloc.reset_peak()
+    prof = None
+    if PROFILE:
+        import profiling
+        prof = profiling.start()
+    rss0, cpu0, t0 = _max_rss_mb(), _cpu(), time.perf_counter()
+    _stack.append(st)
+    status = "ok"
+    try:
+        yield st
+    except BaseException as e:
+        status = "exit" if isinstance(e, SystemExit) and not e.code else type(e).__name__
+        raise
+    finally:
+        _stack.pop()
+        wall, cpu, rss = time.perf_counter() - t0, _cpu() - cpu0, _max_rss_mb()
+        if prof is not None:
+            profiling.finish(prof, name, profiling.profile_dir(RUN_ID))
+        py_peak = None
+        if TRACE:
+            py_peak = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            if started_trace:
+                tracemalloc.stop()
+        _write({"run": RUN_ID, "stage": name, "parent": parent, "script": Path(sys.argv[0]).name,
+                "status": status, "t": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "wall_s": round(wall, 4), "cpu_s": round(cpu, 4),
+                "max_rss_mb": round(rss, 1), "rss_grow_mb": round(rss - rss0, 1), "py_peak_mb": py_peak,
+                "rows_in": st.rows_in, "rows_out": st.rows_out,
+                "bytes_in": _size(st.inputs), "bytes_out": _size(st.outputs)})
+
+def _script_name(func):
+    mod = sys.modules.get(func.__module__)
+    f = getattr(mod, "__file__", None)
+    return Path(f).stem if f else func.__module__
+
+def timed(name=None):
+    """Decorator: run the function inside stage(name or '<script>.<function>')."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with stage(name or f"{_script_name(func)}.{func.__name__}") as st:
+                result = func(*args, **kwargs)
+                if st.rows_out is None:
+                    if isinstance(result, int) and not isinstance(result, bool):
+                        st.rows_out = result
+                    elif hasattr(result, "__len__"):
+                        st.rows_out = len(result)
+                return result
+        return inner
+    return wrap
+
+# ---------- reading metrics back ----------
+
+def load(path=METRICS):
+    if not path or not Path(path).exists():
+        return []
+    with Path(path).open(encoding="utf-8") as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+def runs(records):
+    """Run ids in first-seen order."""
+    return list(dict.fromkeys(r["run"] for r in records))
+
+def aggregate(records, run):
+    """{stage: summed metrics} for one run as a tree walk: each stage followed by its
+    children (records are written when a stage ends, so children come first in the file)."""
+    out, parent = {}, {}
+    for r in records:
+        if r["run"] != run:
+            continue
+        parent.setdefault(r["stage"], r["parent"])
+        a = out.setdefault(r["stage"], {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "max_rss_mb": 0.0,
+                                         "rows_in": None, "rows_out": None, "bytes_out": 0, "status": "ok"})
+        a["calls"] += 1
+        for k in ("wall_s", "cpu_s", "bytes_out"):
+            a[k] += r[k] or 0
+        a["max_rss_mb"] = max(a["max_rss_mb"], r["max_rss_mb"] or 0)
+        for k in ("rows_in", "rows_out"):
+            if r[k] is not None:
+                a[k] = (a[k] or 0) + r[k]
+        if r["status"] not in ("ok", "exit"):
+            a["status"] = r["status"]
+    children = {}
+    for s, p in parent.items():
+        children.setdefault(p if p in out else None, []).append(s)
+    ordered = {}
+    def walk(p, depth):
+        for s in children.get(p, []):
+            if s in ordered:
+                continue
+            ordered[s] = dict(out[s], depth=depth)
+            walk(s, depth + 1)
+    walk(None, 0)
+    return ordered
+
+def summary(records, run=None, baseline="prev"):
+    """Text table of one run; with a baseline run, wall-time ratios and a flag on regressions."""
+    ids = runs(records)
+    if not ids:
+        return "No metrics recorded."
+    run = ids[-1] if run in (None, "last") else run
+    if baseline == "prev":
+        i = ids.index(run) if run in ids else len(ids)
+        baseline = ids[i - 1] if i > 0 else None
+    elif baseline == "none":
+        baseline = None
+    cur = aggregate(records, run)
+    base = aggregate(records, baseline) if baseline else {}
+    total = sum(a["wall_s"] for a in cur.values() if a["depth"] == 0) or 1.0
+    fmt = lambda v: "" if v is None else str(v)
+    head = f"{'stage':<44} {'calls':>5} {'wall s':>8} {'cpu s':>8} {'%':>5} {'rss MB':>7} {'rows in':>8} {'rows out':>8} {'MB out':>7}"
+    if base:
+        head += f" {'vs base':>8}"
+    lines = [f"run {run}" + (f" (baseline {baseline})" if baseline else ""), head, "-" * len(head)]
+    for s, a in cur.items():
+        name = ("  " * a["depth"] + s)[:44]
+        row = (f"{name:<44} {a['calls']:>5} {a['wall_s']:>8.3f} {a['cpu_s']:>8.3f} "
+               f"{100 * a['wall_s'] / total:>5.1f} {a['max_rss_mb']:>7.1f} "
+               f"{fmt(a['rows_in']):>8} {fmt(a['rows_out']):>8} {a['bytes_out'] / 2**20:>7.2f}")
+        if base:
+            b = base.get(s)
+            if b and b["wall_s"] > 0:
+                ratio = a["wall_s"] / b["wall_s"]
+                row += f" {ratio:>7.2f}x" + (" !" if ratio > SLOWER and a["wall_s"] - b["wall_s"] > 0.05 else "")
+            else:
+                row += f" {'new':>8}"
+        if a["status"] != "ok":
+            row += f"  [{a['status']}]"
+        lines.append(row)
+    lines.append(f"total {total:.3f}s over {sum(a['depth'] == 0 for a in cur.values())} top-level stages")
+    return "\n".join(lines)
+
+def run_script(path, argv):
+    """Run a script as __main__ inside one stage named after it (imports included)."""
+    path = Path(path).resolve()
+    sys.argv = [str(path)] + list(argv)
+    sys.path.insert(0, str(path.parent))
+    sys.modules.setdefault("instrument", sys.modules[__name__])   # the script's `import instrument` shares our stage stack
+    with stage(path.stem):
+        try:
+            runpy.run_path(str(path), run_name="__main__")
+        except SystemExit as e:
+            if e.code:
+                raise
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Per-stage metrics: run a script as a stage, or summarize a run.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run a script under a stage named after it")
+    r.add_argument("--profile", action="store_true", help="cProfile the script (same as LINA_PROFILE=1)")
+    r.add_argument("script")
+    r.add_argument("args", nargs=argparse.REMAINDER)
+    s = sub.add_parser("summary", help="per-stage table of one run")
+    s.add_argument("--metrics", default=str(DEFAULT_METRICS) if _env is None else _env,
+                   help='metrics file ("" = metrics off: print nothing)')
+    s.add_argument("--run", default="last", help='run id (default: "last")')
+    s.add_argument("--baseline", default="prev", help='run id to compare with, "prev" or "none"')
+    a = ap.parse_args()
+    if a.cmd == "run":
+        if a.profile and not PROFILE:
+            os.environ["LINA_PROFILE"] = "1"          # inherited by worker processes too
+            PROFILE = True
+        if _env is None:                              # pipeline stages record by default
+            os.environ["LINA_METRICS"] = str(DEFAULT_METRICS)
+            METRICS = DEFAULT_METRICS
+        run_script(a.script, a.args)
+    elif a.metrics:
+        print(summary(load(a.metrics), a.run, a.baseline))
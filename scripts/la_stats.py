@@ -2,6 +2,7 @@
 import re, csv, json, argparse
 from pathlib import Path
 from collections import Counter, defaultdict
+from instrument import timed, current
 
 AB = re.compile(r"\bAB\d{1,3}\b", re.I)
 IDEO = re.compile(r"\*\d+[A-Z]+", re.I)
@@ -17,30 +18,71 @@ def read_tablet(path: Path):
         rows.append(("DATA", toks))
     return rows
 
+KEYS = ("freqs","ideos","nums","bigr","trigr","starts","ends")
+
+def counters():
+    return dict({k: Counter() for k in KEYS}, contexts=defaultdict(Counter), lines=0)
+
+def _result(c):
+    return dict({k: c[k] for k in KEYS}, contexts={k:dict(v) for k,v in c["contexts"].items()})
+
+def count_tablet(path: Path, c=None):
+    """Add one tablet to the counters c (fresh ones if None) and return them. 'lines' = DATA rows read."""
+    c = counters() if c is None else c
+    contexts = c["contexts"]
+    for kind,toks in read_tablet(path):
+        if kind!="DATA": continue
+        c["lines"] += 1
+        signs=[t.upper() for t in toks if AB.fullmatch(t)]
+        c["ideos"].update([t.upper() for t in toks if IDEO.fullmatch(t)])
+        c["nums"].update([t for t in toks if NUM.fullmatch(t)])
+        if signs:
+            c["starts"].update([signs[0]]); c["ends"].update([signs[-1]])
+        for i in range(len(signs)-1):
+            a,b=signs[i],signs[i+1]
+            c["bigr"].update([(a,b)]); contexts[a].update([b]); contexts[b].update([a])
+        for i in range(len(signs)-2):
+            c["trigr"].update([(signs[i],signs[i+1],signs[i+2])])
+    return c
+
+def add(tot, part, sign=1):
+    """Add one tablet's counters to running totals (sign=-1 takes them back out; emptied keys are dropped)."""
+    pairs = [(tot[k], part[k]) for k in KEYS] + [(tot["contexts"][k], v) for k,v in part["contexts"].items()]
+    for t,p in pairs:
+        if sign > 0: t.update(p); continue
+        t.subtract(p)
+        for key in p:
+            if t[key] <= 0: del t[key]
+    if sign < 0:
+        for k in part["contexts"]:
+            if not tot["contexts"][k]: del tot["contexts"][k]
+    tot["lines"] += sign * part["lines"]
+    return tot
+
+def merge(parts):
+    """Sum per-tablet counters in the order given (ties in most_common() keep first-seen order)."""
+    tot = counters()
+    for p in parts:
+        add(tot, p)
+    return _result(tot)
+
+@timed()
 def analyze(dirpath: Path):
     files = sorted(dirpath.glob("*.txt"))
-    freqs=Counter(); ideos=Counter(); nums=Counter()
-    bigr=Counter(); trigr=Counter(); starts=Counter(); ends=Counter()
-    contexts=defaultdict(Counter)
+    st = current(); st.input(dirpath)
+    c = counters()
     for f in files:
-        for kind,toks in read_tablet(f):
-            if kind!="DATA": continue
-            signs=[t.upper() for t in toks if AB.fullmatch(t)]
-            ideos.update([t.upper() for t in toks if IDEO.fullmatch(t)])
-            nums.update([t for t in toks if NUM.fullmatch(t)])
-            if signs:
-                starts.update([signs[0]]); ends.update([signs[-1]])
-            for i in range(len(signs)-1):
-                a,b=signs[i],signs[i+1]
-                bigr.update([(a,b)]); contexts[a].update([b]); contexts[b].update([a])
-            for i in range(len(signs)-2):
-                trigr.update([(signs[i],signs[i+1],signs[i+2])])
-    return dict(freqs=freqs, ideos=ideos, nums=nums, bigr=bigr,
-                trigr=trigr, starts=starts, ends=ends,
-                contexts={k:dict(v) for k,v in contexts.items()})
+        count_tablet(f, c)
+    st.rows_in = c["lines"]
+    res = _result(c)
+    st.rows_out = len(res["bigr"])
+    return res
 
+@timed()
 def write_out(res, outdir: Path):
     outdir.mkdir(parents=True, exist_ok=True)
+    current().output(*(outdir/f for f in ("freq_signs.csv","freq_ideograms.csv","freq_numbers.csv","starts.csv",
+                                         "ends.csv","bigrams.csv","trigrams.csv","contexts.json")))
     def dump_ctr(name, ctr, headers):
         with (outdir/f"{name}.csv").open("w", newline="", encoding="utf-8") as f:
             w=csv.writer(f); w.writerow(headers)
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 import re
 import glob
+import argparse
 from pathlib import Path
 import pandas as pd
 
+from render_cache import RenderCache, compile_templates, digest
+
+TEMPLATES = compile_templates(line="Line $n: $text\n  → $gloss\n")
+
 # ---- helpers ----
 def load_glossary(path):
     df = pd.read_csv(path, sep="\t")
@@ -76,23 +81,37 @@ def line_interpretation(pairs, nums, gloss):
     return " | ".join(interp)
 
 # ---- main ----
-def main(clean_dir="data/clean", out_dir="out/readable", glossary="out/tables/glossary_hypothesis.tsv"):
-    gloss = load_glossary(glossary)
-    out_path = Path(out_dir); out_path.mkdir(parents=True, exist_ok=True)
-
-    for f in glob.glob(f"{clean_dir}/*.txt"):
-        lines = Path(f).read_text().splitlines()
-        out_lines = []
-        for i, line in enumerate(lines, start=1):
-            toks = line.strip().split()
-            pairs = extract_pairs(toks)
-            nums = extract_numbers(toks)
-            gloss_line = line_interpretation(pairs, nums, gloss)
-            out_lines.append(f"Line {i}: {line}\n  → {gloss_line}\n")
-
-        Path(out_path, Path(f).name.replace(".txt", "_readable.txt")).write_text("\n".join(out_lines))
-
-    print(f"Wrote interpreted files to {out_path}")
+def main(clean_dir="data/clean", out_dir="out/readable", glossary="out/tables/glossary_hypothesis.tsv",
+         force=False):
+    gloss = None
+    gloss_key = digest(Path(glossary).read_bytes())
+    line = TEMPLATES["line"]
+
+    # a tablet is re-rendered only when its source text or the glossary changed
+    with RenderCache(out_dir, TEMPLATES.values(), force) as cache:
+        for f in glob.glob(f"{clean_dir}/*.txt"):
+            raw = Path(f).read_bytes()
+            name = Path(f).name.replace(".txt", "_readable.txt")
+            key = cache.key(digest(raw), gloss_key)
+            if cache.fresh(name, key):
+                continue
+            if gloss is None:
+                gloss = load_glossary(glossary)
+            out_lines = []
+            for i, text in enumerate(raw.decode("utf-8").splitlines(), start=1):
+                toks = text.strip().split()
+                pairs = extract_pairs(toks)
+                nums = extract_numbers(toks)
+                out_lines.append(line.substitute(n=i, text=text, gloss=line_interpretation(pairs, nums, gloss)))
+            cache.put(name, key, "\n".join(out_lines))
+
+    print(f"Wrote interpreted files to {out_dir} ({cache.report()})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Line-by-line readings of the clean transcriptions.")
+    ap.add_argument("-d","--dir", default="data/clean")
+    ap.add_argument("-o","--out", default="out/readable")
+    ap.add_argument("--glossary", default="out/tables/glossary_hypothesis.tsv")
+    ap.add_argument("--force", action="store_true", help="ignore the render manifest and rewrite everything")
+    a = ap.parse_args()
+    main(a.dir, a.out, a.glossary, a.force)
\ No newline at end of file
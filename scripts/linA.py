@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+linA — one entry point for the scripts in this directory.
+
+  python3 scripts/linA.py stats -d data/clean -o out/tables
+  python3 scripts/linA.py contexts -d data/clean --query "AB81 AB02"
+  python3 scripts/linA.py network --no-plot
+  python3 scripts/linA.py <command> -h
+  python3 scripts/linA.py --profile publications --force   # cProfile into out/profiles/<run>/
+
+The command table and help text are static: nothing is imported until a
+command is chosen, and the chosen script is run as __main__ with the rest
+of the arguments. pandas/sklearn/matplotlib/networkx/scipy are only loaded
+by the scripts (and code paths) that use them, so `linA stats` and
+`linA contexts` start in a few tens of milliseconds.
+"""
+import os, sys, runpy
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent
+
+# command -> (module in scripts/, one-line description)
+COMMANDS = {
+    "stats":            ("la_stats",              "sign/ideogram/number frequencies, n-grams, contexts"),
+    "contexts":         ("show_contexts",         "lines containing a sign or a stem tuple"),
+    "normalize":        ("normalize_linear_a",    "raw transcriptions -> data/clean"),
+    "segment":          ("la_segment",            "split lines into sign segments"),
+    "segments":         ("words_from_segments",   "recurring chunks between ideograms/numbers"),
+    "templates":        ("template_grammar",      "declarative token templates over all lines"),
+    "annotate":         ("annotate_ledger",       "[STEM] AB22 [UNIT] NUMBER ledger CSV"),
+    "ledger":           ("ledger_reader",         "line-by-line readings"),
+    "structured":       ("structured_reader",     "structured ledger reading"),
+    "volumes":          ("compute_volumes_from_subs", "tablet volumes from substituted tablets"),
+    "analyze-volumes":  ("analyze_volumes",       "commodity shares + KMeans clusters (--no-plot)"),
+    "report-volumes":   ("report_volumes",        "volume report + stacked chart (--no-plot)"),
+    "uncertainty":      ("volume_uncertainty",    "Monte Carlo tablet volumes"),
+    "matrix":           ("analyze_matrix",        "PCA plot of the stem/ending matrix (--no-plot)"),
+    "bundles":          ("cluster_bundles",       "PCA + KMeans of bundles (--no-plot)"),
+    "network":          ("network_analysis",      "commodity network stats + graph (--no-plot)"),
+    "validate-numbers": ("validate_numbers",      "number distributions per stem (chi-square)"),
+    "permutation":      ("permutation_test",      "stem-ending permutation test with BH FDR"),
+    "bootstrap":        ("bootstrap_stability",   "bootstrap stability of assignments/clusters"),
+    "lm":               ("sign_lm",               "Kneser-Ney sign model: build/score/perplexity"),
+    "restore":          ("restore_signs",         "beam-search restoration of '?' gaps"),
+    "embeddings":       ("embeddings",            "PPMI + SVD embeddings, cosine search"),
+    "fuzzy":            ("fuzzy_segments",        "edit-distance segment search/clustering"),
+    "near-duplicates":  ("near_duplicates",       "MinHash/LSH near-duplicates"),
+    "stream":           ("streaming",             "bounded-memory parse -> volumes"),
+    "watch":            ("watch",                 "keep tables/translations current as data/clean changes"),
+    "translations":     ("render_translations",   "proto-translations per line and tablet"),
+    "publications":     ("build_publications",    "per-tablet parallel-text publications"),
+    "report":           ("build_report",          "final Markdown/PDF report"),
+    "synth":            ("synth_corpus",          "synthetic data/clean-format tablets at N× scale"),
+    "bench":            ("benchmark",             "time core stages at 10×/100×/1000× vs baseline"),
+    "metrics":          ("instrument",            "per-stage metrics: run a script as a stage, summary"),
+    "profile":          ("profiling",             "top-N / collapsed stacks from --profile .pstats"),
+}
+
+def usage():
+    w = max(map(len, COMMANDS))
+    lines = ["usage: linA [--profile] <command> [args...]   (linA <command> -h for its options)", "", "commands:"]
+    lines += [f"  {c:<{w}}  {d}" for c, (_, d) in COMMANDS.items()]
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    profile = bool(argv) and argv[0] == "--profile"
+    if profile:
+        argv = argv[1:]
+        if os.environ.get("LINA_PROFILE", "") in ("", "0"):
+            os.environ["LINA_PROFILE"] = "1"          # read by instrument/profiling on import, and by workers
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    cmd, rest = argv[0], argv[1:]
+    if cmd not in COMMANDS:
+        print(f"linA: unknown command {cmd!r}\n\n{usage()}", file=sys.stderr)
+        return 2
+    if str(SCRIPTS) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS))          # scripts import their siblings
+    sys.argv = [f"linA {cmd}"] + rest
+    if not profile:
+        runpy.run_module(COMMANDS[cmd][0], run_name="__main__", alter_sys=True)
+        return 0
+    import instrument                             # the command becomes one stage, profiled as a whole
+    with instrument.stage(cmd):
+        try:
+            runpy.run_module(COMMANDS[cmd][0], run_name="__main__", alter_sys=True)
+        except SystemExit as e:
+            if e.code:
+                raise
+    import profiling
+    print(f"Profile: {profiling.profile_dir(instrument.RUN_ID) / cmd}.*", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
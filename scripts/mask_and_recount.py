@@ -2,6 +2,7 @@
 import re, csv, argparse
 from pathlib import Path
 from collections import Counter
+from sign_matcher import SignMatcher
 
 AB   = re.compile(r"\bAB\d{1,3}\b", re.I)
 IDEO = re.compile(r"\*\d+[A-Z]+", re.I)
@@ -31,38 +32,36 @@ def segments_from_dir(indir: Path):
         if cur: segs.append((f.name, cur))
     return segs
 
-def strip_suffix_prefix(seg, suffix2, prefix2):
-    s = seg[:]
-    # strip suffix2 if present
-    for a,b in suffix2:
-        if len(s)>=2 and s[-2]==a and s[-1]==b:
-            s = s[:-2]
-            break
-    # strip prefix2 if present
-    for a,b in prefix2:
-        if len(s)>=2 and s[0]==a and s[1]==b:
-            s = s[2:]
-            break
-    return s
+def affix_matcher(suffixes, prefixes):
+    """One automaton for every suffix/prefix pattern (any number of signs)."""
+    m = SignMatcher()
+    for p in suffixes: m.add(p, kind="suffix")
+    for p in prefixes: m.add(p, kind="prefix")
+    return m.build()
+
+def strip_suffix_prefix(seg, matcher):
+    """Strip the longest registered suffix, then the longest prefix that fits in what is left."""
+    suf, pre_ends = None, []
+    for m in matcher.iter_matches(seg):
+        if m.kind == "suffix" and m.end == len(seg) and (suf is None or m.start < suf.start):
+            suf = m
+        elif m.kind == "prefix" and m.start == 0:
+            pre_ends.append(m.end)
+    cut = suf.start if suf is not None else len(seg)
+    return seg[max((e for e in pre_ends if e <= cut), default=0):cut]
 
 if __name__=="__main__":
     ap=argparse.ArgumentParser(description="Mask common suffix/prefix pairs and recount stems.")
     ap.add_argument("-d","--dir", required=True, help="data/clean")
     ap.add_argument("-o","--outdir", default="out/tables")
-    ap.add_argument("--suffix2", action="append", default=[], help='Ending pair, e.g. "AB22 AB67" (repeatable)')
-    ap.add_argument("--prefix2", action="append", default=[], help='Opening pair, e.g. "AB54 AB22" (repeatable)')
+    ap.add_argument("--suffix", action="append", default=[], help='Ending, e.g. "AB22 AB67" (repeatable; any number of signs)')
+    ap.add_argument("--prefix", action="append", default=[], help='Opening, e.g. "AB54 AB22" (repeatable; any number of signs)')
     ap.add_argument("--minlen", type=int, default=2, help="min tokens after stripping to keep as a stem")
     a=ap.parse_args()
 
-    # parse pairs
-    suf_pairs = []
-    for s in a.suffix2:
-        parts=s.strip().split()
-        if len(parts)==2: suf_pairs.append((parts[0].upper(), parts[1].upper()))
-    pre_pairs = []
-    for s in a.prefix2:
-        parts=s.strip().split()
-        if len(parts)==2: pre_pairs.append((parts[0].upper(), parts[1].upper()))
+    # compile all affixes once; matching cost no longer grows with the list
+    matcher = affix_matcher([s for s in a.suffix if s.split()],
+                            [s for s in a.prefix if s.split()])
 
     segs = segments_from_dir(Path(a.dir))
 
@@ -71,7 +70,7 @@ if __name__=="__main__":
     examples = {}  # stem tuple -> one example (file)
 
     for fname, seg in segs:
-        stem = strip_suffix_prefix(seg, suf_pairs, pre_pairs)
+        stem = strip_suffix_prefix(seg, matcher)
         if len(stem) < a.minlen:
             continue
         t = tuple(stem)
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
-import os, re, pandas as pd
-from collections import Counter
+import os, pandas as pd
 
 BASE = os.path.dirname(os.path.dirname(__file__))
 OUT  = os.path.join(BASE, "outputs")
@@ -10,42 +9,36 @@ TEMPLATES_CSV = os.path.join(OUT, "phrase_templates.csv")
 COMM_UNIT_CSV = os.path.join(OUT, "commodity_unit_counts.csv")
 ANOMALIES_CSV = os.path.join(OUT, "translation_anomalies.csv")
 
-LINE_RX = re.compile(r'^(?P<commodity>.+?)\s+in\s+(?P<unit>.+?)\s+×(?P<number>\d+)\s*$')
+TEMPLATE = "COMMODITY in UNIT ×N"
+# render_translations fallbacks when a stem/ending could not be resolved
+UNKNOWN = {"", "UNKNOWN", "UNKNOWN UNIT"}
+STRUCTURED = ["commodity", "unit", "number"]
 
 def main():
     if not os.path.exists(IN_CSV):
         raise FileNotFoundError(f"Missing {IN_CSV}. Run scripts/render_translations.py first.")
-    df = pd.read_csv(IN_CSV)
-
-    pattern_counts = Counter()
-    comm_unit_counts = Counter()
-    parsed_rows, anomalies = [], []
-
-    for r in df.itertuples(index=False):
-        text = str(r.translation)
-        m = LINE_RX.match(text)
-        if not m:
-            anomalies.append({"file": r.file, "line": r.line, "translation": text, "reason": "no_match"})
-            continue
-        commodity = " ".join(m.group("commodity").split())
-        unit      = " ".join(m.group("unit").split())
-        number    = int(m.group("number"))
-
-        template = "COMMODITY in UNIT ×N"
-        pattern_counts[template] += 1
-        comm_unit_counts[(commodity, unit)] += 1
-
-        parsed_rows.append({
-            "file": r.file, "line": r.line,
-            "commodity": commodity, "unit": unit, "number": number,
-            "template": template, "confidence": r.confidence
-        })
-
-    pd.DataFrame(parsed_rows).to_csv(TEMPLATES_CSV, index=False)
-    pd.DataFrame(
-        [{"commodity": c, "unit": u, "count": n} for (c,u), n in comm_unit_counts.items()]
-    ).sort_values(["commodity","unit"]).to_csv(COMM_UNIT_CSV, index=False)
-    pd.DataFrame(anomalies).to_csv(ANOMALIES_CSV, index=False)
+    df = pd.read_csv(IN_CSV, dtype={"commodity": str, "unit": str})
+    missing = [c for c in STRUCTURED if c not in df.columns]
+    if missing:
+        raise SystemExit(f"{IN_CSV} has no {', '.join(missing)} column(s); re-run scripts/render_translations.py")
+
+    # anomalies are rows with a null or unresolved field
+    df["number"] = pd.to_numeric(df["number"], errors="coerce").astype("Int64")
+    bad = {"no_commodity": df["commodity"].isna() | df["commodity"].isin(UNKNOWN),
+           "no_unit":      df["unit"].isna() | df["unit"].isin(UNKNOWN),
+           "no_number":    df["number"].isna()}
+    reason = pd.Series("", index=df.index)
+    for name, mask in bad.items():
+        reason = reason.where(~mask, reason + ";" + name)
+    reason = reason.str.lstrip(";")
+    ok = reason == ""
+
+    parsed = df.loc[ok, ["file","line","commodity","unit","number"]].assign(
+        template=TEMPLATE, confidence=df.loc[ok, "confidence"])
+    parsed.to_csv(TEMPLATES_CSV, index=False)
+    (parsed.groupby(["commodity","unit"], sort=True).size().rename("count").reset_index()
+           .to_csv(COMM_UNIT_CSV, index=False))
+    df.loc[~ok, ["file","line","translation"]].assign(reason=reason[~ok]).to_csv(ANOMALIES_CSV, index=False)
 
     print("Wrote:")
     print(" -", TEMPLATES_CSV)
@@ -53,4 +46,4 @@ def main():
     print(" -", ANOMALIES_CSV)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
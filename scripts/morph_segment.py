@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Unsupervised morphological segmentation of sign segments (MDL, Morfessor-style).
+
+Every segment is analysed as  PREFIX* STEM SUFFIX*.  The model is a lexicon
+of morph counts per category (kept in sign tries, so all morphs starting at
+a position are found in one walk). Each iteration
+  1. resegments every sequence with Viterbi under the current model
+     (in parallel worker processes when --workers > 1),
+  2. re-estimates the lexicon from the new analyses,
+and stops when no analysis changes or the total description length
+(corpus cost + lexicon cost) stops improving.
+
+Outputs:
+  out/tables/morph_lexicon.csv         (category, morph, count)
+  out/tables/morph_segmentations.csv   (segment, count, prefixes, stem, suffixes, cost)
+"""
+import math, csv, argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from morph_miner import segments_from_dir
+from sign_matcher import SignTrie
+import profiling
+
+CATS = ("prefix", "stem", "suffix")
+
+class Model:
+    def __init__(self, counts, n_signs, max_affix, max_stem, new_morph_cost):
+        self.max_affix, self.max_stem = max_affix, max_stem
+        self.tries = {c: SignTrie() for c in CATS}
+        self.totals = {c: 0 for c in CATS}
+        for (cat, morph), n in counts.items():
+            self.tries[cat].add(morph, n)
+            self.totals[cat] += n
+        self.sign_cost = math.log(max(2, n_signs))
+        self.new_cost = new_morph_cost
+
+    def known_cost(self, cat, n, length):
+        # token cost + the morph's lexicon entry amortized over its uses (MDL)
+        return -math.log(n / (self.totals[cat] + 1)) + length * self.sign_cost / n
+
+    def unseen_cost(self, cat, length):
+        # reserved mass for an unseen morph + spelling it out sign by sign
+        return math.log(self.totals[cat] + 1) + length * self.sign_cost + self.new_cost
+
+    def spans(self, seq, i, cat):
+        """(end, cost) for each candidate morph of category cat starting at i."""
+        max_len = self.max_stem if cat == "stem" else self.max_affix
+        seen = {}
+        for end, n in self.tries[cat].walk(seq, i, max_len):
+            if n: seen[end] = self.known_cost(cat, n, end - i)
+        for end in range(i + 1, min(len(seq), i + max_len) + 1):
+            if end not in seen:
+                seen[end] = self.unseen_cost(cat, end - i)
+        return seen.items()
+
+    def lexicon_cost(self):
+        return sum(len(m) * self.sign_cost for c in CATS for m, _ in self.tries[c].items())
+
+def viterbi(seq, model):
+    """Best PREFIX* STEM SUFFIX* analysis -> (cost, prefixes, stem, suffixes)."""
+    n = len(seq)
+    INF = float("inf")
+    # phase 0 = still reading prefixes, phase 1 = stem done, reading suffixes
+    best = [[INF, INF] for _ in range(n + 1)]
+    back = [[None, None] for _ in range(n + 1)]
+    best[0][0] = 0.0
+    for i in range(n):
+        if best[i][0] < INF:
+            for end, c in model.spans(seq, i, "prefix"):
+                if end < n and best[i][0] + c < best[end][0]:
+                    best[end][0] = best[i][0] + c; back[end][0] = (i, 0, "prefix")
+            for end, c in model.spans(seq, i, "stem"):
+                if best[i][0] + c < best[end][1]:
+                    best[end][1] = best[i][0] + c; back[end][1] = (i, 0, "stem")
+        if best[i][1] < INF:
+            for end, c in model.spans(seq, i, "suffix"):
+                if best[i][1] + c < best[end][1]:
+                    best[end][1] = best[i][1] + c; back[end][1] = (i, 1, "suffix")
+    parts = {c: [] for c in CATS}
+    pos, phase = n, 1
+    while pos > 0:
+        i, ph, cat = back[pos][phase]
+        parts[cat].append(tuple(seq[i:pos]))
+        pos, phase = i, ph
+    return best[n][1], parts["prefix"][::-1], parts["stem"][0], parts["suffix"][::-1]
+
+def _segment_chunk(args):
+    seqs, model = args
+    return [viterbi(s, model) for s in seqs]
+
+def resegment(distinct, model, workers=1, chunk=2000):
+    jobs = [(distinct[i:i+chunk], model) for i in range(0, len(distinct), chunk)]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            return [r for part in ex.map(profiling.wrap(_segment_chunk), jobs) for r in part]
+    return [r for job in jobs for r in _segment_chunk(job)]
+
+def initial_counts(freq, max_affix):
+    """Soft start: every PREFIX? STEM SUFFIX? split shares its segment's count."""
+    counts = Counter()
+    for seq, n in freq.items():
+        splits = [(p, s) for p in range(0, max_affix + 1) for s in range(0, max_affix + 1)
+                  if p + s < len(seq)]
+        w = n / len(splits)
+        for p, s in splits:
+            if p: counts[("prefix", seq[:p])] += w
+            counts[("stem", seq[p:len(seq)-s])] += w
+            if s: counts[("suffix", seq[len(seq)-s:])] += w
+    return counts
+
+def train(freq, max_affix=2, max_stem=6, new_morph_cost=2.0, max_iter=20, tol=1e-4, workers=1):
+    """Alternate re-estimating the lexicon and Viterbi resegmentation; returns the
+    (model, segmentation) pair with the lowest description length seen."""
+    distinct = list(freq)
+    n_signs = len({s for seq in distinct for s in seq})
+    model = Model(initial_counts(freq, max_affix), n_signs, max_affix, max_stem, new_morph_cost)
+    analyses = resegment(distinct, model, workers)
+    best = None                                     # (model, its analyses, description length)
+    for it in range(1, max_iter + 1):
+        counts = Counter()
+        for seq, (_, pre, stem, suf) in zip(distinct, analyses):
+            n = freq[seq]
+            for m in pre: counts[("prefix", m)] += n
+            counts[("stem", stem)] += n
+            for m in suf: counts[("suffix", m)] += n
+        model = Model(counts, n_signs, max_affix, max_stem, new_morph_cost)
+        new = resegment(distinct, model, workers)
+        total = sum(freq[seq] * a[0] for seq, a in zip(distinct, new)) + model.lexicon_cost()
+        print(f"iter {it}: description length {total:.2f} (lexicon {sum(model.totals.values())} tokens)")
+        if best and best[2] - total < tol * max(1.0, abs(best[2])):
+            if total > best[2]:                     # got worse: keep the previous pair
+                model, new = best[0], best[1]
+            analyses = new
+            break
+        changed = any(a[1:] != b[1:] for a, b in zip(new, analyses))
+        best, analyses = (model, new, total), new
+        if not changed:
+            break
+    return model, dict(zip(distinct, analyses))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Learn a stem/affix lexicon and segment sequences with Viterbi.")
+    ap.add_argument("-d","--dir", required=True, help="data/clean")
+    ap.add_argument("-o","--outdir", default="out/tables")
+    ap.add_argument("--minlen", type=int, default=2, help="min AB tokens per segment")
+    ap.add_argument("--max-affix", type=int, default=2, help="max signs per prefix/suffix morph")
+    ap.add_argument("--max-stem", type=int, default=6)
+    ap.add_argument("--new-morph-cost", type=float, default=2.0, help="extra nats to add a morph to the lexicon")
+    ap.add_argument("--max-iter", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=1)
+    a = ap.parse_args()
+
+    freq = Counter(tuple(s) for s in segments_from_dir(Path(a.dir)) if len(s) >= a.minlen)
+    model, seg = train(freq, a.max_affix, a.max_stem, a.new_morph_cost, a.max_iter, workers=a.workers)
+
+    out = Path(a.outdir); out.mkdir(parents=True, exist_ok=True)
+    with (out/"morph_lexicon.csv").open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(["category","morph","count"])
+        for cat in CATS:
+            for m, n in sorted(model.tries[cat].items(), key=lambda x: -x[1]):
+                w.writerow([cat, " ".join(m), n])
+    with (out/"morph_segmentations.csv").open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(["segment_tokens","count","prefixes","stem","suffixes","cost"])
+        for seq, n in freq.most_common():
+            cost, pre, stem, suf = seg[seq]
+            w.writerow([" ".join(seq), n, " + ".join(" ".join(m) for m in pre), " ".join(stem),
+                        " + ".join(" ".join(m) for m in suf), round(cost, 3)])
+    print("Wrote: out/tables/morph_lexicon.csv, morph_segmentations.csv")
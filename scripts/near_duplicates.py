@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for segments, lines or whole tablets.
+
+Each item is reduced to a set of k-sign shingles, summarized by a MinHash
+signature and bucketed with LSH banding, so only items sharing a band are
+ever compared. Candidate pairs are verified with the exact Jaccard score
+and joined into variant clusters (union-find).
+
+Outputs:
+  out/tables/near_dup_<level>_index.npz     (labels + signatures + LSH params)
+  out/tables/near_dup_<level>_clusters.csv  (candidate variant clusters)
+"""
+import argparse, csv
+from pathlib import Path
+from collections import defaultdict
+import numpy as np
+
+from words_from_segments import AB, tokenize_line, read_segments
+
+PRIME = (1 << 31) - 1   # keeps a*x+b inside int64
+
+def items_from_dir(indir: Path, level: str, min_len=2):
+    """Return (labels, sequences) for level in {segment, line, tablet}."""
+    labels, seqs = [], []
+    if level == "segment":
+        where = defaultdict(list)
+        for f in sorted(indir.glob("*.txt")):
+            for s in read_segments(f):
+                if len(s) >= min_len:
+                    where[tuple(s)].append(f.name)
+        for seg, files in where.items():
+            labels.append(f"{' '.join(seg)}  [{len(files)}× {', '.join(sorted(set(files)))}]")
+            seqs.append(list(seg))
+        return labels, seqs
+    for f in sorted(indir.glob("*.txt")):
+        tablet = []
+        for li, raw in enumerate(f.read_text(encoding="utf-8").splitlines(), start=1):
+            signs = [t.upper() for t in tokenize_line(raw) if AB.fullmatch(t)]
+            if level == "line" and len(signs) >= min_len:
+                labels.append(f"{f.name}:{li}"); seqs.append(signs)
+            tablet.extend(signs)
+        if level == "tablet" and len(tablet) >= min_len:
+            labels.append(f.name); seqs.append(tablet)
+    return labels, seqs
+
+def shingles(seq, k=2):
+    if len(seq) <= k:
+        return {tuple(seq)}
+    return {tuple(seq[i:i+k]) for i in range(len(seq)-k+1)}
+
+def lsh_params(num_perm, threshold):
+    """Pick (bands, rows) with bands*rows <= num_perm whose S-curve knee ~ threshold."""
+    best = None
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        if b == 0: break
+        err = abs((1.0 / b) ** (1.0 / r) - threshold)
+        if best is None or err < best[0]:
+            best = (err, b, r)
+    return best[1], best[2]
+
+class MinHasher:
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, PRIME, size=num_perm, dtype=np.int64)
+        self.ids = {}
+
+    def signature(self, sh):
+        x = np.fromiter((self.ids.setdefault(s, len(self.ids)) for s in sh), dtype=np.int64)
+        return ((np.outer(self.a, x) + self.b[:, None]) % PRIME).min(axis=1)
+
+    def signatures(self, shingle_sets):
+        return np.vstack([self.signature(sh) for sh in shingle_sets]) if shingle_sets \
+            else np.empty((0, len(self.a)), dtype=np.int64)
+
+def lsh_candidates(sigs, bands, rows):
+    """Yield each candidate pair (i<j) once: items sharing any full band."""
+    seen = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = sigs[:, band*rows:(band+1)*rows]
+        for i, key in enumerate(map(bytes, chunk)):
+            buckets[key].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x+1, len(members)):
+                    p = (members[x], members[y])
+                    if p not in seen:
+                        seen.add(p); yield p
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if (a or b) else 1.0
+
+def clusters(n, pairs):
+    parent = list(range(n))
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]; x = parent[x]
+        return x
+    for i, j in pairs:
+        parent[find(i)] = find(j)
+    groups = defaultdict(list)
+    for i in range(n):
+        groups[find(i)].append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="MinHash/LSH near-duplicate segments, lines or tablets.")
+    ap.add_argument("-d","--dir", required=True, help="data/clean")
+    ap.add_argument("-o","--outdir", default="out/tables")
+    ap.add_argument("--level", choices=["segment","line","tablet"], default="segment")
+    ap.add_argument("--threshold", type=float, default=0.5, help="minimum Jaccard similarity")
+    ap.add_argument("--shingle", type=int, default=2, help="signs per shingle")
+    ap.add_argument("--num-perm", type=int, default=128)
+    ap.add_argument("--min-len", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=1)
+    a = ap.parse_args()
+
+    labels, seqs = items_from_dir(Path(a.dir), a.level, a.min_len)
+    sh = [shingles(s, a.shingle) for s in seqs]
+    hasher = MinHasher(a.num_perm, a.seed)
+    sigs = hasher.signatures(sh)
+    bands, rows = lsh_params(a.num_perm, a.threshold)
+
+    pairs, n_cand = [], 0
+    for i, j in lsh_candidates(sigs, bands, rows):
+        n_cand += 1
+        if jaccard(sh[i], sh[j]) >= a.threshold:
+            pairs.append((i, j))
+    groups = sorted(clusters(len(seqs), pairs), key=len, reverse=True)
+
+    out = Path(a.outdir); out.mkdir(parents=True, exist_ok=True)
+    idx_path = out/f"near_dup_{a.level}_index.npz"
+    np.savez_compressed(idx_path, labels=np.array(labels, dtype=str), signatures=sigs,
+                        a=hasher.a, b=hasher.b, bands=bands, rows=rows,
+                        shingle=a.shingle, threshold=a.threshold)
+
+    rep_path = out/f"near_dup_{a.level}_clusters.csv"
+    with rep_path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(["cluster","size","item","tokens","jaccard_to_first"])
+        for ci, g in enumerate(groups, start=1):
+            g = sorted(g, key=lambda i: labels[i])
+            for i in g:
+                w.writerow([ci, len(g), labels[i], " ".join(seqs[i]),
+                            round(jaccard(sh[g[0]], sh[i]), 3)])
+
+    print(f"{len(seqs)} {a.level}s, {bands}×{rows} bands, {n_cand} candidates, "
+          f"{len(pairs)} pairs ≥ {a.threshold}, {len(groups)} clusters")
+    print(f"Wrote {idx_path} and {rep_path}")
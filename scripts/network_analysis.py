@@ -1,49 +1,53 @@
 #!/usr/bin/env python3
+import argparse
 import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
 from pathlib import Path
+from plotting import PlotQueue, add_plot_args
+
+def adjacency(pairs):
+    """Undirected adjacency {node: {neighbour: None}} in first-seen order (same order as nx.Graph)."""
+    adj = {}
+    for pair in pairs:
+        a, b = (x.strip() for x in pair.split(" + "))
+        adj.setdefault(a, {})[b] = None
+        adj.setdefault(b, {})[a] = None
+    return adj
 
 def main(in_csv="out/tables/cooccurrence_full.csv",
          out_csv="out/tables/network_stats.csv",
-         out_png="out/plots/commodity_network.png"):
+         out_png="out/plots/commodity_network.png",
+         plots=None):
 
     df = pd.read_csv(in_csv)
 
     # Build graph
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        a, b = row["pair"].split(" + ")
-        G.add_edge(a.strip(), b.strip())
+    adj = adjacency(df["pair"])
 
-    # Compute stats
+    # Compute stats (a self-pair counts twice, as in networkx)
     stats = []
-    for node in G.nodes():
+    for node, nbrs in adj.items():
         stats.append({
             "stem": node,
-            "degree": G.degree(node),
-            "neighbors": ", ".join(G.neighbors(node))
+            "degree": len(nbrs) + (node in nbrs),
+            "neighbors": ", ".join(nbrs)
         })
 
     # Save stats
     out_path_csv = Path(out_csv)
     out_path_csv.parent.mkdir(parents=True, exist_ok=True)
     pd.DataFrame(stats).to_csv(out_path_csv, index=False)
-
-    # Draw graph
-    plt.figure(figsize=(10,8))
-    pos = nx.spring_layout(G, seed=42)
-    nx.draw_networkx_nodes(G, pos, node_size=800, node_color="lightblue")
-    nx.draw_networkx_edges(G, pos, width=1.0, alpha=0.6)
-    nx.draw_networkx_labels(G, pos, font_size=8)
-    plt.title("Linear A Commodity Network")
-    plt.axis("off")
-
-    out_path_png = Path(out_png)
-    out_path_png.parent.mkdir(parents=True, exist_ok=True)
-    plt.savefig(out_path_png, dpi=300, bbox_inches="tight")
     print(f"Wrote network stats to {out_path_csv}")
-    print(f"Wrote network graph to {out_path_png}")
+
+    # Draw graph (spring layout runs in the plot worker)
+    plots = plots or PlotQueue()
+    plots.add("network", out_png, dict(nodes=list(adj), edges=[(a, b) for a in adj for b in adj[a]]),
+              figsize=(10,8), seed=42, dpi=300, bbox="tight", title="Linear A Commodity Network")
+    plots.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Commodity co-occurrence network: degree stats and graph.")
+    ap.add_argument("-i","--input", default="out/tables/cooccurrence_full.csv")
+    ap.add_argument("-o","--out", default="out/tables/network_stats.csv")
+    ap.add_argument("--png", default="out/plots/commodity_network.png")
+    a = add_plot_args(ap).parse_args()
+    main(a.input, a.out, a.png, PlotQueue.from_args(a))
@@ -1,16 +1,25 @@
 #!/usr/bin/env python3
-import re, argparse
+import re, json, hashlib, argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import profiling
 
 AB = re.compile(r"\bAB\d{1,3}\b", re.I)
 IDEO = re.compile(r"\*\d+[A-Z]+", re.I)     # e.g. *201VAS
 NUM = re.compile(r"\b\d+\b")
 LABEL = re.compile(r"^(?:\.?\d+[a-z]?|line\s+\d+|ht|kh|za|pk)\b", re.I)
 STRIP = re.compile(r"[,\[\]•·;]")
+# one pass per line: whitespace-delimited tokens that are exactly an ideogram, AB sign or number
+TOKEN = re.compile(r"(?<!\S)(?:(?P<ideo>\*\d+[A-Z]+)|(?P<ab>AB\d{1,3})|(?P<num>\d+))(?!\S)", re.I)
+# same, plus standalone '?' lacuna markers ('[?]' becomes '?' once brackets are stripped)
+TOKEN_GAPS = re.compile(r"(?<!\S)(?:(?P<ideo>\*\d+[A-Z]+)|(?P<ab>AB\d{1,3})|(?P<num>\d+)|(?P<gap>\?))(?!\S)", re.I)
 
-def normalize_file(src: Path, dst: Path):
+MANIFEST = ".normalize_manifest.json"
+
+def normalize_text(text: str, keep_gaps=False) -> str:
+    token = TOKEN_GAPS if keep_gaps else TOKEN
     out = []
-    for raw in src.read_text(encoding="utf-8").splitlines():
+    for raw in text.splitlines():
         s = STRIP.sub(" ", raw).strip()
         if not s:
             out.append("")
@@ -18,21 +27,66 @@ def normalize_file(src: Path, dst: Path):
         if s.lower().startswith(("line ", ".")) or LABEL.match(s):
             out.append(s)
             continue
-        toks = s.split()
-        kept = []
-        for t in toks:
-            if IDEO.fullmatch(t) or AB.fullmatch(t) or NUM.fullmatch(t):
-                kept.append(t.upper())
-        out.append(" ".join(kept))
-    dst.write_text("\n".join(out), encoding="utf-8")
+        out.append(" ".join(m.group().upper() for m in token.finditer(s)))
+    return "\n".join(out)
+
+def normalize_file(src: Path, dst: Path, keep_gaps=False):
+    dst.write_text(normalize_text(src.read_text(encoding="utf-8"), keep_gaps), encoding="utf-8")
+
+def digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _normalize_batch(batch, keep_gaps=False):
+    """Normalize a batch of (src, dst) pairs; returns [(name, src_hash, dst_hash)]."""
+    done = []
+    for src, dst in batch:
+        raw = src.read_bytes()
+        text = normalize_text(raw.decode("utf-8"), keep_gaps).encode("utf-8")
+        dst.write_bytes(text)
+        done.append((src.name, digest(raw), digest(text)))
+    return done
+
+def normalize_dir(in_dir: Path, out_dir: Path, workers=1, batch=200, force=False, keep_gaps=False):
+    """Normalize *.txt from in_dir into out_dir, skipping files whose source and
+    output still match the hashes recorded on the previous run."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mpath = out_dir / MANIFEST
+    manifest = {} if force or not mpath.exists() else json.loads(mpath.read_text(encoding="utf-8"))
+
+    todo, skipped = [], 0
+    for p in sorted(in_dir.glob("*.txt")):
+        dst = out_dir / p.name
+        prev = manifest.get(p.name)
+        if prev and dst.exists() and prev.get("gaps", False) == keep_gaps \
+                and prev["src"] == digest(p.read_bytes()) \
+                and prev["dst"] == digest(dst.read_bytes()):
+            skipped += 1
+            continue
+        todo.append((p, dst))
+
+    jobs = [todo[i:i+batch] for i in range(0, len(todo), batch)]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers) as ex:
+            results = [r for part in ex.map(profiling.wrap(_normalize_batch), jobs, [keep_gaps] * len(jobs)) for r in part]
+    else:
+        results = [r for job in jobs for r in _normalize_batch(job, keep_gaps)]
+
+    for name, src_hash, dst_hash in results:
+        manifest[name] = {"src": src_hash, "dst": dst_hash}
+        if keep_gaps:
+            manifest[name]["gaps"] = True
+    mpath.write_text(json.dumps(manifest, indent=0, sort_keys=True), encoding="utf-8")
+    return len(results), skipped
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("-i","--in-dir", required=True)
     ap.add_argument("-o","--out-dir", required=True)
+    ap.add_argument("--workers", type=int, default=1, help="worker processes")
+    ap.add_argument("--batch", type=int, default=200, help="files per worker task")
+    ap.add_argument("--force", action="store_true", help="ignore the manifest and rewrite every file")
+    ap.add_argument("--keep-gaps", action="store_true", help="keep '?' / '[?]' lacuna markers (for restore_signs.py)")
     args = ap.parse_args()
     in_dir, out_dir = Path(args.in_dir), Path(args.out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
-    for p in sorted(in_dir.glob("*.txt")):
-        normalize_file(p, out_dir / p.name)
-    print(f"Normalized files → {out_dir}")
\ No newline at end of file
+    written, skipped = normalize_dir(in_dir, out_dir, args.workers, args.batch, args.force, args.keep_gaps)
+    print(f"Normalized {written} files ({skipped} unchanged, skipped) → {out_dir}")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Headless, queued plot rendering shared by the analysis scripts
+(analyze_matrix, analyze_volumes, cluster_bundles, network_analysis,
+report_volumes).
+
+A plot is a job: (kind, output path, data, spec). Scripts write their
+numeric outputs first and then hand figures to a PlotQueue, which renders
+them in a background process pool; matplotlib (always the Agg backend) and
+networkx are only imported inside the workers.
+
+  kinds     scatter        x, y, optional c / s / labels
+            stacked_bars   categories, series [(label, values), ...]
+            network        nodes, edges [(a, b), ...] (spring layout)
+  thinning  dense scatter labels keep one label per grid cell (outliers
+            first), at most spec["max_labels"]
+  cache     one .plot_manifest.json per output directory (render_cache):
+            a plot whose data + spec hash is unchanged and whose file
+            exists is not re-rendered
+"""
+import os, pickle, sys
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from render_cache import RenderCache
+
+os.environ["MPLBACKEND"] = "Agg"
+PLOT_VERSION = "1"          # bump when a renderer's output changes
+MANIFEST = ".plot_manifest.json"
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    import matplotlib.pyplot as plt
+    return plt
+
+def thin_labels(x, y, max_labels=60, min_dist=0.03, priority=None):
+    """Indices of points to label: one per min_dist grid cell (axes scaled to [0, 1]), highest priority first."""
+    P = np.column_stack([x, y]).astype(float)
+    if len(P) <= 1:
+        return np.arange(len(P))
+    lo, span = P.min(axis=0), np.ptp(P, axis=0)
+    U = (P - lo) / np.where(span > 0, span, 1.0)
+    if priority is None:
+        priority = ((U - U.mean(axis=0)) ** 2).sum(axis=1)       # outliers first
+    order = np.argsort(-np.asarray(priority, float), kind="stable")
+    cells = np.floor(U[order] / min_dist).astype(np.int64)
+    _, first = np.unique(cells[:, 0] * (int(1 / min_dist) + 2) + cells[:, 1], return_index=True)
+    return np.sort(order[np.sort(first)][:max_labels])
+
+def _scatter(plt, d, spec):
+    fig, ax = plt.subplots(figsize=spec.get("figsize", (8, 6)))
+    x, y = np.asarray(d["x"]), np.asarray(d["y"])
+    ax.scatter(x, y, c=d.get("c", spec.get("color")), s=d.get("s", spec.get("size")), alpha=spec.get("alpha"))
+    labels = d.get("labels")
+    if labels is not None:
+        keep = thin_labels(x, y, spec.get("max_labels", 60), spec.get("min_dist", 0.03))
+        dx, dy = spec.get("label_offset", (0.02, 0.02))
+        fs = spec.get("fontsize", 8)
+        for i in keep:
+            if spec.get("offset_points"):
+                ax.annotate(labels[i], (x[i], y[i]), xytext=(dx, dy), textcoords="offset points", fontsize=fs)
+            else:
+                ax.text(x[i] + dx, y[i] + dy, labels[i], fontsize=fs)
+    if spec.get("grid"):
+        ax.grid(True, linestyle=spec["grid"])
+    return fig, ax
+
+def _stacked_bars(plt, d, spec):
+    fig, ax = plt.subplots(figsize=spec.get("figsize", (10, 6)))
+    x = np.arange(len(d["categories"]))
+    bottom = np.zeros(len(x))
+    for label, values in d["series"]:
+        values = np.asarray(values, float)
+        ax.bar(x, values, bottom=bottom, label=label)
+        bottom += values
+    ax.set_xticks(x, d["categories"], rotation=45, ha="right")
+    ax.legend()
+    return fig, ax
+
+def _network(plt, d, spec):
+    import networkx as nx
+    G = nx.Graph()
+    G.add_nodes_from(d["nodes"])
+    G.add_edges_from(d["edges"])
+    fig, ax = plt.subplots(figsize=spec.get("figsize", (10, 8)))
+    pos = nx.spring_layout(G, seed=spec.get("seed", 42))
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_size=spec.get("node_size", 800), node_color=spec.get("color", "lightblue"))
+    nx.draw_networkx_edges(G, pos, ax=ax, width=1.0, alpha=0.6)
+    nx.draw_networkx_labels(G, pos, ax=ax, font_size=spec.get("fontsize", 8))
+    ax.axis("off")
+    return fig, ax
+
+RENDERERS = {"scatter": _scatter, "stacked_bars": _stacked_bars, "network": _network}
+
+def render(kind, out, data, spec):
+    """Render one job to out (runs in a worker); returns the path."""
+    plt = _pyplot()
+    fig, ax = RENDERERS[kind](plt, data, spec)
+    for attr in ("title", "xlabel", "ylabel"):
+        if attr in spec:
+            getattr(ax, f"set_{attr}")(spec[attr])
+    if spec.get("tight_layout"):
+        fig.tight_layout()
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out, dpi=spec.get("dpi", 150), bbox_inches=spec.get("bbox"))
+    plt.close(fig)
+    return out
+
+def _plain(v):
+    """pandas/sequence -> numpy or list so job payloads pickle (and hash) the same way every run."""
+    if hasattr(v, "to_numpy"):
+        return v.to_numpy()
+    if isinstance(v, (list, tuple)) and v and isinstance(v[0], tuple):
+        return [tuple(_plain(x) for x in t) for t in v]
+    return v
+
+class PlotQueue:
+    """Collects plot jobs, renders stale ones in a background pool, waits in close().
+
+    workers=0 renders in-process at close(); enabled=False drops every job.
+    """
+    def __init__(self, workers=1, force=False, enabled=True):
+        self.workers, self.force, self.enabled = workers, force, enabled
+        self._caches, self._jobs, self._pool = {}, [], None
+        self.skipped, self.failed = 0, 0
+
+    @classmethod
+    def from_args(cls, a):
+        return cls(a.plot_workers, a.force_plots, not a.no_plot)
+
+    def _cache(self, outdir):
+        outdir = Path(outdir)
+        if outdir not in self._caches:
+            self._caches[outdir] = RenderCache(outdir, manifest=MANIFEST)   # force skips lookups, keeps other entries
+        return self._caches[outdir]
+
+    def add(self, kind, out, data, **spec):
+        if not self.enabled:
+            return
+        out = Path(out)
+        data = {k: _plain(v) for k, v in data.items()}
+        cache = self._cache(out.parent)
+        key = cache.key(PLOT_VERSION, kind, pickle.dumps((sorted(data.items()), sorted(spec.items())), protocol=4))
+        if not self.force and cache.fresh(out.name, key):
+            self.skipped += 1
+            print(f"Plot unchanged: {out}")
+            return
+        job = (kind, str(out), data, spec)
+        if self.workers > 0:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            fut = self._pool.submit(render, *job)
+        else:
+            fut = None
+        self._jobs.append((out, key, job, fut))
+
+    def close(self):
+        for out, key, job, fut in self._jobs:
+            try:
+                fut.result() if fut is not None else render(*job)
+            except Exception as e:           # numeric outputs are already on disk; report and go on
+                self.failed += 1
+                print(f"Plot failed: {out} ({e})", file=sys.stderr)
+                continue
+            self._cache(out.parent).mark(out.name, key)
+            print(f"Wrote {out}")
+        self._jobs = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for cache in self._caches.values():
+            cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        elif self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+def add_plot_args(ap):
+    ap.add_argument("--no-plot", action="store_true", help="numeric outputs only (skips matplotlib)")
+    ap.add_argument("--plot-workers", type=int, default=1, help="background plot processes (0 = render in-process)")
+    ap.add_argument("--force-plots", action="store_true", help="re-render plots even if their data is unchanged")
+    return ap
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Opt-in cProfile capture per stage, hooked into instrument.stage().
+
+Turn it on with LINA_PROFILE=1 (or a directory), `linA --profile <cmd>`,
+`instrument.py run --profile <script>` or `run_pipeline.sh --profile`.
+Each outermost stage then runs under cProfile (nested stages are part of
+their parent's profile) and leaves in out/profiles/<run id>/:
+
+  <stage>.pstats      merged profile (parent + every worker process)
+  <stage>.collapsed   "a;b;c <µs>" stacks for flamegraph.pl / speedscope / inferno
+  <stage>.top.txt     top-N functions by cumulative and by own time
+
+Worker pools: wrap the mapped function with profiling.wrap(fn). With
+profiling off it is fn itself; with it on each worker keeps one profile
+and rewrites <stage>.worker-<pid>.pstats after every task, and the parent
+merges those files when the stage ends.
+
+  python3 scripts/profiling.py top out/profiles/<run>/build_publications.main.pstats -n 30
+  python3 scripts/profiling.py collapse out/profiles/<run>/x.pstats > x.collapsed
+"""
+import os, io, sys, cProfile, pstats, argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+TOP_N = 25
+_active = None        # the profiler of the open outermost stage in this process
+_worker = (None, None)  # (pid, profiler) inside a pool worker
+
+def profile_dir(run_id):
+    """Where this run's profiles go, or None when profiling is off."""
+    v = os.environ.get("LINA_PROFILE", "")
+    if not v or v == "0":
+        return None
+    base = ROOT / "out" / "profiles" if v == "1" else Path(v)
+    return base / run_id
+
+def _safe(name):
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+
+def start():
+    """Profile the current outermost stage; None if a stage in this process is already profiled."""
+    global _active
+    if _active is not None:
+        return None
+    _active = cProfile.Profile()
+    _active.enable()
+    return _active
+
+def finish(prof, stage, outdir, top=TOP_N):
+    """Stop prof, merge worker dumps for this stage and write .pstats/.collapsed/.top.txt."""
+    global _active
+    prof.disable()
+    _active = None
+    outdir.mkdir(parents=True, exist_ok=True)
+    base = outdir / _safe(stage)
+    stats = pstats.Stats(prof)
+    workers = sorted(outdir.glob(f"{_safe(stage)}.worker-*.pstats"))
+    for w in workers:
+        stats.add(str(w))
+        w.unlink()
+    stats.dump_stats(f"{base}.pstats")
+    Path(f"{base}.collapsed").write_text("".join(f"{s} {v}\n" for s, v in collapse(stats)), encoding="utf-8")
+    Path(f"{base}.top.txt").write_text(top_text(stats, top, f"{stage} ({len(workers)} worker profiles merged)"),
+                                       encoding="utf-8")
+    return base
+
+def top_text(stats, n=TOP_N, title=""):
+    buf = io.StringIO()
+    stats.stream = buf
+    if title:
+        buf.write(f"# {title}\n")
+    stats.sort_stats("cumulative").print_stats(n)
+    stats.sort_stats("tottime").print_stats(n)
+    return buf.getvalue()
+
+def _label(func):
+    file, line, name = func
+    if file == "~":
+        return name                                   # builtins: "<built-in method ...>"
+    return f"{Path(file).stem}:{name}:{line}"
+
+def collapse(stats, min_share=1e-4, max_depth=64):
+    """Approximate stacks from cProfile's caller edges (cProfile keeps no full stacks).
+
+    Walk down from the roots; a frame's time is split between its own time and
+    its call edges in proportion to their totals, so the stacks add up to the
+    profiled time.
+    Recursion is cut at the first repeat of a function on the path, and calls
+    worth less than min_share of the total (or past max_depth) are folded into
+    an "[other]" frame: the number of paths through a call graph grows
+    exponentially with its depth."""
+    raw = stats.stats                                 # func -> (cc, nc, tt, ct, callers)
+    children = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [f for f, v in raw.items() if not v[4]]
+    floor = max(sum(raw[r][3] for r in roots) * min_share, 1e-6)
+    out = {}
+    def walk(func, budget, path):
+        tt = raw[func][2]
+        kids = [(c, e) for c, e in children.get(func, []) if c not in path]
+        whole = tt + sum(e for _, e in kids)          # not ct: recursive edges count time twice
+        scale = 1.0 if budget is None else (budget / whole if whole > 0 else 0.0)
+        path = path + (func,)
+        key = ";".join(map(_label, path))
+        own, rest = tt * scale, 0.0
+        for child, edge_ct in kids:
+            if edge_ct * scale >= floor and len(path) < max_depth:
+                walk(child, edge_ct * scale, path)
+            else:
+                rest += edge_ct * scale
+        for k, v in ((key, own), (key + ";[other]", rest)):
+            if v * 1e6 >= 1:
+                out[k] = out.get(k, 0) + int(v * 1e6)
+    for r in roots:
+        walk(r, None, ())                             # a root keeps all of its time
+    return sorted(out.items())
+
+# ---------- worker processes ----------
+
+class _Profiled:
+    """Picklable wrapper: profile fn in the worker, keep one profile per process, dump after each task."""
+    def __init__(self, fn, stage, outdir):
+        self.fn, self.stage, self.outdir = fn, stage, outdir
+
+    def __call__(self, *args, **kwargs):
+        global _worker
+        if _worker[0] != os.getpid():                 # first task in this process (forked state is the parent's)
+            _worker = (os.getpid(), cProfile.Profile())
+        prof = _worker[1]
+        prof.enable()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            prof.disable()
+            prof.dump_stats(str(self.outdir / f"{_safe(self.stage)}.worker-{os.getpid()}.pstats"))
+
+def wrap(fn):
+    """fn for pool.map(); profiled per worker when the current stage is being profiled."""
+    import instrument
+    outdir = profile_dir(instrument.RUN_ID)
+    if outdir is None or not instrument._stack:
+        return fn
+    outdir.mkdir(parents=True, exist_ok=True)
+    return _Profiled(fn, instrument._stack[0].name, outdir)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Read .pstats written by --profile runs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("top", help="top-N functions by cumulative and own time")
+    t.add_argument("pstats", nargs="+", help="one or more .pstats (merged)")
+    t.add_argument("-n", type=int, default=TOP_N)
+    c = sub.add_parser("collapse", help="collapsed stacks for flamegraph tools")
+    c.add_argument("pstats", nargs="+")
+    a = ap.parse_args()
+    stats = pstats.Stats(*a.pstats)
+    if a.cmd == "top":
+        print(top_text(stats, a.n, " + ".join(a.pstats)))
+    else:
+        sys.stdout.writelines(f"{s} {v}\n" for s, v in collapse(stats))
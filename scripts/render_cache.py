@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Shared rendering layer for the per-tablet text/Markdown writers
+(build_publications, render_translations, render_final, tablet_summarizer,
+ledger_reader).
+
+  templates   string.Template documents compiled once at import; their
+              source text is part of every cache key, so editing a template
+              re-renders everything that uses it
+  RenderCache one manifest per output directory (.render_manifest.json):
+              {file name: {"key": hash of the inputs, "out": hash of the text}}
+              fresh(name, key)  -> inputs unchanged and file present: skip rendering
+              put(name, key, text) queues a write; files whose text hash is
+              unchanged are not rewritten. Writes go out in batches and the
+              manifest is saved once per run.
+              drop(name)        -> delete a file whose input is gone
+  group_digests  one hash_pandas_object pass over a frame -> {group: digest}
+
+plotting.PlotQueue keeps its .plot_manifest.json files through the same class.
+"""
+import json, hashlib, os
+from pathlib import Path
+from string import Template
+import numpy as np
+import pandas as pd
+
+MANIFEST = ".render_manifest.json"
+
+def compile_templates(**sources):
+    """{name: Template}; Template objects keep .template for versioning."""
+    return {name: Template(text) for name, text in sources.items()}
+
+def digest(*parts) -> str:
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def group_digests(df: pd.DataFrame, by="file", cols=None) -> dict:
+    """{group value: digest of its rows (in frame order)} from one vectorized row hash."""
+    if df.empty:
+        return {}
+    cols = list(cols) if cols is not None else [c for c in df.columns if c != by]
+    h = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    codes, uniques = pd.factorize(df[by])
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0, True])
+    return {uniques[codes[order[a]]]: hashlib.sha1(h[order[a:b]].tobytes()).hexdigest()
+            for a, b in zip(bounds[:-1], bounds[1:])}
+
+class RenderCache:
+    def __init__(self, outdir, templates=(), force=False, batch=500, manifest=MANIFEST):
+        self.outdir = Path(outdir)
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self.path = self.outdir / manifest
+        self.version = digest(*(t.template for t in templates))
+        self.entries = {}
+        if not force and self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        self.batch, self._pending = batch, []
+        self.written, self.unchanged, self.skipped = [], 0, 0
+
+    def key(self, *parts) -> str:
+        """Cache key of one output: template version + its input digests."""
+        return digest(self.version, *parts)
+
+    def fresh(self, name, key) -> bool:
+        e = self.entries.get(name)
+        if e and e["key"] == key and (self.outdir / name).exists():
+            self.skipped += 1
+            return True
+        return False
+
+    def put(self, name, key, text):
+        out = digest(text)
+        e = self.entries.get(name)
+        self.entries[name] = {"key": key, "out": out}
+        if e and e["out"] == out and (self.outdir / name).exists():
+            self.unchanged += 1
+            return
+        self._pending.append((name, text))
+        if len(self._pending) >= self.batch:
+            self.flush()
+
+    def mark(self, name, key):
+        """Record a file written elsewhere (e.g. by a plot worker) under its key."""
+        self.entries[name] = {"key": key, "out": None}
+
+    def drop(self, name):
+        """Forget name and delete its file (its input is gone)."""
+        self.entries.pop(name, None)
+        (self.outdir / name).unlink(missing_ok=True)
+
+    def flush(self):
+        for name, text in self._pending:
+            (self.outdir / name).write_text(text, encoding="utf-8")
+            self.written.append(self.outdir / name)
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.entries, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+    def report(self):
+        return f"{len(self.written)} written, {self.unchanged} unchanged, {self.skipped} skipped (inputs unchanged)"
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
-import os, json, pandas as pd
+import os, json, argparse, pandas as pd
+
+from render_cache import RenderCache, compile_templates, group_digests
 
 BASE = os.path.dirname(os.path.dirname(__file__))
 OUT  = os.path.join(BASE, "outputs")
@@ -10,6 +12,8 @@ MASTER = os.path.join(OUT, "final_translations.csv")
 
 os.makedirs(FINAL_DIR, exist_ok=True)
 
+TEMPLATES = compile_templates(tablet="Linear A proto-decipherment — $file\n\n$lines")
+
 ENDING_MAP_NICE = {
     "big_jar":"big jar",
     "small_jar":"small jar",
@@ -20,7 +24,7 @@ ENDING_MAP_NICE = {
     "measure_tag":"measure tag",
 }
 
-def main():
+def main(force=False):
     if not os.path.exists(SUB):
         raise FileNotFoundError("Run scripts/substitute_dictionary.py first.")
     if not os.path.exists(LEXJ):
@@ -55,15 +59,22 @@ def main():
 
     out.to_csv(MASTER, index=False)
 
-    for file_name, g in out.groupby("file"):
-        txt = os.path.join(FINAL_DIR, f"{file_name.replace('.txt','')}_final.txt")
-        with open(txt, "w", encoding="utf-8") as f:
-            f.write(f"Linear A proto-decipherment — {file_name}\n\n")
-            for row in g.itertuples(index=False):
-                f.write(f"- {row.translation}\n")
+    with RenderCache(FINAL_DIR, TEMPLATES.values(), force) as cache:
+        digests = group_digests(out, "file")
+        for file_name, g in out.groupby("file"):
+            name = f"{file_name.replace('.txt','')}_final.txt"
+            key = cache.key(digests[file_name])
+            if cache.fresh(name, key):
+                continue
+            lines = "".join(f"- {t}\n" for t in g["translation"])
+            cache.put(name, key, TEMPLATES["tablet"].substitute(file=file_name, lines=lines))
+    for txt in cache.written:
         print("✔ wrote", txt)
+    print("Final translations:", cache.report())
 
     print("✔ wrote", MASTER)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Final per-tablet translations from the frozen lexicon.")
+    ap.add_argument("--force", action="store_true", help="ignore the render manifest and rewrite everything")
+    main(ap.parse_args().force)
\ No newline at end of file
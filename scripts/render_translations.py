@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
-import os
+import os, argparse
 import pandas as pd
 
+from render_cache import RenderCache, compile_templates, group_digests
+from confidence import confidence_column
+from volume_engine import UNIT_ALIASES
+from instrument import timed, current
+
 # -------- Paths (project-root aware) --------
 BASE = os.path.dirname(os.path.dirname(__file__))          # .../linearA-decipher
 OUT_DIR = os.path.join(BASE, "outputs")
@@ -12,93 +17,55 @@ MASTER_CSV = os.path.join(OUT_DIR, "proto_translations.csv")
 os.makedirs(OUT_DIR, exist_ok=True)
 os.makedirs(TRANS_DIR, exist_ok=True)
 
-# -------- Ending (container/unit) dictionary --------
-ENDING_MAP = {
-    "AB22 AB67": "big_jar",
-    "AB22 AB03": "small_jar",
-    "AB22 AB09": "amphoraA",
-    "AB22 AB59": "amphoraB",
-    "AB22 AB54": "unit?",
-    "AB22 AB28": "large_measure",
-    "AB22 AB40": "measure_tag",
-}
-
-# -------- Stem confidence tiers --------
-HIGH = {"grain", "oil", "wineA", "wineB"}
-MED  = {"prestige?", "commodity?"}
-# all others => low
-
-def confidence_for(stem_label: str, ending_label: str) -> str:
-    stem_label = (stem_label or "").strip()
-    ending_label = (ending_label or "").strip()
-
-    if stem_label in HIGH:
-        stem_conf = "high"
-    elif stem_label in MED:
-        stem_conf = "medium"
-    else:
-        stem_conf = "low"
-
-    end_word = ENDING_MAP.get(ending_label)
-    if end_word in {"big_jar","small_jar","amphoraA","amphoraB"}:
-        end_conf = "high"
-    elif end_word is not None:
-        end_conf = "medium"
-    else:
-        end_conf = "low"
-
-    order = {"low":0, "medium":1, "high":2}
-    return {0:"low", 1:"medium", 2:"high"}[min(order[stem_conf], order[end_conf])]
-
-def line_to_text(stem_label: str, ending_label: str, number, raw_span: str) -> str:
-    # fallbacks
-    stem_label = stem_label if isinstance(stem_label, str) and stem_label else None
-    ending_label = ending_label if isinstance(ending_label, str) and ending_label else None
-    number = int(number) if pd.notna(number) else 0
-
-    # choose commodity word
-    if stem_label and stem_label != "link?":
-        commodity = stem_label
-    else:
-        # fallback: first token in raw span
-        commodity = (raw_span or "").split()[0] if isinstance(raw_span, str) else "UNKNOWN"
-
-    # choose unit word
-    unit = ENDING_MAP.get(ending_label, ending_label if ending_label else "UNKNOWN_UNIT")
-
-    return f"{commodity.replace('_',' ')} in {str(unit).replace('_',' ')} ×{number}"
-
-def main():
-    if not os.path.exists(IN_CSV):
-        raise FileNotFoundError(f"Missing input: {IN_CSV}. Ensure tablets_substituted.csv is in outputs/")
-
-    df = pd.read_csv(IN_CSV)
-
+TEMPLATES = compile_templates(tablet="Proto-translations for $file\n\n$lines")
+
+def translation_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """"<commodity> in <unit> ×<n>" per line, kept structured: commodity, unit, number, translation.
+    The commodity is the stem label (the first raw sign when missing or "link?"), the unit
+    the ending label through volume_engine.UNIT_ALIASES; fallbacks are UNKNOWN and UNKNOWN UNIT."""
+    valid = lambda s: s.where(s.map(lambda x: isinstance(x, str) and x != ""))
+    stem = valid(df["stem_label"]).where(df["stem_label"] != "link?")
+    # fallback: first token in raw span
+    commodity = stem.fillna(valid(df["raw_span"]).str.split().str[0]).fillna("UNKNOWN")
+    ending = valid(df["ending_label"])
+    unit = ending.map(UNIT_ALIASES).fillna(ending).fillna("UNKNOWN_UNIT").astype(str)
+    nice = lambda s: s.str.replace("_", " ").str.split().str.join(" ")
+    # a missing count stays null here (mine_templates reports it) and reads ×0 in the text
+    out = pd.DataFrame({"commodity": nice(commodity), "unit": nice(unit),
+                        "number": pd.to_numeric(df["number"], errors="coerce").astype("Int64")},
+                       index=df.index)
+    out["translation"] = out["commodity"] + " in " + out["unit"] + " ×" + out["number"].fillna(0).astype(str)
+    return out
+
+def translate(df: pd.DataFrame) -> pd.DataFrame:
+    """tablets_substituted rows -> proto_translations rows, sorted by file and line."""
     # sanity: required columns
     required = {"file","line","translation","confidence","raw","stem_label","ending_label","number"}
     # we’ll build translation/confidence below if not present
     have = set(df.columns)
 
     # If translation not present, compose it now from stem/ending/number/raw
+    structured = {"stem_label","ending_label","number","raw_span"}.issubset(have)
     if "translation" not in df.columns:
-        if not {"stem_label","ending_label","number","raw_span"}.issubset(have):
+        if not structured:
             raise ValueError("Input is missing columns needed to compose translations: "
                              "expected stem_label, ending_label, number, raw_span")
-        df["translation"] = [
-            line_to_text(r.stem_label, r.ending_label, r.number, r.raw_span)
-            for r in df.itertuples(index=False)
-        ]
         # keep a 'raw' column for output continuity
         if "raw" not in df.columns:
             df["raw"] = df["raw_span"]
 
+    # Structured commodity/unit/number carried alongside the text (the translation is built from them)
+    if structured:
+        fields = translation_columns(df)
+        if "translation" in df.columns:
+            fields = fields.drop(columns="translation")
+        df[list(fields.columns)] = fields
+
     # If confidence not present, compute it
     if "confidence" not in df.columns:
         if not {"stem_label","ending_label"}.issubset(set(df.columns)):
             raise ValueError("Input is missing stem_label/ending_label needed for confidence scoring.")
-        df["confidence"] = [
-            confidence_for(r.stem_label, r.ending_label) for r in df.itertuples(index=False)
-        ]
+        df["confidence"] = confidence_column(df["stem_label"], df["ending_label"])
 
     # Normalize types for sorting: handle numeric or string 'line'
     if "line" not in df.columns:
@@ -117,26 +84,52 @@ def main():
 
     # Minimal output schema
     cols = ["file","line","translation","confidence"]
+    if structured:
+        cols += ["commodity","unit","number"]
     if "raw" in out.columns:
         cols.append("raw")
-    out = out[cols]
+    return out[cols]
 
-    # Write master CSV
-    out.to_csv(MASTER_CSV, index=False)
+def tablet_file(file_name):
+    return f"{file_name.replace('.txt','')}_translated.txt"
 
-    # Write per-tablet txt files
+def render_tablets(out: pd.DataFrame, cache: RenderCache):
+    """Queue the per-tablet txt files of out's tablets whose rows changed."""
+    digests = group_digests(out, "file")
     for file_name, g in out.groupby("file"):
+        name = tablet_file(file_name)
+        key = cache.key(digests[file_name])
+        if cache.fresh(name, key):
+            continue
         lines = [
             f"{row.translation}   [{row.confidence}]" + (f"   (raw: {row.raw})" if 'raw' in g.columns else "")
             for row in g.itertuples(index=False)
         ]
-        txt_path = os.path.join(TRANS_DIR, f"{file_name.replace('.txt','')}_translated.txt")
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(f"Proto-translations for {file_name}\n\n")
-            f.write("\n".join(lines))
+        cache.put(name, key, TEMPLATES["tablet"].substitute(file=file_name, lines="\n".join(lines)))
+
+@timed()
+def main(force=False):
+    if not os.path.exists(IN_CSV):
+        raise FileNotFoundError(f"Missing input: {IN_CSV}. Ensure tablets_substituted.csv is in outputs/")
+
+    df = pd.read_csv(IN_CSV)
+    st = current(); st.input(IN_CSV); st.output(MASTER_CSV, TRANS_DIR); st.rows_in = len(df)
+    out = translate(df)
+
+    # Write master CSV
+    out.to_csv(MASTER_CSV, index=False)
+    st.rows_out = len(out)
+
+    # Write per-tablet txt files (only tablets whose rows changed)
+    with RenderCache(TRANS_DIR, TEMPLATES.values(), force) as cache:
+        render_tablets(out, cache)
+    for txt_path in cache.written:
         print(f"✔ wrote {txt_path}")
+    print(f"Per-tablet translations: {cache.report()}")
 
     print(f"✔ wrote {MASTER_CSV}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Proto-translations per line and per tablet.")
+    ap.add_argument("--force", action="store_true", help="ignore the render manifest and rewrite everything")
+    main(ap.parse_args().force)
\ No newline at end of file
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
-import os
+import os, argparse
 import pandas as pd
-import matplotlib.pyplot as plt
+from plotting import PlotQueue, add_plot_args
+from instrument import timed, current
+from volume_engine import commodity_matrix, triad_columns, normalize_ratios, classify
 
 BASE = os.path.dirname(os.path.dirname(__file__))          # project root
 OUT = os.path.join(BASE, "outputs")
@@ -12,29 +14,11 @@ os.makedirs(OUT, exist_ok=True)
 
 # --- helpers ---
 def classify_tablet(row):
-    """Rule-of-thumb type label using liters."""
-    grain = row.get("grain", 0.0)
-    oil   = row.get("oil", 0.0)
-    wine  = row.get("wineA", 0.0) + row.get("wineB", 0.0)
-
-    if grain > 0 and oil > 0 and wine > 0:
-        # check how close to a 10:1:~10 style (tolerant)
-        g, o, w = grain, oil, wine
-        base = min(v for v in [g, o, w] if v > 0)
-        ratio = (g/base, o/base, w/base)
-        # Very loose acceptance for “triadic-like”
-        if ratio[0] >= 8 and ratio[1] >= 1 and ratio[2] >= 6:
-            return "triadic_ledger"
-        return "mixed_ledger"
-    if grain > 0 and wine == 0:
-        return "grain_dominant"
-    return "other"
+    """Rule-of-thumb type label using liters (single row; see volume_engine.classify)."""
+    return str(classify(triad_columns(pd.DataFrame([row])))[0])
 
 def sum_by_commodity(vol_df):
-    sums = (vol_df
-            .pivot_table(index="file", columns="commodity",
-                         values="liters", aggfunc="sum", fill_value=0)
-            .reset_index())
+    sums = commodity_matrix(vol_df).reset_index()
     for col in ["grain","oil","wineA","wineB"]:
         if col not in sums.columns:
             sums[col] = 0.0
@@ -46,21 +30,16 @@ def write_text_report(sums, clusters_path, out_txt):
     if os.path.exists(clusters_path):
         clusters = pd.read_csv(clusters_path).set_index("file")["cluster"].to_dict()
 
+    # grain / oil / wine for every tablet at once
+    G = triad_columns(sums.set_index("file"))
+    labels = classify(G)
+    ratios = normalize_ratios(G)     # zeros stay 0 (avoid div by zero)
+
     lines = []
-    for _, r in sums.iterrows():
-        file = r["file"]
-        grain = float(r["grain"])
-        oil   = float(r["oil"])
-        wine  = float(r["wineA"] + r["wineB"])
+    for file, (grain, oil, wine), label, r in zip(sums["file"], G, labels, ratios):
         total = grain + oil + wine
-        label = classify_tablet(r)
         cl = clusters.get(file, "NA") if clusters else "NA"
-
-        # normalized ratios (avoid div by zero)
-        base = min([v for v in [grain,oil,wine] if v > 0], default=1.0)
-        ratio = (round(grain/base,1) if grain>0 else 0,
-                 round(oil/base,1)   if oil>0   else 0,
-                 round(wine/base,1)  if wine>0  else 0)
+        ratio = tuple(float(x) if x > 0 else 0 for x in r)
 
         lines.append(f"Tablet {file}  [cluster {cl}]  → type: {label}")
         lines.append(f"  Grain {grain:.1f} L | Oil {oil:.1f} L | Wine {wine:.1f} L | Total {total:.1f} L")
@@ -70,34 +49,25 @@ def write_text_report(sums, clusters_path, out_txt):
         f.write("\n".join(lines))
     print(f"Wrote report: {out_txt}")
 
-def make_bar_charts(sums, out_png):
+def make_bar_charts(sums, out_png, plots):
     # stacked bars per tablet: grain, oil, wine
-    tablets = sums["file"].tolist()
-    grain = sums["grain"].tolist()
-    oil   = sums["oil"].tolist()
-    wine  = (sums["wineA"] + sums["wineB"]).tolist()
-
-    plt.figure(figsize=(10,6))
-    x = range(len(tablets))
-    plt.bar(x, grain, label="Grain (L)")
-    plt.bar(x, oil, bottom=grain, label="Oil (L)")
-    plt.bar(x, wine, bottom=[g+o for g,o in zip(grain, oil)], label="Wine (L)")
-    plt.xticks(list(x), tablets, rotation=45, ha="right")
-    plt.ylabel("Liters")
-    plt.title("Commodity volumes per tablet (stacked)")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(out_png)
-    plt.close()
-    print(f"Wrote chart: {out_png}")
+    series = [("Grain (L)", sums["grain"]), ("Oil (L)", sums["oil"]), ("Wine (L)", sums["wineA"] + sums["wineB"])]
+    plots.add("stacked_bars", out_png, dict(categories=sums["file"].tolist(), series=series),
+              figsize=(10,6), ylabel="Liters", title="Commodity volumes per tablet (stacked)",
+              tight_layout=True, dpi=100)
 
-def main():
+@timed()
+def main(plots=None):
     vol = pd.read_csv(VOL_CSV)  # requires outputs/tablet_volumes.csv
+    st = current(); st.input(VOL_CSV); st.output(os.path.join(OUT, "volume_report.txt")); st.rows_in = len(vol)
     sums = sum_by_commodity(vol)
     # write text report
     write_text_report(sums, CLUST_CSV, os.path.join(OUT, "volume_report.txt"))
     # write stacked bar chart
-    make_bar_charts(sums, os.path.join(OUT, "volume_bars.png"))
+    plots = plots or PlotQueue()
+    make_bar_charts(sums, os.path.join(OUT, "volume_bars.png"), plots)
+    plots.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Volume report and stacked commodity chart per tablet.")
+    main(PlotQueue.from_args(add_plot_args(ap).parse_args()))
\ No newline at end of file
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Restore damaged sign runs: top-k fillings for '?' gaps by beam search.
+
+Input lines keep their lacunae as '?' (or '[?]'), e.g. `AB81 ? AB22 AB67 5`
+(normalize_linear_a.py --keep-gaps preserves them). Every AB-sign run with
+gaps is filled left to right; at each gap all beam states × all signs are
+scored as one integer-coded candidate matrix and pruned with argpartition:
+
+  lm        Kneser-Ney log-probability (sign_lm.py) of the run up to the next
+            gap, or of the whole run plus </s> at the last gap
+  segment   log(1 + count) of known segments of the same length that agree
+            with every filled position (words_from_segments.py chunks)
+  template  stem + AB22 + unit + number: a unit sign right after AB22, AB22
+            right before a unit sign, no AB22 directly before AB22 (only for
+            runs followed by a number)
+
+  score = lm + --seg-weight · segment + --template-weight · template
+
+  python3 scripts/restore_signs.py -d data/clean -k 5
+  python3 scripts/restore_signs.py --line "AB81 ? AB22 AB67 5" --line "? AB02 AB22 ? 12"
+  python3 scripts/restore_signs.py -i damaged.txt --model out/tables/sign_lm.npz --workers 4
+"""
+import re, argparse, time
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from sign_lm import AB, GAP, BOS, EOS, UNK, SignLM, iter_sequences
+from template_grammar import LINK_SIGNS, UNIT_SIGNS
+from words_from_segments import tokenize_line
+import profiling
+
+BRACKETS = re.compile(r"[\[\]]")
+NUM = re.compile(r"\d+")
+FIELDS = ["file","line","run","damaged","rank","restored","fill","score","lm_logprob","segment","template"]
+
+def damaged_runs(raw):
+    """(run index, [signs with '?'], followed by a number) for every run that has a gap."""
+    tokens = [t.upper() for t in tokenize_line(BRACKETS.sub(" ", raw))]
+    runs, cur = [], []
+    for i, t in enumerate(tokens + [""]):
+        if AB.fullmatch(t) or t == GAP:
+            cur.append(t)
+            continue
+        if cur:
+            runs.append((cur, bool(NUM.fullmatch(t))))
+            cur = []
+    return [(i, run, num) for i, (run, num) in enumerate(runs) if GAP in run]
+
+class Restorer:
+    def __init__(self, lm: SignLM, segments: Counter, beam=20, seg_weight=1.0, template_weight=1.0):
+        self.lm, self.beam = lm, beam
+        self.seg_weight, self.template_weight = seg_weight, template_weight
+        self.cand = np.array([i for i, s in enumerate(lm.vocab) if s not in (BOS, EOS, UNK)], np.int64)
+        col = np.full(lm.V, -1, np.int64); col[self.cand] = np.arange(len(self.cand))
+        is_link = np.isin(np.array(lm.vocab), list(LINK_SIGNS))
+        is_unit = np.isin(np.array(lm.vocab), list(UNIT_SIGNS))
+        self.link, self.unit = is_link[self.cand], is_unit[self.cand]
+        self._is_link, self._is_unit = is_link, is_unit
+        # segment dictionary per length: (S ids, counts, one-hot of every column over candidate signs)
+        self.segments = {}
+        by_len = {}
+        for seg, n in segments.items():
+            by_len.setdefault(len(seg), []).append(([lm.index.get(s, lm.index[UNK]) for s in seg], n))
+        for L, items in by_len.items():
+            S = np.array([ids for ids, _ in items], np.int64)
+            self.segments[L] = (S, np.array([n for _, n in items], float), col[S])
+
+    def _encode(self, states):
+        n_pad = self.lm.order - 1
+        X = np.empty((len(states), n_pad + states.shape[1] + 1), np.int64)
+        X[:, :n_pad] = self.lm.index[BOS]
+        X[:, n_pad:-1] = np.where(states >= 0, states, self.lm.index[UNK])
+        X[:, -1] = self.lm.index[EOS]
+        return X
+
+    def _segment(self, states, g):
+        """(beams, candidates) summed counts of same-length segments compatible with each fill."""
+        seg = self.segments.get(states.shape[1])
+        out = np.zeros((len(states), len(self.cand)))
+        if seg is None:
+            return out
+        S, w, C = seg
+        known = states >= 0
+        compat = ((S[None, :, :] == states[:, None, :]) | ~known[:, None, :]).all(axis=2)   # beams × segments
+        ok = C[:, g] >= 0
+        for b in np.flatnonzero(compat.any(axis=1)):
+            m = compat[b] & ok
+            out[b] = np.bincount(C[m, g], weights=w[m], minlength=len(self.cand))
+        return out
+
+    def _template(self, states, g):
+        """(beams, candidates) template bonus for the sign at gap g."""
+        L = states.shape[1]
+        prev = states[:, g - 1] if g > 0 else np.full(len(states), -1)
+        nxt = states[:, g + 1] if g + 1 < L else np.full(len(states), -1)
+        after_link = (prev >= 0) & self._is_link[prev.clip(0)]
+        before_unit = (nxt >= 0) & self._is_unit[nxt.clip(0)]
+        before_link = (nxt >= 0) & self._is_link[nxt.clip(0)]
+        has_link = ((states >= 0) & self._is_link[states.clip(0)]).any(axis=1)
+        T = np.zeros((len(states), len(self.cand)))
+        T += after_link[:, None] * self.unit[None, :]
+        T += (before_unit & ~has_link)[:, None] * self.link[None, :]
+        T -= before_link[:, None] * self.link[None, :]
+        return T
+
+    def restore(self, run, templated=True, k=5):
+        """Top-k [(signs, score, lm_logprob, segment, template)] for one run containing gaps."""
+        L = len(run)
+        gaps = [i for i, s in enumerate(run) if s == GAP]
+        first = np.array([[-1 if s == GAP else self.lm.index.get(s, self.lm.index[UNK]) for s in run]], np.int64)
+        states, seg_acc, tpl_acc = first, np.zeros(1), np.zeros(1)
+        nc = len(self.cand)
+        for j, g in enumerate(gaps):
+            cut = gaps[j + 1] if j + 1 < len(gaps) else L + 1       # score up to the next unknown
+            nb = len(states)
+            cand = np.repeat(states, nc, axis=0)
+            cand[:, g] = np.tile(self.cand, nb)
+            lp = self.lm.logprobs(self._encode(cand))[:, :cut].sum(axis=1)
+            seg = np.log1p(self._segment(states, g)).ravel()
+            tpl = self._template(states, g).ravel() if templated else np.zeros(nb * nc)
+            seg_all = np.repeat(seg_acc, nc) + seg
+            tpl_all = np.repeat(tpl_acc, nc) + tpl
+            score = lp + self.seg_weight * seg_all + self.template_weight * tpl_all
+            keep = min(self.beam if j + 1 < len(gaps) else k, len(score))
+            top = np.argpartition(-score, keep - 1)[:keep]
+            top = top[np.argsort(-score[top], kind="stable")]
+            states, seg_acc, tpl_acc, last = cand[top], seg_all[top], tpl_all[top], (score[top], lp[top])
+        return [([self.lm.vocab[i] for i in s], float(sc), float(l), float(sg), float(tp))
+                for s, sc, l, sg, tp in zip(states, *last, seg_acc, tpl_acc)]
+
+    def restore_lines(self, lines, k=5):
+        """lines: [(file, line, raw)] -> output rows (FIELDS)."""
+        rows = []
+        for name, idx, raw in lines:
+            for r, run, templated in damaged_runs(raw):
+                gaps = [i for i, s in enumerate(run) if s == GAP]
+                for rank, (signs, score, lp, seg, tpl) in enumerate(self.restore(run, templated, k), start=1):
+                    rows.append({"file": name, "line": idx, "run": r, "damaged": " ".join(run), "rank": rank,
+                                 "restored": " ".join(signs), "fill": " ".join(signs[i] for i in gaps),
+                                 "score": round(score, 4), "lm_logprob": round(lp, 4),
+                                 "segment": round(seg, 4), "template": round(tpl, 4)})
+        return rows
+
+def segment_counts(indir: Path):
+    """Gap-free sign runs of the corpus and their counts (the segment dictionary)."""
+    return Counter(tuple(seq) for _, _, seq in iter_sequences(indir, keep_gaps=True)
+                   if GAP not in seq and len(seq) >= 2)
+
+_W = None
+def _init_worker(lm_arrays, segments, opts):
+    global _W
+    _W = Restorer(SignLM(*lm_arrays), segments, **opts)
+
+def _run(args):
+    lines, k = args
+    return _W.restore_lines(lines, k)
+
+def restore_corpus(lines, lm: SignLM, segments, k=5, workers=1, chunk=200, **opts):
+    jobs = [(lines[i:i + chunk], k) for i in range(0, len(lines), chunk)]
+    init = ((lm.vocab, lm.order, lm.discounts, lm.keys, lm.counts, lm.ctx, lm.ctx_total, lm.ctx_types),
+            segments, opts)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init) as ex:
+            return [r for part in ex.map(profiling.wrap(_run), jobs) for r in part]
+    _init_worker(*init)
+    return [r for j in jobs for r in _run(j)]
+
+def read_damaged(indir=None, infile=None, extra=()):
+    """[(file, line, raw)] of every input line that contains a '?' gap."""
+    lines = []
+    if indir:
+        for f in sorted(Path(indir).glob("*.txt")):
+            for idx, raw in enumerate(f.read_text(encoding="utf-8").splitlines(), start=1):
+                lines.append((f.name, idx, raw))
+    if infile:
+        for idx, raw in enumerate(Path(infile).read_text(encoding="utf-8").splitlines(), start=1):
+            lines.append((Path(infile).name, idx, raw))
+    lines += [("--line", i, raw) for i, raw in enumerate(extra, start=1)]
+    return [l for l in lines if damaged_runs(l[2])]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Beam-search restoration of '?' gaps in sign runs.")
+    ap.add_argument("-d","--dir", default=None, help="scan *.txt for damaged lines")
+    ap.add_argument("-i","--input", default=None, help="text file of damaged lines")
+    ap.add_argument("--line", action="append", default=[], help='e.g. "AB81 ? AB22 AB67 5" (repeatable)')
+    ap.add_argument("--train-dir", default="data/clean", help="corpus for the LM and segment dictionary")
+    ap.add_argument("--model", default=None, help="sign_lm.py .npz (default: fit on --train-dir)")
+    ap.add_argument("--order", type=int, default=3)
+    ap.add_argument("-k", type=int, default=5, help="fillings kept per run")
+    ap.add_argument("--beam", type=int, default=20)
+    ap.add_argument("--seg-weight", type=float, default=1.0)
+    ap.add_argument("--template-weight", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--chunk", type=int, default=200, help="lines per worker task")
+    ap.add_argument("-o","--out", default="out/tables/restorations.csv")
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    segments = segment_counts(Path(a.train_dir))
+    if a.model:
+        lm = SignLM.load(Path(a.model))
+    else:
+        lm = SignLM.fit([seq for _, _, seq in iter_sequences(Path(a.train_dir))], a.order)
+    lines = read_damaged(a.dir, a.input, a.line)
+    rows = restore_corpus(lines, lm, segments, a.k, a.workers, a.chunk, beam=a.beam,
+                          seg_weight=a.seg_weight, template_weight=a.template_weight)
+    Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(rows, columns=FIELDS).to_csv(a.out, index=False)
+    print(f"{len(lines)} damaged lines, {len(rows)} candidate fillings in {time.perf_counter() - t0:.2f}s")
+    print(f"Wrote {a.out}")
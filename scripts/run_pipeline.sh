@@ -5,33 +5,51 @@ ROOT="$(cd "$(dirname "$0")/.." && pwd)"
 OUT="$ROOT/outputs"
 mkdir -p "$OUT"
 
+# --profile: cProfile every stage -> out/profiles/<run id>/<stage>.{pstats,collapsed,top.txt}
+if [ "${1:-}" = "--profile" ]; then
+  [ "${LINA_PROFILE:-0}" = 0 ] && export LINA_PROFILE=1
+  shift
+fi
+
+# Per-stage metrics (wall/CPU/RSS/rows/bytes) -> outputs/metrics.jsonl; summary table at the end
+export LINA_RUN_ID="${LINA_RUN_ID:-$(date +%Y%m%dT%H%M%S)-$$}"
+export LINA_METRICS="${LINA_METRICS-$OUT/metrics.jsonl}"
+stage() { python3 "$ROOT/scripts/instrument.py" run "$@"; }
+metrics() {
+  echo "=== Stage metrics ==="; python3 "$ROOT/scripts/instrument.py" summary --metrics "$LINA_METRICS" --run "$LINA_RUN_ID" || true
+  if [ -n "${LINA_PROFILE:-}" ] && [ "$LINA_PROFILE" != 0 ]; then
+    [ "$LINA_PROFILE" = 1 ] && echo "Profiles: $ROOT/out/profiles/$LINA_RUN_ID" || echo "Profiles: $LINA_PROFILE/$LINA_RUN_ID"
+  fi
+}
+trap metrics EXIT   # also printed when a stage fails
+
 echo "=== A) AB-pipeline (safe if files absent) ==="
 
 # Optional diagnostics — only run if present
-[ -f "$ROOT/scripts/stem_endings_matrix.py" ] && python3 "$ROOT/scripts/stem_endings_matrix.py" || echo "(skip) stem_endings_matrix.py"
+[ -f "$ROOT/scripts/stem_endings_matrix.py" ] && stage "$ROOT/scripts/stem_endings_matrix.py" || echo "(skip) stem_endings_matrix.py"
 # annotate_ledger.py requires the clean dir; run only if present
 if [ -f "$ROOT/scripts/annotate_ledger.py" ]; then
-  python3 "$ROOT/scripts/annotate_ledger.py" -d "$ROOT/data/clean" -o "$OUT/annotated_ledger.csv" || true
+  stage "$ROOT/scripts/annotate_ledger.py" -d "$ROOT/data/clean" -o "$OUT/annotated_ledger.csv" || true
 else
   echo "(skip) annotate_ledger.py"
 fi
-[ -f "$ROOT/scripts/ledger_summary.py" ] && python3 "$ROOT/scripts/ledger_summary.py" || echo "(skip) ledger_summary.py"
+[ -f "$ROOT/scripts/ledger_summary.py" ] && stage "$ROOT/scripts/ledger_summary.py" || echo "(skip) ledger_summary.py"
 
 # Stabilize lexicon + substitute dictionary (these you have)
-python3 "$ROOT/scripts/stabilize_lexicon.py"
-python3 "$ROOT/scripts/substitute_dictionary.py"   # -> outputs/tablets_substituted.csv
+stage "$ROOT/scripts/stabilize_lexicon.py"
+stage "$ROOT/scripts/substitute_dictionary.py"   # -> outputs/tablets_substituted.csv
 
 echo "=== B) Syllabic tablets -> same 'substituted' format ==="
-python3 "$ROOT/scripts/ingest_syllabic.py"         # -> outputs/ht_syllabic_ledger.csv
-python3 "$ROOT/scripts/syllabic_to_substituted.py" # appends to outputs/tablets_substituted.csv
+stage "$ROOT/scripts/ingest_syllabic.py"         # -> outputs/ht_syllabic_ledger.csv
+stage "$ROOT/scripts/syllabic_to_substituted.py" # replaces the syllabic rows of outputs/tablets_substituted.csv
 
 echo "=== C) Downstream (exactly as before) ==="
-python3 "$ROOT/scripts/render_translations.py"     # -> outputs/proto_translations/*.txt + proto_translations.csv
-python3 "$ROOT/scripts/compute_volumes_from_subs.py"   # -> outputs/tablet_volumes.csv + tablet_volumes.txt
-python3 "$ROOT/scripts/analyze_volumes.py"         # -> plots, clusters
-python3 "$ROOT/scripts/economy_summary.py"         # -> economy_totals.txt
+stage "$ROOT/scripts/render_translations.py"     # -> outputs/proto_translations/*.txt + proto_translations.csv
+stage "$ROOT/scripts/compute_volumes_from_subs.py"   # -> outputs/tablet_volumes.csv + tablet_volumes.txt
+stage "$ROOT/scripts/analyze_volumes.py"         # -> plots, clusters
+stage "$ROOT/scripts/economy_summary.py"         # -> economy_totals.txt
 
 echo "=== D) Final report ==="
-python3 "$ROOT/scripts/build_report.py"            # -> outputs/LinearA_report.md + LinearA_report.pdf
+stage "$ROOT/scripts/build_report.py"            # -> outputs/LinearA_report.md + LinearA_report.pdf
 
 echo "Pipeline complete. Report available at outputs/LinearA_report.md and .pdf"
\ No newline at end of file
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Interpolated Kneser-Ney n-gram model over AB signs.
+
+Training sequences are the AB-sign runs of every transcription line (split at
+numbers, ideograms and other non-sign tokens, as in words_from_segments.py),
+padded with order-1 <s> and one </s>. Signs are integer-coded and every
+n-gram is packed into one int64 key (base = vocabulary size), so each order
+is stored as two sorted arrays:
+
+  keys[k], counts[k]                  k-grams (raw counts at the top order,
+                                      continuation counts N1+(• g) below)
+  ctx[k], ctx_total[k], ctx_types[k]  (k-1)-gram contexts, their count sum
+                                      and number of distinct followers
+
+Lookups are np.searchsorted over whole batches: scoring N candidate
+sequences is a handful of vectorized passes per order, not a Python loop
+per n-gram.
+
+  python3 scripts/sign_lm.py build -d data/clean --order 3
+  python3 scripts/sign_lm.py score --seq "AB81 AB02 AB22 AB67" --seq "AB81 AB03 AB22 AB67"
+  python3 scripts/sign_lm.py perplexity -d data/clean --folds 5
+"""
+import re, argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from words_from_segments import tokenize_line
+
+AB = re.compile(r"AB\d{1,3}", re.I)
+GAP = "?"
+BOS, EOS, UNK = "<s>", "</s>", "<unk>"
+BATCH_TOKENS = 5_000_000      # positions scored per vectorized pass
+
+def line_sequences(tokens, keep_gaps=False):
+    """AB-sign runs of one tokenized line; `?` is kept as a sign when keep_gaps."""
+    seqs, cur = [], []
+    for t in tokens:
+        if AB.fullmatch(t):
+            cur.append(t.upper())
+        elif keep_gaps and t == GAP:
+            cur.append(GAP)
+        elif cur:
+            seqs.append(cur); cur = []
+    if cur:
+        seqs.append(cur)
+    return seqs
+
+def iter_sequences(indir: Path, keep_gaps=False):
+    """(file, 1-based line, [signs]) for every sign run in data/clean-style files."""
+    for f in sorted(Path(indir).glob("*.txt")):
+        for idx, raw in enumerate(f.read_text(encoding="utf-8").splitlines(), start=1):
+            for seq in line_sequences(tokenize_line(raw), keep_gaps):
+                yield f.name, idx, seq
+
+def _lookup(sorted_keys, x):
+    """Positions of x in sorted_keys and a found mask."""
+    pos = np.searchsorted(sorted_keys, x)
+    pos[pos == len(sorted_keys)] = 0
+    hit = sorted_keys[pos] == x if len(sorted_keys) else np.zeros(x.shape, bool)
+    return pos, hit
+
+class SignLM:
+    def __init__(self, vocab, order, discounts, keys, counts, ctx, ctx_total, ctx_types):
+        self.vocab = list(vocab)
+        self.index = {s: i for i, s in enumerate(self.vocab)}
+        self.V, self.order = len(self.vocab), int(order)
+        self.discounts = np.asarray(discounts, float)
+        self.keys, self.counts = keys, counts
+        self.ctx, self.ctx_total, self.ctx_types = ctx, ctx_total, ctx_types
+
+    # ---- building ----
+    @classmethod
+    def fit(cls, sequences, order=3, vocab=None):
+        if vocab is None:
+            vocab = sorted({s for seq in sequences for s in seq} - {GAP})
+        vocab = [BOS, EOS, UNK] + [s for s in vocab if s not in (BOS, EOS, UNK)]
+        V = len(vocab)
+        if V ** order >= 2 ** 63:
+            raise ValueError(f"order {order} × vocabulary {V} does not fit int64 keys")
+        lm = cls(vocab, order, np.zeros(order), *([None] * order,) * 5)
+        G = lm._grams(lm.encode(sequences))[-1]
+        G = G[G >= 0]
+        keys, counts = [None] * order, [None] * order
+        keys[-1], counts[-1] = np.unique(G, return_counts=True)
+        for k in range(order - 1, 0, -1):            # continuation counts: distinct left extensions
+            keys[k - 1], counts[k - 1] = np.unique(keys[k] % V ** k, return_counts=True)
+        discounts, ctx, ctx_total, ctx_types = [], [], [], []
+        for k in range(order):
+            n1, n2 = (counts[k] == 1).sum(), (counts[k] == 2).sum()
+            discounts.append(n1 / (n1 + 2 * n2) if n1 else 0.5)
+            c, inv = np.unique(keys[k] // V, return_inverse=True)
+            ctx.append(c)
+            ctx_total.append(np.bincount(inv, weights=counts[k], minlength=len(c)))
+            ctx_types.append(np.bincount(inv, minlength=len(c)))
+        return cls(vocab, order, discounts, keys, [c.astype(np.int64) for c in counts],
+                   ctx, ctx_total, ctx_types)
+
+    def save(self, path: Path):
+        path = Path(path); path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        for k in range(self.order):
+            arrays.update({f"keys{k}": self.keys[k], f"counts{k}": self.counts[k], f"ctx{k}": self.ctx[k],
+                           f"ctx_total{k}": self.ctx_total[k], f"ctx_types{k}": self.ctx_types[k]})
+        np.savez_compressed(path, vocab=np.array(self.vocab, dtype=str), order=self.order,
+                            discounts=self.discounts, **arrays)
+
+    @classmethod
+    def load(cls, path: Path):
+        z = np.load(path)
+        n = int(z["order"])
+        get = lambda name: [z[f"{name}{k}"] for k in range(n)]
+        return cls(z["vocab"].tolist(), n, z["discounts"], get("keys"), get("counts"),
+                   get("ctx"), get("ctx_total"), get("ctx_types"))
+
+    # ---- scoring ----
+    def encode(self, sequences):
+        """Padded (N, order-1 + max_len + 1) id matrix: <s>… signs </s>, -1 after the end."""
+        n_pad = self.order - 1
+        L = max((len(s) for s in sequences), default=0) + n_pad + 1
+        X = np.full((len(sequences), L), -1, np.int64)
+        X[:, :n_pad] = self.index[BOS]
+        unk = self.index[UNK]
+        for r, seq in enumerate(sequences):
+            X[r, n_pad:n_pad + len(seq)] = [self.index.get(s, unk) for s in seq]
+            X[r, n_pad + len(seq)] = self.index[EOS]
+        return X
+
+    def _grams(self, X):
+        """Packed k-gram keys ending at each predicted position, k = 1..order (-1 where padded)."""
+        n_pad = self.order - 1
+        W = X[:, n_pad:]
+        valid = W >= 0
+        grams, g = [], np.where(valid, W, 0)
+        for k in range(1, self.order + 1):
+            if k > 1:
+                g = g + X[:, n_pad - k + 1: X.shape[1] - k + 1].clip(0) * self.V ** (k - 1)
+            grams.append(np.where(valid, g, -1))
+        return grams
+
+    def _prob(self, grams):
+        """Interpolated KN probability of the last sign of each packed gram, per order."""
+        V = self.V
+        w = grams[0]
+        D = self.discounts[0]
+        total = self.ctx_total[0].sum() if len(self.ctx_total[0]) else 0.0
+        pos, hit = _lookup(self.keys[0], w)
+        c = np.where(hit, self.counts[0][pos], 0)
+        if total:
+            p = (np.maximum(c - D, 0) + D * len(self.keys[0]) / (V - 1)) / total    # <s> is never predicted
+        else:
+            p = np.full(w.shape, 1.0 / (V - 1))
+        for k in range(1, self.order):
+            g = grams[k]
+            cpos, chit = _lookup(self.ctx[k], g // V)
+            pos, hit = _lookup(self.keys[k], g)
+            c = np.where(hit, self.counts[k][pos], 0)
+            tot = np.where(chit, self.ctx_total[k][cpos], 1.0)
+            types = np.where(chit, self.ctx_types[k][cpos], 0)
+            D = self.discounts[k]
+            p = np.where(chit, (np.maximum(c - D, 0) + D * types * p) / tot, p)
+        return p
+
+    def token_logprobs(self, sequences):
+        """(N, max_len + 1) natural-log probabilities per position (NaN after </s>)."""
+        return self.logprobs(self.encode(sequences))
+
+    def logprobs(self, X):
+        """token_logprobs for an already encoded id matrix (see encode)."""
+        grams = self._grams(X)
+        valid = grams[0] >= 0
+        lp = np.full(valid.shape, np.nan)
+        lp[valid] = np.log(self._prob([g[valid] for g in grams]))
+        return lp
+
+    def score(self, sequences, batch_tokens=BATCH_TOKENS):
+        """Total log-probability and token count (signs + </s>) per sequence, in batches."""
+        sequences = list(sequences)
+        logp = np.empty(len(sequences)); ntok = np.empty(len(sequences), np.int64)
+        step = max(1, batch_tokens // (max((len(s) for s in sequences), default=0) + self.order))
+        for i in range(0, len(sequences), step):
+            lp = self.token_logprobs(sequences[i:i + step])
+            logp[i:i + step] = np.nansum(lp, axis=1)
+            ntok[i:i + step] = (~np.isnan(lp)).sum(axis=1)
+        return logp, ntok
+
+    def rank(self, candidates, k=None):
+        """Candidates sorted by log-probability (best first) as (sequence, logp, perplexity)."""
+        logp, n = self.score(candidates)
+        order = np.argsort(-logp, kind="stable")[:k]
+        return [(candidates[i], float(logp[i]), float(np.exp(-logp[i] / n[i]))) for i in order]
+
+def tablet_perplexity(indir: Path, order=3, folds=0, seed=0):
+    """Per-tablet perplexity; folds > 1 scores each tablet with a model trained without it."""
+    rows = list(iter_sequences(indir))
+    if not rows:
+        return pd.DataFrame(columns=["file","sequences","tokens","logprob","perplexity","robust_z","anomalous"])
+    files = np.array([r[0] for r in rows]); seqs = [r[2] for r in rows]
+    names = np.unique(files)
+    logp, ntok = np.empty(len(rows)), np.empty(len(rows), np.int64)
+    if folds > 1:
+        vocab = sorted({s for seq in seqs for s in seq})
+        fold_of = dict(zip(names, np.random.default_rng(seed).permutation(len(names)) % folds))
+        fold = np.array([fold_of[f] for f in files])
+        for k in range(folds):
+            test = np.flatnonzero(fold == k)
+            if not len(test):
+                continue
+            lm = SignLM.fit([seqs[i] for i in np.flatnonzero(fold != k)], order, vocab)
+            logp[test], ntok[test] = lm.score([seqs[i] for i in test])
+    else:
+        logp, ntok = SignLM.fit(seqs, order).score(seqs)
+    df = (pd.DataFrame({"file": files, "logprob": logp, "tokens": ntok})
+            .groupby("file", as_index=False).agg(sequences=("tokens", "size"), tokens=("tokens", "sum"),
+                                                 logprob=("logprob", "sum")))
+    df["perplexity"] = np.exp(-df["logprob"] / df["tokens"])
+    lpp = np.log(df["perplexity"])
+    mad = 1.4826 * np.median(np.abs(lpp - np.median(lpp)))
+    df["robust_z"] = (lpp - np.median(lpp)) / mad if mad > 0 else 0.0
+    df["anomalous"] = df["robust_z"] > 3.0
+    return df.sort_values("perplexity", ascending=False)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Kneser-Ney sign n-gram model: build, score, per-tablet perplexity.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    b = sub.add_parser("build")
+    b.add_argument("-d","--dir", default="data/clean")
+    b.add_argument("--order", type=int, default=3)
+
+    s = sub.add_parser("score")
+    s.add_argument("--seq", action="append", default=[], help='e.g. "AB81 AB02 AB22 AB67" (repeatable)')
+    s.add_argument("-i","--input", default=None, help="text file, one candidate sequence per line")
+    s.add_argument("-k", type=int, default=None, help="keep the k best")
+    s.add_argument("-o","--out", default=None, help="CSV of ranked candidates (default: print)")
+
+    p = sub.add_parser("perplexity")
+    p.add_argument("-d","--dir", default="data/clean")
+    p.add_argument("--order", type=int, default=3)
+    p.add_argument("--folds", type=int, default=0, help="score each tablet out-of-fold (0 = in-sample)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("-o","--out", default="out/tables/tablet_perplexity.csv")
+
+    for x in (b, s):
+        x.add_argument("--model", default="out/tables/sign_lm.npz")
+    a = ap.parse_args()
+
+    if a.cmd == "build":
+        seqs = [seq for _, _, seq in iter_sequences(Path(a.dir))]
+        lm = SignLM.fit(seqs, a.order)
+        lm.save(Path(a.model))
+        print(f"{len(seqs)} sequences, {lm.V} signs, "
+              + ", ".join(f"{k + 1}-grams={len(x)}" for k, x in enumerate(lm.keys)))
+        print(f"Wrote {a.model}")
+    elif a.cmd == "score":
+        lm = SignLM.load(Path(a.model))
+        cands = [x.upper().split() for x in a.seq]
+        if a.input:
+            cands += [l.upper().split() for l in Path(a.input).read_text(encoding="utf-8").splitlines() if l.strip()]
+        if not cands:
+            raise SystemExit("No candidates: pass --seq or -i")
+        ranked = lm.rank(cands, a.k)
+        if a.out:
+            Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+            pd.DataFrame([(" ".join(c), lp, pp) for c, lp, pp in ranked],
+                         columns=["sequence","logprob","perplexity"]).to_csv(a.out, index=False)
+            print(f"Wrote {a.out}")
+        else:
+            for c, lp, pp in ranked:
+                print(f"{lp:9.3f}  ppl={pp:8.2f}  {' '.join(c)}")
+    else:
+        df = tablet_perplexity(Path(a.dir), a.order, a.folds, a.seed)
+        Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+        df.round(4).to_csv(a.out, index=False)
+        print(f"{len(df)} tablets, {int(df['anomalous'].sum())} flagged (robust z > 3)")
+        print(f"Wrote {a.out}")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Multi-pattern matching over sign IDs.
+
+SignMatcher compiles any number of sign patterns (stems, units, affixes,
+link signs, templates spelled out as sign tuples) into one Aho-Corasick
+automaton. A segment is then scanned once, left to right, whatever the
+dictionary size:
+
+    m = SignMatcher()
+    m.add("AB22 AB67", kind="unit", value="big_jar")
+    m.add("AB81 AB02", kind="stem", value="grain")
+    m.build()
+    m.longest("AB81 AB02 AB22 AB67".split())   # leftmost-longest, non-overlapping
+
+SignTrie is the plain counting trie used where only prefix walks are needed
+(morph_segment.py).
+"""
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", "start end kind value pattern")
+
+def as_signs(pattern):
+    if isinstance(pattern, str):
+        pattern = pattern.split()
+    return tuple(t.upper() for t in pattern)
+
+class SignTrie:
+    """Counts for sign sequences; walk() returns every stored prefix of seq[i:]."""
+    __slots__ = ("children", "count")
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+
+    def add(self, seq, n=1):
+        node = self
+        for s in seq:
+            node = node.children.setdefault(s, SignTrie())
+        node.count += n
+
+    def get(self, seq):
+        node = self
+        for s in seq:
+            node = node.children.get(s)
+            if node is None: return 0
+        return node.count
+
+    def walk(self, seq, start, max_len):
+        """Yield (end, count) for seq[start:end], end = start+1 .. start+max_len."""
+        node = self
+        for end in range(start, min(len(seq), start + max_len)):
+            node = node.children.get(seq[end])
+            if node is None: return
+            yield end + 1, node.count
+
+    def items(self, prefix=()):
+        if self.count:
+            yield prefix, self.count
+        for s, ch in self.children.items():
+            yield from ch.items(prefix + (s,))
+
+class SignMatcher:
+    def __init__(self):
+        self.goto = [{}]       # node -> {sign: node}
+        self.ends = [[]]       # node -> ids of the patterns that end exactly here
+        self.fail = [0]        # rebuilt by build()
+        self.out = [[]]        # node -> pattern ids ending here (incl. via fail links); rebuilt by build()
+        self.patterns = []     # id -> (signs, kind, value)
+        self.built = False
+
+    @classmethod
+    def from_patterns(cls, patterns, kind="", value=None):
+        """Build from an iterable of patterns, or a {pattern: value} dict."""
+        m = cls()
+        if isinstance(patterns, dict):
+            for p, v in patterns.items(): m.add(p, kind, v)
+        else:
+            for p in patterns: m.add(p, kind, value)
+        return m.build()
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def add(self, pattern, kind="", value=None):
+        signs = as_signs(pattern)
+        if not signs:
+            raise ValueError("empty pattern")
+        node = 0
+        for s in signs:
+            nxt = self.goto[node].get(s)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][s] = nxt
+                self.goto.append({}); self.ends.append([])
+            node = nxt
+        self.ends[node].append(len(self.patterns))
+        self.patterns.append((signs, kind, value))
+        self.built = False
+        return self
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them (from scratch, so
+        patterns can be added and the automaton rebuilt any number of times)."""
+        self.fail = [0] * len(self.goto)
+        self.out = [list(e) for e in self.ends]
+        queue = deque()
+        for nxt in self.goto[0].values():
+            self.fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for s, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and s not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(s, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+                queue.append(nxt)
+        self.built = True
+        return self
+
+    def iter_matches(self, tokens, kinds=None):
+        """Yield every (possibly overlapping) Match, ordered by end position."""
+        if not self.built:
+            self.build()
+        goto, fail, out, pats = self.goto, self.fail, self.out, self.patterns
+        node = 0
+        for i, t in enumerate(tokens):
+            while node and t not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(t, 0)
+            for pid in out[node]:
+                signs, kind, value = pats[pid]
+                if kinds is None or kind in kinds:
+                    yield Match(i + 1 - len(signs), i + 1, kind, value, signs)
+
+    def longest(self, tokens, kinds=None):
+        """Leftmost-longest, non-overlapping matches."""
+        best = {}
+        for m in self.iter_matches(tokens, kinds):
+            cur = best.get(m.start)
+            if cur is None or m.end > cur.end:
+                best[m.start] = m
+        picked, pos = [], 0
+        for start in sorted(best):
+            if start >= pos:
+                picked.append(best[start]); pos = best[start].end
+        return picked
+
+    def exact(self, tokens, kinds=None):
+        """The Match covering all of tokens, or None (a plain trie lookup)."""
+        if not self.built:
+            self.build()
+        tokens = as_signs(tokens)
+        node = 0
+        for t in tokens:
+            node = self.goto[node].get(t)
+            if node is None:
+                return None
+        for pid in self.out[node]:
+            signs, kind, value = self.patterns[pid]
+            if len(signs) == len(tokens) and (kinds is None or kind in kinds):
+                return Match(0, len(tokens), kind, value, signs)
+        return None
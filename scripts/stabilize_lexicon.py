@@ -1,12 +1,15 @@
 import pandas as pd
 from collections import defaultdict
+from instrument import timed, current
 
 # Input file with all structured sequences
 DATA_PATH = "outputs/structured_sequences.csv"
 OUTPUT_PATH = "outputs/lexicon_summary.csv"
 
+@timed()
 def main():
     df = pd.read_csv(DATA_PATH)
+    st = current(); st.input(DATA_PATH); st.output(OUTPUT_PATH); st.rows_in = len(df)
 
     # Count attestations by stem
     lexicon = defaultdict(lambda: {"commodities": set(), "endings": set(), "numbers": []})
@@ -38,6 +41,7 @@ def main():
 
     out_df.to_csv(OUTPUT_PATH, index=False)
     print(f"Lexicon summary written to {OUTPUT_PATH}")
+    st.rows_out = len(out_df)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory, line-by-line pipeline:
+
+    data/clean/*.txt ─┬─ annotate ───────────────▶ annotated_ledger.csv
+                      └─ parse ─▶ substitute ─┬──▶ structured_sequences.csv
+                                              ├──▶ tablets_substituted.csv
+                                              └─ volume accumulators ─▶ tablet_volumes.csv/.txt
+
+Every stage is a generator and rows are written through chunked CSV writers,
+so no table is held in memory. Volumes are summed into running (file,
+commodity, unit) accumulators: those grow with the number of tablets (a few
+keys each), not with the number of lines. Rows without a count cannot be
+summed; they are counted and reported.
+
+  python3 scripts/streaming.py -d data/clean
+"""
+import csv, argparse
+from pathlib import Path
+
+class ChunkedWriter:
+    """csv.DictWriter that buffers `chunk` rows per writerows() call."""
+    def __init__(self, path: Path, fieldnames, chunk=5000):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path, self.chunk, self.rows = path, chunk, 0
+        self._f = path.open("w", newline="", encoding="utf-8")
+        self._w = csv.DictWriter(self._f, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
+        self._w.writeheader()
+        self._buf = []
+
+    def write(self, row):
+        self._buf.append(row)
+        if len(self._buf) >= self.chunk:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._w.writerows(self._buf)
+            self.rows += len(self._buf)
+            self._buf = []
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_csv_stream(path: Path, fieldnames, rows, chunk=5000):
+    """Drain a row generator into a CSV; returns the number of rows written."""
+    with ChunkedWriter(path, fieldnames, chunk) as w:
+        for row in rows:
+            w.write(row)
+    return w.rows
+
+def iter_lines(indir: Path):
+    """(file name, 1-based line number, raw line) without loading whole files."""
+    for f in sorted(Path(indir).glob("*.txt")):
+        with f.open(encoding="utf-8") as fh:
+            for idx, raw in enumerate(fh, start=1):
+                yield f.name, idx, raw.rstrip("\n")
+
+SEQ_FIELDS = ["file","line","stem","ending","number","raw_span"]
+SUB_FIELDS = SEQ_FIELDS + ["stem_label","ending_label"]
+
+def substituted_rows(name, idx, raw):
+    """tablets_substituted rows of one line (the first SEQ_FIELDS are its structured_sequences row)."""
+    from structured_reader import parse_line
+    from substitute_dictionary import SUBSTITUTIONS
+    for s in parse_line(raw.strip().split()):
+        yield {"file": name, "line": idx, "stem": s["stem"], "ending": s["ending"],
+               "number": s["number"] if s["number"] is not None else "", "raw_span": s["raw"],
+               "stem_label": SUBSTITUTIONS.get(s["stem"], s["stem"]),
+               "ending_label": SUBSTITUTIONS.get(s["ending"], s["ending"])}
+
+def run(indir: Path, out: Path, chunk=5000):
+    from annotate_ledger import annotate_line, link_matcher, LEDGER_FIELDS
+    from compute_volumes_from_subs import VolumeAccumulator, load_volumes, write_volumes
+
+    acc = VolumeAccumulator(load_volumes())
+    matcher = link_matcher()
+
+    with ChunkedWriter(out/"annotated_ledger.csv", LEDGER_FIELDS, chunk) as led, \
+         ChunkedWriter(out/"structured_sequences.csv", SEQ_FIELDS, chunk) as seq, \
+         ChunkedWriter(out/"tablets_substituted.csv", SUB_FIELDS, chunk) as sub:
+        for name, idx, raw in iter_lines(indir):
+            for r in annotate_line(name, raw, matcher):
+                led.write(r)
+            for row in substituted_rows(name, idx, raw):
+                seq.write(row)              # extra label columns are ignored
+                sub.write(row)
+                acc.add(row)
+    write_volumes(acc.liters(), out)
+    return {"ledger": led.rows, "sequences": seq.rows, "substituted": sub.rows, "volume_keys": len(acc.counts),
+            "no_count": acc.skipped}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Streaming parse → annotate → substitute → volumes with bounded memory.")
+    ap.add_argument("-d","--dir", default="data/clean")
+    ap.add_argument("-o","--outdir", default="outputs")
+    ap.add_argument("--chunk", type=int, default=5000, help="rows per CSV write")
+    a = ap.parse_args()
+    stats = run(Path(a.dir), Path(a.outdir), a.chunk)
+    print("Streamed: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+    print(f"Wrote annotated_ledger.csv, structured_sequences.csv, tablets_substituted.csv, tablet_volumes.csv/.txt to {a.outdir}")
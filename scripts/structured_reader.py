@@ -2,6 +2,9 @@
 import re, glob
 from pathlib import Path
 import pandas as pd
+from sign_matcher import SignMatcher
+from template_grammar import TemplateSet
+from streaming import ChunkedWriter
 
 # --- Load glossary (same file you already created) ---
 def load_glossary(path="out/tables/glossary_hypothesis.tsv"):
@@ -17,44 +20,36 @@ CANON_UNITS = {
     "AB22 AB40", "AB22 AB41", "AB22 AB54", "AB22 AB28"
 }
 
+# Canonical units and their reversed spellings, compiled once
+UNITS = SignMatcher()
+for u in CANON_UNITS:
+    UNITS.add(u, kind="unit", value=u)
+    UNITS.add(u.split()[::-1], kind="reversed", value=u)
+UNITS.build()
+
 def normalize_pair(p):
     """Normalize reversed unit pairs like 'AB67 AB22' -> 'AB22 AB67'."""
-    a, b = p.split()
-    if a == "AB22":
-        return p
-    if b == "AB22":
-        cand = f"AB22 {a}"
-        return cand if cand in CANON_UNITS else p
-    return p
+    m = UNITS.exact(p.split(), kinds=("reversed",))
+    return m.value if m else p
 
 def is_AB(token): return token.startswith("AB")
 def is_num(token): return bool(re.fullmatch(r"\d+", token))
 
-def parse_line(tokens):
+# STEM (ABxx AByy) + LINK AB22 + ENDING (ABzz), then a NUMBER within the next
+# five tokens (robust to stray AB-pairs); leftmost-longest, non-overlapping
+LINE_TEMPLATES = TemplateSet({"seq": "AB AB LINK AB (NONNUM{0,4} NUM)?"})
+
+def parse_line(tokens, templates=LINE_TEMPLATES):
     """
     Reconstruct sequences of: STEM (ABxx AByy) + LINK AB22 + ENDING (ABzz) + NUMBER
     Return a list of dicts: {stem, ending, number, raw}
     """
     seqs = []
-    i = 0
-    n = len(tokens)
-    while i < n - 3:
-        # pattern: AB AB AB22 AB (then maybe NUMBER later)
-        if is_AB(tokens[i]) and is_AB(tokens[i+1]) and tokens[i+2] == "AB22" and is_AB(tokens[i+3]):
-            stem = f"{tokens[i]} {tokens[i+1]}"
-            ending = f"{tokens[i+2]} {tokens[i+3]}"
-            # consume possible number immediately after or a few positions after (robust to stray AB-pairs)
-            num = None
-            j = i + 4
-            while j < n and j <= i + 8:  # lookahead window
-                if is_num(tokens[j]):
-                    num = int(tokens[j]); break
-                j += 1
-            seqs.append({"stem": stem, "ending": normalize_pair(ending), "number": num,
-                         "raw": " ".join(tokens[i:j+1 if num is not None else i+4])})
-            i = j if (num is not None and j > i) else i + 4
-        else:
-            i += 1
+    for m in templates.finditer(tokens, overlap="longest"):
+        span = m.tokens
+        num = int(span[-1]) if is_num(span[-1]) else None
+        seqs.append({"stem": f"{span[0]} {span[1]}", "ending": normalize_pair(f"{span[2]} {span[3]}"),
+                     "number": num, "raw": " ".join(span)})
     return seqs
 
 def gloss_item(pair, gl):
@@ -96,30 +91,29 @@ def main(clean_dir="data/clean",
          out_readable_dir="out/readable_structured",
          glossary="out/tables/glossary_hypothesis.tsv"):
     gl = load_glossary(glossary)
-    rows = []
     outp = Path(out_readable_dir); outp.mkdir(parents=True, exist_ok=True)
 
-    for f in glob.glob(f"{clean_dir}/*.txt"):
-        name = Path(f).name
-        lines = Path(f).read_text().splitlines()
-        rendered = []
-        for idx, line in enumerate(lines, start=1):
-            toks = line.strip().split()
-            seqs = parse_line(toks)
-            # Save sequences to table
-            for s in seqs:
-                rows.append({
-                    "file": name, "line": idx,
-                    "stem": s["stem"], "ending": s["ending"],
-                    "number": s["number"], "raw_span": s["raw"]
-                })
-            # Build readable summary
-            rseq = " | ".join(render_seq(s, gl) for s in seqs) if seqs else "—"
-            template = summarize_line(seqs, gl)
-            rendered.append(f"Line {idx}: {line}\n  → {template}\n  · {rseq}\n")
-        Path(outp, name.replace(".txt", "_structured.txt")).write_text("\n".join(rendered))
+    # Rows and readable lines are written as they are produced (bounded memory)
+    with ChunkedWriter(Path(out_csv), ["file","line","stem","ending","number","raw_span"]) as table:
+        for f in glob.glob(f"{clean_dir}/*.txt"):
+            name = Path(f).name
+            with open(f) as src, Path(outp, name.replace(".txt", "_structured.txt")).open("w") as readable:
+                for idx, line in enumerate(src, start=1):
+                    line = line.rstrip("\n")
+                    toks = line.strip().split()
+                    seqs = parse_line(toks)
+                    # Save sequences to table
+                    for s in seqs:
+                        table.write({
+                            "file": name, "line": idx,
+                            "stem": s["stem"], "ending": s["ending"],
+                            "number": s["number"], "raw_span": s["raw"]
+                        })
+                    # Build readable summary
+                    rseq = " | ".join(render_seq(s, gl) for s in seqs) if seqs else "—"
+                    template = summarize_line(seqs, gl)
+                    readable.write(("\n" if idx > 1 else "") + f"Line {idx}: {line}\n  → {template}\n  · {rseq}\n")
 
-    pd.DataFrame(rows).to_csv(out_csv, index=False)
     print(f"Wrote sequences table to {out_csv}")
     print(f"Wrote readable files to {outp}")
 
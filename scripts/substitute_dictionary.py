@@ -1,4 +1,5 @@
 import pandas as pd
+from instrument import timed, current
 
 # Paths
 DATA_PATH = "outputs/structured_sequences.csv"
@@ -18,8 +19,10 @@ SUBSTITUTIONS = {
     "AB04 AB40": "link?"
 }
 
+@timed()
 def main():
     df = pd.read_csv(DATA_PATH)
+    st = current(); st.input(DATA_PATH); st.output(OUTPUT_PATH); st.rows_in = st.rows_out = len(df)
 
     # Apply substitutions
     def substitute(stem):
@@ -1,38 +1,67 @@
 #!/usr/bin/env python3
-import csv, json
+import csv, json, os
 from pathlib import Path
+from instrument import timed, current
 
 ROOT = Path(__file__).resolve().parents[1]
 OUT  = ROOT / "outputs"; OUT.mkdir(parents=True, exist_ok=True)
 LEDGER = OUT / "ht_syllabic_ledger.csv"
 MAP    = ROOT / "data" / "syllabic_mapping.json"
 SUBS   = OUT / "tablets_substituted.csv"
+HEADER = ["file","line","stem","ending","number","raw_span","stem_label","ending_label"]
 
+def is_syllabic_file(name):
+    """ht_syllabic_ledger names tablets by stem; AB rows carry the .txt file name."""
+    return not name.endswith(".txt")
+
+def upsert(path: Path, rows, header=HEADER):
+    """Replace the syllabic rows of the CSV at path with rows: every existing row of an
+    incoming file goes, and so do syllabic files no longer in the ledger (deleted, or no
+    longer classed as syllabic). AB rows are kept in order."""
+    rows = list(rows)
+    files = {r["file"] for r in rows}
+    kept, replaced = [], 0
+    if path.exists():
+        with path.open(encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                if r["file"] in files or is_syllabic_file(r["file"]):
+                    replaced += 1
+                    continue
+                kept.append(r)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=header, extrasaction="ignore", lineterminator="\n")
+        w.writeheader(); w.writerows(kept); w.writerows(rows)
+    os.replace(tmp, path)
+    return len(rows), replaced
+
+def load_mapping():
+    return json.loads(MAP.read_text(encoding="utf-8"))
+
+def substituted_row(file, line, item, number, raw, mapping):
+    """One ht_syllabic_ledger row in tablets_substituted form."""
+    item = item.strip()
+    m = mapping.get(item, {"commodity":"commodity?","unit":"unit?","confidence":"low"})
+    return {
+        "file": file,
+        "line": line or "Line ?",
+        "stem": item,                 # keep original syllabic item as 'stem' for traceability
+        "ending": m["unit"],          # reuse 'ending' as unit class
+        "number": number,
+        "raw_span": raw,
+        "stem_label": m["commodity"], # commodity label
+        "ending_label": m["unit"]
+    }
+
+@timed()
 def main():
-    mapping = json.loads(MAP.read_text(encoding="utf-8"))
-    rows = []
+    mapping = load_mapping()
     with LEDGER.open(encoding="utf-8") as f:
-        r = csv.DictReader(f)
-        for row in r:
-            item = row["item"].strip()
-            m = mapping.get(item, {"commodity":"commodity?","unit":"unit?","confidence":"low"})
-            rows.append({
-                "file": row["file"],
-                "line": "Line ?",
-                "stem": item,                 # keep original syllabic item as 'stem' for traceability
-                "ending": m["unit"],          # reuse 'ending' as unit class
-                "number": row["number"],
-                "raw_span": row["raw"],
-                "stem_label": m["commodity"], # commodity label
-                "ending_label": m["unit"]
-            })
-    header = ["file","line","stem","ending","number","raw_span","stem_label","ending_label"]
-    mode = "a" if SUBS.exists() else "w"
-    with SUBS.open(mode, newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=header)
-        if mode == "w": w.writeheader()
-        w.writerows(rows)
-    print(f"Appended {len(rows)} rows to {SUBS}")
+        rows = [substituted_row(row["file"], row.get("line"), row["item"], row["number"], row["raw"], mapping)
+                for row in csv.DictReader(f)]
+    merged, replaced = upsert(SUBS, rows)
+    st = current(); st.input(LEDGER, MAP); st.output(SUBS); st.rows_in, st.rows_out = len(rows), merged
+    print(f"Upserted {merged} syllabic rows into {SUBS} ({replaced} existing syllabic rows replaced)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
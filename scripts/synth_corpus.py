@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Synthetic tablets in data/clean format, for scaling runs.
+
+Distributions come from the tables the real corpus produced:
+  signs    out/tables/freq_signs.csv              (sign, count)
+  ledger   out/tables/ab22_stem_ending_pairs.csv  (stem_tokens, ending_sign, count)
+  numbers  out/tables/freq_numbers.csv            (number, count)
+A table with fewer than --min-support distinct values is recounted from
+the corpus itself (--corpus). That covers an empty freq_signs.csv, because
+la_stats skips "Line N:" rows; recounted signs come from the free sign runs
+only, not from the AB22 ledger lines. Lines per tablet, the share of
+"stem AB22 ending N" lines and the length of free sign runs always come
+from the corpus. --scale multiplies the corpus file count (9 -> 90 at 10×).
+
+  python3 scripts/synth_corpus.py --scale 100 -o out/synth/x100     # 100 × the real tablet count
+  python3 scripts/synth_corpus.py --tablets 5000 --seed 7 -o /tmp/synth
+"""
+import csv, argparse
+from pathlib import Path
+from collections import Counter
+import numpy as np
+
+from words_from_segments import tokenize_line, AB, NUM
+
+LINK = "AB22"
+
+def _read_counts(path, key_cols, count_col="count"):
+    path = Path(path)
+    if not path.exists():
+        return Counter()
+    with path.open(encoding="utf-8") as f:
+        return Counter({tuple(r[c] for c in key_cols): int(r[count_col]) for r in csv.DictReader(f)})
+
+def corpus_counts(corpus: Path):
+    """Free-run sign, number, ledger-pair, run-length and lines-per-tablet counts, the ledger-line share
+    and the file count of a corpus (syllabic tablets count as files but contribute no lines)."""
+    files = 0
+    signs, numbers, pairs, runs, per_tablet = Counter(), Counter(), Counter(), Counter(), Counter()
+    ledger = lines = 0
+    for f in sorted(Path(corpus).glob("*.txt")):
+        files, n = files + 1, 0
+        for raw in f.read_text(encoding="utf-8").splitlines():
+            toks = [t.upper() for t in tokenize_line(raw)] if ":" in raw else []
+            ab = [t for t in toks if AB.fullmatch(t)]
+            if not ab:
+                continue
+            n += 1
+            numbers.update(t for t in toks if NUM.fullmatch(t))
+            if LINK in ab[1:-1]:
+                i = ab.index(LINK, 1)
+                pairs[(" ".join(ab[:i]), ab[i + 1])] += 1
+                ledger += 1
+            else:
+                runs[len(ab)] += 1
+                signs.update(ab)
+        if n:
+            per_tablet[n] += 1
+        lines += n
+    return dict(signs=signs, numbers=numbers, pairs=pairs, runs=runs, per_tablet=per_tablet,
+                ledger_share=ledger / lines if lines else 0.5, files=files)
+
+class Sampler:
+    def __init__(self, tables="out/tables", corpus="data/clean", min_support=10):
+        c = corpus_counts(Path(corpus))
+        t = Path(tables)
+        pick = lambda table, fallback: table if len(table) >= min_support else fallback
+        self.signs = pick(Counter({k[0]: v for k, v in _read_counts(t / "freq_signs.csv", ["sign"]).items()}), c["signs"])
+        self.numbers = pick(Counter({k[0]: v for k, v in _read_counts(t / "freq_numbers.csv", ["number"]).items()}), c["numbers"])
+        self.pairs = pick(_read_counts(t / "ab22_stem_ending_pairs.csv", ["stem_tokens", "ending_sign"]), c["pairs"])
+        self.runs, self.per_tablet = c["runs"] or Counter({4: 1}), c["per_tablet"] or Counter({7: 1})
+        self.ledger_share, self.real_tablets = c["ledger_share"], c["files"] or 1
+
+    @staticmethod
+    def _dist(counter):
+        keys = list(counter)
+        p = np.array([counter[k] for k in keys], float)
+        return keys, p / p.sum()
+
+    def tablets(self, n, seed=0, prefix="SY"):
+        """Yield (file name, text) for n synthetic tablets."""
+        rng = np.random.default_rng(seed)
+        sign_k, sign_p = self._dist(self.signs)
+        num_k, num_p = self._dist(self.numbers)
+        pair_k, pair_p = self._dist(self.pairs)
+        run_k, run_p = self._dist(self.runs)
+        tab_k, tab_p = self._dist(self.per_tablet)
+        n_lines = np.array(tab_k)[rng.choice(len(tab_k), n, p=tab_p)]
+        total = int(n_lines.sum())
+        # every per-line draw for the whole corpus up front
+        is_ledger = rng.random(total) < self.ledger_share
+        pair_i = rng.choice(len(pair_k), total, p=pair_p)
+        num_i = rng.choice(len(num_k), total, p=num_p)
+        run_len = np.array(run_k)[rng.choice(len(run_k), total, p=run_p)]
+        sign_i = iter(rng.choice(len(sign_k), int(run_len[~is_ledger].sum()), p=sign_p).tolist())
+        j = 0
+        for t, k in enumerate(n_lines.tolist(), start=1):
+            out = [f"{prefix} {t} (AB signs)", ""]
+            for ln in range(1, k + 1):
+                if is_ledger[j]:
+                    stem, ending = pair_k[pair_i[j]]
+                    body = f"{stem} {LINK} {ending}"
+                else:
+                    body = " ".join(sign_k[next(sign_i)] for _ in range(run_len[j]))
+                out.append(f"Line {ln}: {body} {num_k[num_i[j]]}")
+                j += 1
+            yield f"{prefix}{t:05d}.txt", "\n".join(out) + "\n"
+
+def write_corpus(outdir, n_tablets, seed=0, sampler=None):
+    """Write n synthetic tablets into outdir (old *.txt there are removed); returns (files, lines, bytes)."""
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    for old in outdir.glob("*.txt"):
+        old.unlink()
+    sampler = sampler or Sampler()
+    files = lines = size = 0
+    for name, text in sampler.tablets(n_tablets, seed):
+        (outdir / name).write_text(text, encoding="utf-8")
+        files += 1; lines += text.count("\nLine "); size += len(text.encode("utf-8"))
+    return files, lines, size
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Synthetic data/clean-format tablets sampled from the real distributions.")
+    ap.add_argument("--scale", type=float, default=10, help="multiple of the real tablet count (files in --corpus)")
+    ap.add_argument("--tablets", type=int, default=None, help="exact tablet count (overrides --scale)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--tables", default="out/tables")
+    ap.add_argument("--corpus", default="data/clean")
+    ap.add_argument("--min-support", type=int, default=10, help="fewer distinct values than this -> recount from --corpus")
+    ap.add_argument("-o","--outdir", default=None, help="default out/synth/x<scale>")
+    a = ap.parse_args()
+
+    sampler = Sampler(a.tables, a.corpus, a.min_support)
+    n = a.tablets or max(1, round(a.scale * sampler.real_tablets))
+    outdir = Path(a.outdir or f"out/synth/x{a.scale:g}")
+    files, lines, size = write_corpus(outdir, n, a.seed, sampler)
+    print(f"Wrote {files} tablets, {lines} lines, {size/2**20:.2f} MB to {outdir}")
@@ -5,6 +5,10 @@ import pandas as pd
 import re
 from collections import defaultdict
 
+from render_cache import RenderCache, compile_templates, group_digests
+
+TEMPLATES = compile_templates(readable="Tablet $file — commodity totals:\n\n$rows$triads\n")
+
 # -------- helpers --------
 
 def load_glossary(path="out/tables/glossary_hypothesis.tsv"):
@@ -75,7 +79,8 @@ def main(seq_csv="out/tables/structured_sequences.csv",
          out_summary="out/tables/tablet_summary.csv",
          out_totals="out/tables/tablet_totals.csv",
          out_triads="out/tables/triads_detected.csv",
-         out_readable_dir="out/readable"):
+         out_readable_dir="out/readable",
+         force=False):
 
     stem_map, unit_map = load_glossary(glossary)
     df = pd.read_csv(seq_csv)
@@ -118,24 +123,27 @@ def main(seq_csv="out/tables/structured_sequences.csv",
     triads = pd.DataFrame(triad_rows).sort_values(["file","line"])
     out3 = Path(out_triads); triads.to_csv(out3, index=False)
 
-    # Output 4: readable per-tablet summaries
-    out_dir = Path(out_readable_dir); out_dir.mkdir(parents=True, exist_ok=True)
-    for f, g in totals.groupby("file"):
-        lines = [f"Tablet {f} — commodity totals:\n"]
-        for _, r in g.iterrows():
-            qty = "?" if pd.isna(r["n"]) else int(r["n"])
-            lines.append(f"  • {r['commodity']:<10}  {qty} × {r['unit']}")
-        # add triad note
-        tri_g = triads[(triads["file"]==f) & (triads["triad_grain_oil_wine"]==True)]
-        if not tri_g.empty:
-            lines.append("\n  Triad lines (grain+oil+wine): " +
-                         ", ".join(str(int(x)) for x in tri_g["line"].tolist()))
-        Path(out_dir, f.replace(".txt","_summary.txt")).write_text("\n".join(lines) + "\n")
+    # Output 4: readable per-tablet summaries (only tablets whose totals/triads changed)
+    out_dir = Path(out_readable_dir)
+    tri_lines = triads[triads["triad_grain_oil_wine"] == True].groupby("file")["line"] \
+                    .agg(lambda s: ", ".join(str(int(x)) for x in s)).to_dict()
+    with RenderCache(out_dir, TEMPLATES.values(), force) as cache:
+        digests = group_digests(totals, "file")
+        for f, g in totals.groupby("file"):
+            name = f.replace(".txt","_summary.txt")
+            key = cache.key(digests[f], tri_lines.get(f, ""))
+            if cache.fresh(name, key):
+                continue
+            rows = [f"  • {c:<10}  {'?' if pd.isna(n) else int(n)} × {u}"
+                    for c, n, u in zip(g["commodity"], g["n"], g["unit"])]
+            # add triad note
+            tri = f"\n\n  Triad lines (grain+oil+wine): {tri_lines[f]}" if f in tri_lines else ""
+            cache.put(name, key, TEMPLATES["readable"].substitute(file=f, rows="\n".join(rows), triads=tri))
 
     print(f"Wrote line-level summary: {out1}")
     print(f"Wrote totals: {out2}")
     print(f"Wrote triad detection: {out3}")
-    print(f"Wrote readable summaries to: {out_dir}")
+    print(f"Wrote readable summaries to: {out_dir} ({cache.report()})")
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
@@ -145,5 +153,7 @@ if __name__ == "__main__":
     ap.add_argument("--out_totals", default="out/tables/tablet_totals.csv")
     ap.add_argument("--out_triads", default="out/tables/triads_detected.csv")
     ap.add_argument("--out_readable_dir", default="out/readable")
+    ap.add_argument("--force", action="store_true", help="ignore the render manifest and rewrite everything")
     args = ap.parse_args()
-    main(args.seq_csv, args.glossary, args.out_summary, args.out_totals, args.out_triads, args.out_readable_dir)
\ No newline at end of file
+    main(args.seq_csv, args.glossary, args.out_summary, args.out_totals, args.out_triads, args.out_readable_dir,
+         args.force)
\ No newline at end of file
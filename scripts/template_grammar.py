@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Declarative line templates compiled to one automaton.
+
+A template is a regular expression over *tokens*, written with token
+classes and literal signs:
+
+    STEM{1,3} LINK UNIT NUM?
+    AB AB LINK AB (NONNUM{0,4} NUM)?
+    AB81 AB02 LINK (AB67 | AB28) NUM
+
+  classes   AB STEM LINK UNIT NUM NONNUM IDEO  and  .  (any token)
+  literals  any sign, e.g. AB81
+  operators ( )  |  ?  *  +  {m}  {m,}  {m,n}
+
+All templates are compiled into a single Thompson NFA (epsilon closures
+precomputed, transitions cached per state × token signature), so every line
+is scanned once for all templates and every match is reported with its span;
+leftmost-longest matching keeps one thread per state per template instead.
+
+  python3 scripts/template_grammar.py -d data/clean -t "entry=STEM{1,3} LINK UNIT NUM?"
+"""
+import re, csv, argparse
+from pathlib import Path
+from collections import Counter, namedtuple
+
+TemplateMatch = namedtuple("TemplateMatch", "template start end tokens")
+
+AB_RX  = re.compile(r"AB\d{1,3}", re.I)
+NUM_RX = re.compile(r"\d+")
+IDEO_RX= re.compile(r"\*\d+[A-Z]+", re.I)
+
+LINK_SIGNS = {"AB22"}
+# second sign of the canonical AB22 units (structured_reader.CANON_UNITS)
+UNIT_SIGNS = {"AB67", "AB03", "AB09", "AB59", "AB40", "AB41", "AB54", "AB28"}
+
+def default_classes(link_signs=LINK_SIGNS, unit_signs=UNIT_SIGNS):
+    """{class name: predicate(token)}; token is already upper-cased."""
+    is_ab = lambda t: bool(AB_RX.fullmatch(t))
+    is_num = lambda t: bool(NUM_RX.fullmatch(t))
+    return {
+        "AB":     is_ab,
+        "LINK":   lambda t: t in link_signs,
+        "STEM":   lambda t: is_ab(t) and t not in link_signs,
+        "UNIT":   lambda t: t in unit_signs,
+        "NUM":    is_num,
+        "NONNUM": lambda t: not is_num(t),
+        "IDEO":   lambda t: bool(IDEO_RX.fullmatch(t)),
+    }
+
+# --- parsing -------------------------------------------------------------------
+
+TOKEN_RX = re.compile(r"\s*(?:(\{\d+(?:,\d*)?\})|([()|?*+.])|([A-Za-z_][A-Za-z0-9_]*))")
+
+def _lex(text):
+    pos, out = 0, []
+    text = text.strip()
+    while pos < len(text):
+        m = TOKEN_RX.match(text, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"bad template near: {text[pos:]!r}")
+        out.append(m.group(1) or m.group(2) or m.group(3))
+        pos = m.end()
+    return out
+
+class _Parser:
+    """Recursive descent -> AST of ('atom', label) / ('seq', [..]) / ('alt', [..]) / ('rep', node, m, n)."""
+    def __init__(self, text, classes):
+        self.toks, self.i, self.classes = _lex(text), 0, classes
+
+    def peek(self):
+        return self.toks[self.i] if self.i < len(self.toks) else None
+
+    def parse(self):
+        node = self.alt()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.peek()!r}")
+        return node
+
+    def alt(self):
+        opts = [self.seq()]
+        while self.peek() == "|":
+            self.i += 1; opts.append(self.seq())
+        return opts[0] if len(opts) == 1 else ("alt", opts)
+
+    def seq(self):
+        items = []
+        while self.peek() not in (None, "|", ")"):
+            items.append(self.item())
+        return ("seq", items)
+
+    def item(self):
+        node = self.atom()
+        while self.peek() is not None and (self.peek() in "?*+" or self.peek().startswith("{")):
+            q = self.toks[self.i]; self.i += 1
+            if q == "?":   node = ("rep", node, 0, 1)
+            elif q == "*": node = ("rep", node, 0, None)
+            elif q == "+": node = ("rep", node, 1, None)
+            else:
+                lo, comma, hi = q[1:-1].partition(",")
+                m = int(lo)
+                n = m if not comma else (int(hi) if hi else None)
+                if n is not None and n < m:
+                    raise ValueError(f"bad repeat {q}")
+                node = ("rep", node, m, n)
+        return node
+
+    def atom(self):
+        t = self.peek()
+        if t is None:
+            raise ValueError("template ends early")
+        self.i += 1
+        if t == "(":
+            node = self.alt()
+            if self.peek() != ")":
+                raise ValueError("missing ')'")
+            self.i += 1
+            return node
+        if t == ".":
+            return ("atom", ("any", None))
+        if t in self.classes:
+            return ("atom", ("class", t))
+        if t.isupper() or t[:2].upper() == "AB":
+            return ("atom", ("lit", t.upper()))
+        raise ValueError(f"unknown token class {t!r}")
+
+# --- NFA -----------------------------------------------------------------------
+
+class TemplateSet:
+    """Several named templates matched simultaneously in one pass per line."""
+    def __init__(self, templates, classes=None):
+        self.classes = classes or default_classes()
+        self.names = list(templates)
+        self.eps, self.edges, self.accept, self.starts = [], [], {}, []
+        self.literals = set()
+        self.start = self._state()
+        for tid, name in enumerate(self.names):
+            ast = _Parser(templates[name], self.classes).parse()
+            s, e = self._build(ast)
+            self.eps[self.start].append(s)
+            self.accept[e] = tid; self.starts.append((s, e))
+        self.closure = [self._closure({s}) for s in range(len(self.eps))]
+        self._sig_cache, self._step_cache = {}, {}
+
+    def _state(self):
+        self.eps.append([]); self.edges.append([])
+        return len(self.eps) - 1
+
+    def _build(self, node):
+        kind = node[0]
+        if kind == "atom":
+            s, e = self._state(), self._state()
+            self.edges[s].append((node[1], e))
+            if node[1][0] == "lit":
+                self.literals.add(node[1][1])
+            return s, e
+        if kind == "seq":
+            s = e = self._state()
+            for child in node[1]:
+                cs, ce = self._build(child)
+                self.eps[e].append(cs); e = ce
+            return s, e
+        if kind == "alt":
+            s, e = self._state(), self._state()
+            for child in node[1]:
+                cs, ce = self._build(child)
+                self.eps[s].append(cs); self.eps[ce].append(e)
+            return s, e
+        _, child, m, n = node
+        s = e = self._state()
+        for _ in range(m):
+            cs, ce = self._build(child)
+            self.eps[e].append(cs); e = ce
+        if n is None:
+            cs, ce = self._build(child)
+            self.eps[e].append(cs); self.eps[ce].append(cs)
+            end = self._state()
+            self.eps[e].append(end); self.eps[ce].append(end)
+            return s, end
+        end = self._state()
+        for _ in range(n - m):
+            self.eps[e].append(end)
+            cs, ce = self._build(child)
+            self.eps[e].append(cs); e = ce
+        self.eps[e].append(end)
+        return s, end
+
+    def _closure(self, states):
+        stack, seen = list(states), set(states)
+        while stack:
+            for t in self.eps[stack.pop()]:
+                if t not in seen:
+                    seen.add(t); stack.append(t)
+        return frozenset(seen)
+
+    def signature(self, tok):
+        sig = self._sig_cache.get(tok)
+        if sig is None:
+            lit = tok if tok in self.literals else None
+            sig = (lit, frozenset(c for c, pred in self.classes.items() if pred(tok)))
+            self._sig_cache[tok] = sig
+        return sig
+
+    def _step(self, state, sig):
+        key = (state, sig)
+        nxt = self._step_cache.get(key)
+        if nxt is None:
+            lit, classes = sig
+            out = set()
+            for (kind, val), tgt in self.edges[state]:
+                if kind == "any" or (kind == "class" and val in classes) or (kind == "lit" and val == lit):
+                    out |= self.closure[tgt]
+            nxt = self._step_cache[key] = frozenset(out)
+        return nxt
+
+    def _longest(self, tid, toks):
+        """Pike VM for one template: one thread per state, carrying the smallest start that reaches it.
+
+        A smaller start in the same state can reach every end a larger one can, so the leftmost
+        match and its longest end survive the dedup; the scan stops once no thread can start at or
+        before the best match, and resumes at its end.
+        """
+        (s0, acc), n, cur = self.starts[tid], len(toks), 0
+        start_states = self.closure[s0]
+        while cur < n:
+            threads, best = {}, None
+            for pos in range(cur, n + 1):
+                if best is None:
+                    for s in start_states:
+                        threads.setdefault(s, pos)
+                st = threads.get(acc)
+                if st is not None and pos > st:     # st <= best start once threads are pruned
+                    best = (st, pos)
+                if best is not None:
+                    threads = {s: st for s, st in threads.items() if st <= best[0]}
+                if pos == n or (best is not None and not threads):
+                    break
+                sig, nxt = self.signature(toks[pos]), {}
+                for s, st in threads.items():
+                    for t in self._step(s, sig):
+                        if st < nxt.get(t, n + 1):
+                            nxt[t] = st
+                threads = nxt
+            if best is None:
+                break
+            yield (tid,) + best
+            cur = best[1]
+
+    def finditer(self, tokens, overlap="all"):
+        """
+        overlap="all"      every (template, start, end) match
+        overlap="longest"  per template, leftmost-longest non-overlapping matches
+
+        "all" tracks a thread per (state, start) and may report every span, so it is
+        O(n² · states) per line; "longest" keeps one thread per state and is
+        O(n · states) per scan, rescanning only what follows a match end.
+        """
+        toks = [t.upper() for t in tokens]
+        if overlap == "longest":
+            return [TemplateMatch(self.names[tid], st, en, tokens[st:en])
+                    for t in range(len(self.names)) for tid, st, en in self._longest(t, toks)]
+        found = []
+        threads = set()           # (nfa state, start position)
+        start_states = self.closure[self.start]
+        for pos in range(len(toks) + 1):
+            threads |= {(s, pos) for s in start_states}
+            for s, st in threads:
+                tid = self.accept.get(s)
+                if tid is not None and pos > st:
+                    found.append((tid, st, pos))
+            if pos == len(toks):
+                break
+            sig = self.signature(toks[pos])
+            threads = {(t, st) for s, st in threads for t in self._step(s, sig)}
+        found = sorted(set(found), key=lambda m: (m[0], m[1], -m[2]))
+        return [TemplateMatch(self.names[tid], st, en, tokens[st:en]) for tid, st, en in found]
+
+def parse_templates(specs):
+    """["name=TEMPLATE", "TEMPLATE", ...] -> {name: template}."""
+    out = {}
+    for i, spec in enumerate(specs, start=1):
+        name, sep, body = spec.partition("=")
+        if not sep or not re.fullmatch(r"[\w-]+", name.strip()):
+            name, body = f"t{i}", spec
+        out[name.strip()] = body.strip()
+    return out
+
+if __name__ == "__main__":
+    from words_from_segments import tokenize_line
+
+    ap = argparse.ArgumentParser(description="Match declarative token templates across all lines in one pass.")
+    ap.add_argument("-d","--dir", required=True, help="data/clean")
+    ap.add_argument("-t","--template", action="append", required=True,
+                    help='e.g. "entry=STEM{1,3} LINK UNIT NUM?" (repeatable)')
+    ap.add_argument("--overlap", choices=["all","longest"], default="longest")
+    ap.add_argument("--link", action="append", default=None, help="signs in class LINK (default AB22)")
+    ap.add_argument("--unit", action="append", default=None, help="signs in class UNIT")
+    ap.add_argument("-o","--out", default="out/tables/template_matches.csv")
+    a = ap.parse_args()
+
+    classes = default_classes(set(s.upper() for s in a.link) if a.link else LINK_SIGNS,
+                              set(s.upper() for s in a.unit) if a.unit else UNIT_SIGNS)
+    ts = TemplateSet(parse_templates(a.template), classes)
+
+    hits = Counter()
+    Path(a.out).parent.mkdir(parents=True, exist_ok=True)
+    with open(a.out, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f); w.writerow(["template","file","line","start","end","tokens"])
+        for p in sorted(Path(a.dir).glob("*.txt")):
+            for li, raw in enumerate(p.read_text(encoding="utf-8").splitlines(), start=1):
+                toks = tokenize_line(raw)
+                if not toks: continue
+                for m in ts.finditer(toks, a.overlap):
+                    hits[m.template] += 1
+                    w.writerow([m.template, p.name, li, m.start, m.end, " ".join(m.tokens)])
+    for name in ts.names:
+        print(f"{name}: {hits[name]} matches")
+    print(f"Wrote {a.out}")
@@ -2,6 +2,7 @@
 import re, csv, argparse
 from pathlib import Path
 from collections import Counter, defaultdict
+from sign_matcher import SignMatcher
 
 AB   = re.compile(r"\bAB\d{1,3}\b", re.I)
 IDEO = re.compile(r"\*\d+[A-Z]+", re.I)
@@ -36,9 +37,11 @@ if __name__=="__main__":
     ap.add_argument("-d","--dir", required=True, help="data/clean")
     ap.add_argument("-o","--outdir", default="out/tables")
     ap.add_argument("--min-stem-len", type=int, default=1)
+    ap.add_argument("--link", action="append", default=None, help='Link sign(s) to probe around (repeatable; default "AB22")')
     a=ap.parse_args()
 
     segs = segments_from_dir(Path(a.dir))
+    links = SignMatcher.from_patterns(a.link or ["AB22"], kind="link")
 
     # Collect all occurrences of ... AB22 ...
     endings = Counter()
@@ -47,23 +50,23 @@ if __name__=="__main__":
     examples= {}          # (stem_tuple, ending_sign) -> "file: segment"
 
     for fname, s in segs:
-        for i, tok in enumerate(s):
-            if tok == "AB22":
-                # left stem: everything before AB22 in this segment
-                stem = tuple(s[:i]) if i>=a.min_stem_len else None
-                # right ending: the sign immediately after AB22 (if any)
-                ending = s[i+1] if i+1 < len(s) else None
-                if stem and ending:
-                    stems.update([stem])
-                    endings.update([ending])
-                    pairs.update([(stem, ending)])
-                    key = (stem, ending)
-                    if key not in examples:
-                        # format an example snippet
-                        left = " ".join(stem)
-                        ex = f"{left} AB22 {ending}"
-                        examples[key] = f"{fname}: {ex}"
-                # continue scanning the segment (there could be multiple AB22s)
+        # every link occurrence in one automaton pass
+        for m in links.longest(s):
+            i = m.start
+            # left stem: everything before the link in this segment
+            stem = tuple(s[:i]) if i>=a.min_stem_len else None
+            # right ending: the sign immediately after the link (if any)
+            ending = s[m.end] if m.end < len(s) else None
+            if stem and ending:
+                stems.update([stem])
+                endings.update([ending])
+                pairs.update([(stem, ending)])
+                key = (stem, ending)
+                if key not in examples:
+                    # format an example snippet
+                    left = " ".join(stem)
+                    ex = f"{left} {' '.join(m.pattern)} {ending}"
+                    examples[key] = f"{fname}: {ex}"
 
     out = Path(a.outdir); out.mkdir(parents=True, exist_ok=True)
 
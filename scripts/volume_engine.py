@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Vectorized volume engine shared by compute_volumes_from_subs.py,
+report_volumes.py and out/tables/tablet_volumes.py.
+
+  rows ─ resolve_units ─ unit_liters ─ aggregate ─▶ (file, commodity, unit, count, liters)
+                                           └─ commodity_matrix ─▶ tablets × commodities
+                                                  └─ triad_columns ─ normalize_ratios ─ match_triads / classify
+
+Units are looked up through categorical codes (one table lookup per distinct
+unit, not per row); ratios, triad matching and classification are NumPy
+operations over the whole tablet × commodity matrix.
+"""
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+VOL_JSON = ROOT / "data" / "volumes.json"
+
+# Aliases: map raw endings → unit names
+UNIT_ALIASES = {
+    "AB22 AB67": "big_jar",
+    "AB22 AB03": "small_jar",
+    "AB22 AB09": "amphoraA",
+    "AB22 AB59": "amphoraB",
+    "AB22 AB28": "large_measure",
+    "AB22 AB40": "measure_tag",
+    "AB22 AB54": "unit?",
+    "AB22 AB69": "big_jar",   # guess
+}
+
+# Default volumes if data/volumes.json not found
+DEFAULT_VOLUMES = {
+    "small_jar": 5.0,
+    "big_jar": 50.0,
+    "amphoraA": 30.0,
+    "amphoraB": 30.0,
+    "large_measure": 10.0,
+    "measure_tag": 1.0,
+    "unit?": 0.0,
+}
+
+# --- Known target triad ratios (grain:oil:wine) ---
+KNOWN_TRIADS = [
+    (12, 1, 6),   # storage/offering ratio
+    (10, 1, 5),   # ration variant
+]
+
+# triad axis -> commodity labels summed into it
+TRIAD_COLUMNS = {"grain": ("grain",), "oil": ("oil",), "wine": ("wineA", "wineB")}
+
+def load_volumes():
+    if VOL_JSON.exists():
+        return json.loads(VOL_JSON.read_text(encoding="utf-8"))
+    return DEFAULT_VOLUMES
+
+def _clean(s: pd.Series) -> pd.Series:
+    return s.fillna("").astype(str).str.strip()
+
+def resolve_units(df: pd.DataFrame) -> pd.Series:
+    """ending_label if it is a known unit, else the raw ending through UNIT_ALIASES, else 'unit?'."""
+    label = _clean(df["ending_label"]) if "ending_label" in df else pd.Series("", index=df.index)
+    ending = _clean(df["ending"]) if "ending" in df else pd.Series("", index=df.index)
+    aliased = ending.map(UNIT_ALIASES).fillna("unit?")
+    return label.where(label.isin(list(DEFAULT_VOLUMES)), aliased)
+
+def unit_liters(units: pd.Series, volumes, default=0.0) -> np.ndarray:
+    """Liters per unit, looked up once per category and broadcast through the codes."""
+    cat = pd.Categorical(units)
+    table = np.array([volumes.get(u, default) for u in cat.categories] + [default])
+    return table[cat.codes]      # code -1 (missing) hits the trailing default
+
+def aggregate(df: pd.DataFrame, volumes) -> pd.DataFrame:
+    """tablets_substituted rows -> file, commodity, unit, count, liters (sorted by key)."""
+    number = _clean(df["number"])
+    df, number = df[number != ""], number[number != ""]     # rows without a count are skipped
+    out = pd.DataFrame({
+        "file": df["file"].astype(str),
+        "commodity": _clean(df["stem_label"]).replace("", "commodity?") if "stem_label" in df
+                     else "commodity?",
+        "unit": resolve_units(df),
+        "count": number.astype(float).astype(int),
+    })
+    out = out.groupby(["file", "commodity", "unit"], sort=True, as_index=False)["count"].sum()
+    out["liters"] = out["count"] * unit_liters(out["unit"], volumes)
+    return out
+
+def records(vol: pd.DataFrame):
+    """Plain-Python (file, commodity, unit, count, liters) tuples for writers."""
+    return zip(vol["file"].tolist(), vol["commodity"].tolist(), vol["unit"].tolist(),
+               vol["count"].tolist(), vol["liters"].astype(float).tolist())
+
+def tablet_totals(vol: pd.DataFrame, value="liters", sort=True) -> pd.Series:
+    """Sum of value per (file, commodity); sort=False keeps first-appearance order."""
+    return vol.groupby(["file", "commodity"], sort=sort)[value].sum()
+
+def commodity_matrix(vol: pd.DataFrame, value="liters", sort=True) -> pd.DataFrame:
+    """Groupby-sum into a tablets × commodities frame (index file)."""
+    totals = tablet_totals(vol, value, sort)
+    m = totals.unstack("commodity", fill_value=0.0)
+    return m if sort else m.reindex(totals.index.get_level_values("file").unique())
+
+def triad_columns(matrix: pd.DataFrame) -> np.ndarray:
+    """(n_tablets, 3) grain/oil/wine liters from a commodity matrix."""
+    cols = []
+    for labels in TRIAD_COLUMNS.values():
+        present = [c for c in labels if c in matrix.columns]
+        cols.append(matrix[present].to_numpy(float).sum(axis=1) if present else np.zeros(len(matrix)))
+    return np.column_stack(cols) if cols else np.zeros((len(matrix), 0))
+
+def normalize_ratios(X: np.ndarray, precision=1) -> np.ndarray:
+    """Divide each row by its smallest positive entry (rows of zeros -> base 1); zeros stay 0.
+    precision=None skips rounding."""
+    X = np.asarray(X, float)
+    base = np.where(X > 0, X, np.inf).min(axis=1)
+    base[~np.isfinite(base)] = 1.0
+    R = X / base[:, None]
+    if precision is not None:
+        np.round(R, precision, out=R)
+    R[X <= 0] = 0.0
+    return R
+
+def match_triads(ratios: np.ndarray, triads=KNOWN_TRIADS, tol=1.0) -> np.ndarray:
+    """Index of the first known triad within tol on every axis, -1 if none (or any axis is 0)."""
+    R = np.asarray(ratios, float)
+    T = np.asarray(triads, float)
+    hit = (np.abs(R[:, None, :] - T[None, :, :]) <= tol).all(axis=2)      # tablets × triads
+    hit &= (R > 0).all(axis=1)[:, None]
+    return np.where(hit.any(axis=1), hit.argmax(axis=1), -1)
+
+def classify(G: np.ndarray) -> np.ndarray:
+    """Rule-of-thumb type label per tablet from (grain, oil, wine) liters."""
+    grain, oil, wine = np.asarray(G, float).T
+    ratio = normalize_ratios(G, precision=None)
+    all3 = (grain > 0) & (oil > 0) & (wine > 0)
+    # Very loose acceptance for “triadic-like”
+    triadic = all3 & (ratio[:, 0] >= 8) & (ratio[:, 1] >= 1) & (ratio[:, 2] >= 6)
+    return np.select([triadic, all3, (grain > 0) & (wine == 0)],
+                     ["triadic_ledger", "mixed_ledger", "grain_dominant"], default="other")
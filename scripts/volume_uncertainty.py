@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo volumes: unit capacities are distributions, not point guesses.
+
+Counts from tablets_substituted.csv are folded into a (tablet·commodity) × unit
+count matrix C once (volume_engine.aggregate). Capacities are drawn as a
+samples × units matrix V, so every draw of every tablet total is one matmul
+C @ V.T. Liters are linear in the unit volumes, so means and SDs follow
+from the per-unit sample moments over all draws, and triad-match
+probabilities use tablet-level (grain, oil, wine) × unit counts over all
+draws (only tablets listing all three are tested). Quantiles and commodity
+shares need per-row draws: these are pooled for the first --quantile-draws
+draws (default: every draw, up to QUANTILE_CELLS pooled values per table,
+so past 5,000 (tablet, commodity) rows fewer than 1,000 draws are pooled)
+and each percentile is taken once over the pool. Draws are independent, so
+the first k are a uniform sample of all of them.
+
+Distributions (JSON, --dists), one entry per unit:
+  {"big_jar": {"dist": "range", "low": 20, "high": 50},
+   "amphoraA": {"dist": "lognormal", "median": 30, "sigma": 0.25},
+   "measure_tag": {"dist": "fixed", "value": 1}}
+Units without an entry keep their load_volumes() value.
+
+Outputs (outputs/):
+  volume_uncertainty_tablets.csv   file, total mean/sd/CI, P(triad match) per known triad
+  volume_uncertainty_shares.csv    file, commodity, liters and share mean/CI
+
+  python3 scripts/volume_uncertainty.py --draws 100000
+"""
+import json, time, argparse
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from volume_engine import (KNOWN_TRIADS, TRIAD_COLUMNS, load_volumes, aggregate,
+                           normalize_ratios, match_triads)
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT = ROOT / "outputs"
+SUBS = OUT / "tablets_substituted.csv"
+
+# Spans the two sets of point guesses (volume_engine.DEFAULT_VOLUMES vs out/tables/tablet_volumes.py)
+DEFAULT_UNIT_DISTS = {
+    "big_jar":       {"dist": "range", "low": 20, "high": 50},
+    "small_jar":     {"dist": "range", "low": 4, "high": 6},
+    "amphoraA":      {"dist": "lognormal", "median": 30, "sigma": 0.25},
+    "amphoraB":      {"dist": "lognormal", "median": 30, "sigma": 0.25},
+    "large_measure": {"dist": "lognormal", "median": 10, "sigma": 0.5},
+    "measure_tag":   {"dist": "fixed", "value": 1},
+    "unit?":         {"dist": "range", "low": 0, "high": 1},
+}
+
+# dist -> parameters an entry must give
+DIST_PARAMS = {"range": ("low", "high"), "lognormal": ("median", "sigma"), "fixed": ("value",)}
+
+def load_dists(path=None):
+    if not path:
+        return DEFAULT_UNIT_DISTS
+    dists = json.loads(Path(path).read_text(encoding="utf-8"))
+    for u, d in dists.items():
+        kind = d.get("dist")
+        if kind not in DIST_PARAMS:
+            raise SystemExit(f"{path}: unit {u!r}: unknown dist {kind!r} (expected one of {', '.join(DIST_PARAMS)})")
+        missing = [k for k in DIST_PARAMS[kind] if k not in d]
+        if missing:
+            raise SystemExit(f"{path}: unit {u!r}: a {kind} distribution needs {', '.join(map(repr, missing))}")
+    return dists
+
+def sample_units(units, dists, volumes, n, rng):
+    """(n, len(units)) matrix of sampled capacities in liters."""
+    V = np.empty((n, len(units)))
+    for j, u in enumerate(units):
+        d = dists.get(u)
+        kind = d["dist"] if d else "fixed"
+        if kind == "range":
+            V[:, j] = rng.uniform(d["low"], d["high"], n)
+        elif kind == "lognormal":
+            V[:, j] = rng.lognormal(np.log(d["median"]), d["sigma"], n)
+        elif kind == "fixed":
+            V[:, j] = d["value"] if d else float(volumes.get(u, 0.0))
+        else:
+            raise ValueError(f"unknown distribution {kind!r} for unit {u}")
+    return V
+
+def count_matrix(vol: pd.DataFrame):
+    """(file, commodity) rows × unit columns of counts."""
+    C = vol.pivot_table(index=["file", "commodity"], columns="unit", values="count",
+                        aggfunc="sum", fill_value=0)
+    return C.index, list(C.columns), C.to_numpy(float)
+
+CHUNK_CELLS = 20_000_000      # draws × rows per block when chunk is not given (~160 MB float64)
+QUANTILE_CELLS = 5_000_000    # pooled draws × rows per quantile table by default (~40 MB float64 each)
+
+def segment_sums(M, starts):
+    """Row sums of M per segment starting at starts (np.add.reduceat rejects an empty M)."""
+    return np.add.reduceat(M, starts, axis=0) if len(M) else np.zeros((0,) + M.shape[1:])
+
+def simulate(vol: pd.DataFrame, dists, volumes, draws=10000, chunk=None, seed=0, q=(2.5, 50, 97.5),
+             quantile_draws=None):
+    keys, units, C = count_matrix(vol)
+    files = keys.get_level_values("file").unique()
+    fidx = pd.Index(files).get_indexer(keys.get_level_values("file"))
+    commodities = keys.get_level_values("commodity")
+    # rows are grouped by file (sorted pivot index): tablet counts are segment sums
+    starts = np.flatnonzero(np.r_[True, np.diff(fidx) != 0])
+    Ct = segment_sums(C, starts)                                                  # tablets × units
+    axes = np.stack([np.isin(commodities, labels) for labels in TRIAD_COLUMNS.values()])
+    Cg = np.stack([segment_sums(C * m[:, None], starts) for m in axes], axis=1)
+    # a triad needs all three axes: test only tablets with a count on each
+    cand = np.flatnonzero((Cg.sum(axis=2) > 0).all(axis=1))
+    Cg = Cg[cand].reshape(len(cand) * len(TRIAD_COLUMNS), len(units))        # (tablet, axis) × units
+
+    rng = np.random.default_rng(seed)
+    chunk = chunk or max(100, CHUNK_CELLS // max(1, len(keys)))
+    if quantile_draws is None:
+        quantile_draws = max(1, QUANTILE_CELLS // max(1, len(keys)))         # the cap wins over a draw floor
+    quantile_draws = min(quantile_draws, draws)
+    n_done, v_sum, v_sq = 0, np.zeros(len(units)), np.zeros(len(units))
+    hits = np.zeros((len(files), len(KNOWN_TRIADS)))
+    pool = {"liters": np.empty((quantile_draws, len(keys))), "total": np.empty((quantile_draws, len(files))),
+            "share": np.empty((quantile_draws, len(keys)))}
+    q_done = 0
+    while n_done < draws:
+        n = min(chunk, draws - n_done)
+        V = sample_units(units, dists, volumes, n, rng)                           # draws × units
+        v_sum += V.sum(axis=0); v_sq += (V**2).sum(axis=0)
+        if len(cand):
+            G = (V @ Cg.T).reshape(n * len(cand), len(TRIAD_COLUMNS))             # (draw, tablet) × grain/oil/wine
+            match = match_triads(normalize_ratios(G)).reshape(n, len(cand))
+            for k in range(len(KNOWN_TRIADS)):
+                hits[cand, k] += (match == k).sum(axis=0)
+        m = min(n, quantile_draws - q_done)
+        if m > 0:
+            # per-row draws only for quantiles and shares (ratios are not linear in V)
+            rows = slice(q_done, q_done + m)
+            L = np.matmul(V[:m], C.T, out=pool["liters"][rows])                  # draws × (tablet, commodity)
+            T = np.matmul(V[:m], Ct.T, out=pool["total"][rows])                  # draws × tablets
+            share = pool["share"][rows]
+            share[:] = 0
+            np.divide(L, T[:, fidx], out=share, where=T[:, fidx] > 0)
+            q_done += m
+        n_done += n
+
+    # liters are linear in independently drawn unit volumes: moments are exact from V's
+    v_mean = v_sum / draws
+    v_var = np.maximum(v_sq / draws - v_mean**2, 0)
+    moments = lambda M: (M @ v_mean, np.sqrt((M**2) @ v_var))
+    qs = {name: np.percentile(X, q, axis=0) for name, X in pool.items()}
+
+    mean, sd = moments(Ct)
+    tablets = pd.DataFrame({"file": files, "total_mean": mean, "total_sd": sd,
+                            **{f"total_p{p:g}": qs["total"][i] for i, p in enumerate(q)}})
+    for k, triad in enumerate(KNOWN_TRIADS):
+        tablets[f"p_triad_{':'.join(map(str, triad))}"] = hits[:, k] / draws
+    tablets["p_triad_any"] = hits.sum(axis=1) / draws
+
+    lm, lsd = moments(C)
+    shares = pd.DataFrame({"file": keys.get_level_values("file"), "commodity": commodities,
+                           "liters_mean": lm, "liters_sd": lsd,
+                           **{f"liters_p{p:g}": qs["liters"][i] for i, p in enumerate(q)},
+                           "share_mean": pool["share"].mean(axis=0),
+                           **{f"share_p{p:g}": qs["share"][i] for i, p in enumerate(q)}})
+    return tablets, shares
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Monte Carlo tablet volumes over unit-capacity distributions.")
+    ap.add_argument("--subs", default=str(SUBS))
+    ap.add_argument("--dists", default=None, help="JSON of per-unit distributions (default: built-in ranges)")
+    ap.add_argument("--draws", type=int, default=10000)
+    ap.add_argument("--chunk", type=int, default=None, help="draws per matmul block (default: sized to memory)")
+    ap.add_argument("--quantile-draws", type=int, default=None,
+                    help="draws pooled for CI quantiles and shares (default: all, within QUANTILE_CELLS)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o","--outdir", default=str(OUT))
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    volumes = load_volumes()
+    vol = aggregate(pd.read_csv(a.subs, dtype=str, keep_default_na=False), volumes)
+    tablets, shares = simulate(vol, load_dists(a.dists), volumes, a.draws, a.chunk, a.seed,
+                              quantile_draws=a.quantile_draws)
+
+    out = Path(a.outdir); out.mkdir(parents=True, exist_ok=True)
+    tablets.round(4).to_csv(out/"volume_uncertainty_tablets.csv", index=False)
+    shares.round(4).to_csv(out/"volume_uncertainty_shares.csv", index=False)
+    print(f"{a.draws} draws × {len(tablets)} tablets in {time.perf_counter() - t0:.2f}s")
+    print(f"✔ wrote {out/'volume_uncertainty_tablets.csv'}")
+    print(f"✔ wrote {out/'volume_uncertainty_shares.csv'}")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Watch data/clean and keep the derived tables current while tablets are
+added, edited or removed.
+
+  python3 scripts/watch.py                  # initial build, then poll every 0.2 s
+  python3 scripts/watch.py --once           # initial build only
+  python3 scripts/watch.py --debounce 1 -v  # longer quiet period, show every file written
+
+The directory is polled with os.scandir (mtime + size per *.txt; no
+dependencies). A burst of saves or file drops is handled as one batch once
+the directory has been quiet for --debounce seconds. A batch re-parses only the
+tablets that changed and keeps what each tablet contributes in memory, as
+its already-serialized slice of every table:
+
+  ledger        annotate_ledger.annotate_line         -> outputs/annotated_ledger.csv
+  sequences     streaming.substituted_rows (AB) and   -> outputs/structured_sequences.csv
+                syllabic_to_substituted (syllabic)       outputs/tablets_substituted.csv
+  volumes       VolumeAccumulator over the batch      -> outputs/tablet_volumes.csv/.txt
+  translations  render_translations.translate         -> outputs/proto_translations.csv, proto_translations/
+  publications  build_publications.render_publications -> outputs/publication/
+  co-occurrence cooccurrence_full.tablet_rows         -> out/tables/cooccurrence_full.csv
+  n-grams       la_stats.count_tablet                 -> out/tables/freq_*, bigrams, trigrams, ...
+
+Only the changed tablets are translated and rendered; the per-tablet txt/md
+files of other tablets are not touched, and a removed tablet's are deleted.
+The n-gram totals are updated by taking the old counts of a changed tablet
+out and adding the new ones. The CSVs are rewritten by joining the stored
+slices, so the cost of a batch is the changed tablets plus one write of
+each table. Measured on one core with 9,000 synthetic tablets
+(synth_corpus.py --tablets 9000): 0.2-0.35 s per single-tablet batch,
+0.66-0.87 s from the save to the rewritten publication with the default
+--poll/--debounce, and a 22 s initial build with no renders on disk.
+
+The tables hold the rows a full rebuild gives but not always in the same
+order: slices are joined in tablet file name order (the pipeline's
+co-occurrence table follows glob order and proto_translations sorts by the
+"file" column), and n-gram ties in most_common() order come out in the
+order their counts were last updated. A tablet that cannot be read
+(e.g. caught mid-save) keeps its previous rows and is retried on its next
+change; the tablets of a batch that fails to render are redone with the next
+batch. Every batch is one instrument stage ("watch.update").
+"""
+import os, io, csv, sys, time, argparse
+from pathlib import Path
+from contextlib import redirect_stdout
+import pandas as pd
+
+import la_stats, cooccurrence_full, ingest_syllabic, render_translations, build_publications
+from annotate_ledger import annotate_line, link_matcher, LEDGER_FIELDS
+from streaming import substituted_rows, SEQ_FIELDS, SUB_FIELDS
+from syllabic_to_substituted import substituted_row, load_mapping
+from compute_volumes_from_subs import VolumeAccumulator, load_volumes, volume_block
+from render_cache import RenderCache
+from instrument import stage
+
+ROOT = Path(__file__).resolve().parents[1]
+OUT = ROOT / "outputs"            # fixed: render_translations/build_publications write here
+VOL_FIELDS = ["file","commodity","unit","count","liters"]
+COOC_FIELDS = ["file","line","pair","stems"]
+
+def scan(indir: Path):
+    """{file name: (mtime_ns, size)} of the tablets in indir (editor temp/lock files skipped)."""
+    snap = {}
+    with os.scandir(indir) as it:
+        for e in it:
+            if e.name.endswith(".txt") and not e.name.startswith(".") and e.is_file():
+                st = e.stat()
+                snap[e.name] = (st.st_mtime_ns, st.st_size)
+    return snap
+
+def csv_text(rows, fields=None):
+    """CSV lines of rows (dicts when fields is given, else sequences), without a header."""
+    buf = io.StringIO()
+    if fields:
+        csv.DictWriter(buf, fields, extrasaction="ignore", lineterminator="\n").writerows(rows)
+    else:
+        csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+def header(fields):
+    return ",".join(fields) + "\n"
+
+def replace_text(path: Path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8", newline="")
+    os.replace(tmp, path)
+    print(f"✔ wrote {path}")
+
+class Corpus:
+    """What each tablet contributes to the derived tables, rebuilt per changed tablet."""
+    def __init__(self, indir: Path, tables: Path):
+        self.indir, self.tables = Path(indir), Path(tables)
+        self.matcher, self.volumes, self.mapping = link_matcher(), load_volumes(), load_mapping()
+        self.tablets, self.stamps = {}, {}
+        self.dropped = []              # "file" values whose renders are to be deleted (kept until a render succeeds)
+        self.counts = la_stats.counters()
+        self.trans_header = None
+        self.trans = RenderCache(render_translations.TRANS_DIR, render_translations.TEMPLATES.values())
+        self.pubs = RenderCache(build_publications.PUB, build_publications.TEMPLATES.values())
+
+    def parse(self, name):
+        path = self.indir / name
+        lines = path.read_text(encoding="utf-8").splitlines()
+        ledger = [r for raw in lines for r in annotate_line(name, raw, self.matcher)]
+        seqs = [r for idx, raw in enumerate(lines, start=1) for r in substituted_rows(name, idx, raw)]
+        subs = seqs + [substituted_row(*r, self.mapping) for r in ingest_syllabic.parse(path)]
+        return {"files": sorted({r["file"] for r in subs}), "n": len(subs), "rows": subs,
+                "ledger": csv_text(ledger, LEDGER_FIELDS), "seqs": csv_text(seqs, SEQ_FIELDS),
+                "subs": csv_text(subs, SUB_FIELDS), "counts": la_stats.count_tablet(path),
+                "cooc": csv_text(cooccurrence_full.tablet_rows(path), COOC_FIELDS),
+                "volumes": "", "volume_txt": "", "trans": ""}
+
+    def add_volumes(self, names):
+        """Liters of the named (just parsed) tablets, in one volume-engine pass for the batch."""
+        acc = VolumeAccumulator(self.volumes)
+        owner = {}
+        for n in names:
+            for r in self.tablets[n].pop("rows"):
+                acc.add(r)
+                owner[r["file"]] = n
+        if acc.skipped:
+            print(f"watch: {acc.skipped} rows without a count were not summed", file=sys.stderr)
+        per, totals = {n: [] for n in names}, {}
+        for rec in (acc.liters() if acc.counts else []):
+            file, commodity, liters = rec[0], rec[1], rec[4]
+            per[owner[file]].append(rec)
+            totals.setdefault(file, {}).setdefault(commodity, 0.0)
+            totals[file][commodity] += liters
+        for n in names:
+            t = self.tablets[n]
+            t["volumes"] = csv_text(per[n])
+            t["volume_txt"] = "".join(volume_block(f, totals[f]) for f in t["files"] if f in totals)
+
+    def update(self, snap):
+        """Re-parse changed/added tablets and drop removed ones; returns (changed, removed, failed)."""
+        changed = sorted(n for n in snap if self.stamps.get(n) != snap[n])
+        removed = sorted(set(self.stamps) - set(snap))
+        failed = []
+        for name in changed:
+            try:
+                new = self.parse(name)
+            except (OSError, UnicodeDecodeError, ValueError) as e:
+                failed.append(name)
+                print(f"watch: {name}: {e}", file=sys.stderr)
+                continue
+            self._forget(name, keep=new["files"])
+            self.tablets[name], self.stamps[name] = new, snap[name]
+            la_stats.add(self.counts, new["counts"])
+        for name in removed:
+            self._forget(name)
+            self.stamps.pop(name, None)
+        changed = [n for n in changed if n not in failed]
+        self.add_volumes(changed)
+        return changed, removed, failed
+
+    def _forget(self, name, keep=()):
+        old = self.tablets.pop(name, None)
+        if old:
+            la_stats.add(self.counts, old["counts"], -1)
+            self.dropped += [f for f in old["files"] if f not in keep]
+
+    def frame(self, names, key, fields):
+        """The stored rows of names as the frame pandas would read from the full CSV."""
+        return pd.read_csv(io.StringIO(header(fields) + "".join(self.tablets[n][key] for n in names)))
+
+    def render(self, changed):
+        """Translate and render the changed tablets; delete the renders of tablets that are gone."""
+        for f in self.dropped:
+            self.trans.drop(render_translations.tablet_file(f))
+            self.pubs.drop(build_publications.publication_file(f))
+        names = [n for n in changed if self.tablets[n]["n"]]
+        if names:
+            out = render_translations.translate(self.frame(names, "subs", SUB_FIELDS))
+            self.trans_header = header(out.columns)
+            owner = {f: n for n in names for f in self.tablets[n]["files"]}
+            chunks = {n: [] for n in changed}
+            for f, line in zip(out["file"], out.to_csv(index=False, header=False).splitlines(keepends=True)):
+                chunks[owner[f]].append(line)
+            for n in changed:
+                self.tablets[n]["trans"] = "".join(chunks[n])
+            render_translations.render_tablets(out, self.trans)
+            subs = build_publications.prepare(self.frame(names, "subs", SUB_FIELDS))
+            build_publications.render_publications(self.pubs, subs, self.frame(names, "volumes", VOL_FIELDS))
+        build_publications.write_index(self.pubs, sorted(f for t in self.tablets.values() for f in t["files"]))
+        for cache in (self.trans, self.pubs):
+            cache.close()
+            for p in cache.written:
+                print(f"✔ wrote {p}")
+            cache.written = []
+        self.dropped = []
+
+    def write(self):
+        """Rewrite every derived table from the stored slices; returns the substituted row count."""
+        order = sorted(self.tablets)
+        join = lambda key: "".join(self.tablets[n][key] for n in order)
+        replace_text(OUT / "annotated_ledger.csv", header(LEDGER_FIELDS) + join("ledger"))
+        replace_text(OUT / "structured_sequences.csv", header(SEQ_FIELDS) + join("seqs"))
+        replace_text(OUT / "tablets_substituted.csv", header(SUB_FIELDS) + join("subs"))
+        replace_text(OUT / "tablet_volumes.csv", header(VOL_FIELDS) + join("volumes"))
+        replace_text(OUT / "tablet_volumes.txt", join("volume_txt"))
+        if self.trans_header:
+            replace_text(Path(render_translations.MASTER_CSV), self.trans_header + join("trans"))
+        self.tables.mkdir(parents=True, exist_ok=True)
+        replace_text(self.tables / "cooccurrence_full.csv", header(COOC_FIELDS) + join("cooc"))
+        la_stats.write_out(la_stats._result(self.counts), self.tables)
+        return sum(self.tablets[n]["n"] for n in order)
+
+def _names(names, n=3):
+    return ", ".join(names[:n]) + (f" +{len(names) - n}" if len(names) > n else "")
+
+def process(corpus, snap, verbose=False):
+    t0 = time.perf_counter()
+    with stage("watch.update") as st:
+        changed, removed, failed = corpus.update(snap)
+        st.input(*(corpus.indir / n for n in changed)); st.rows_in = len(changed) + len(removed)
+        if not changed and not removed:
+            return
+        buf = io.StringIO()
+        try:
+            with redirect_stdout(sys.stdout if verbose else buf):
+                corpus.render(changed)
+                st.rows_out = corpus.write()
+        except Exception as e:            # keep watching; the next change retries
+            for n in changed:
+                corpus.stamps.pop(n, None)
+            print(buf.getvalue() + f"watch: update failed: {type(e).__name__}: {e}", file=sys.stderr)
+            return
+    what = "; ".join(f"{k} {_names(v)}" for k, v in (("updated", changed), ("removed", removed)) if v)
+    print(f"[{time.strftime('%H:%M:%S')}] {what} -> {len(corpus.tablets)} tablets, {st.rows_out} substituted rows "
+          f"({time.perf_counter() - t0:.2f}s)", flush=True)
+
+def watch(indir, tables, poll=0.2, debounce=0.3, once=False, verbose=False):
+    indir = Path(indir)
+    corpus = Corpus(indir, tables)
+    seen = scan(indir)
+    process(corpus, seen, verbose)
+    if once:
+        return
+    print(f"Watching {indir} (Ctrl-C to stop)", flush=True)
+    first = last = None                    # first / latest unprocessed change
+    while True:
+        time.sleep(poll)
+        snap = scan(indir)
+        now = time.monotonic()
+        if snap != seen:
+            seen, last = snap, now
+            first = first or now
+        if last and (now - last >= debounce or now - first >= 10 * debounce):
+            process(corpus, seen, verbose)
+            first = last = None
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Incrementally update derived tables and renders as tablets change in data/clean.")
+    ap.add_argument("-d","--dir", default=str(ROOT / "data" / "clean"))
+    ap.add_argument("--tables", default="out/tables", help="la_stats / co-occurrence tables")
+    ap.add_argument("--poll", type=float, default=0.2, help="seconds between directory scans")
+    ap.add_argument("--debounce", type=float, default=0.3, help="quiet seconds before a batch of changes is processed")
+    ap.add_argument("--once", action="store_true", help="build once from the current files and exit")
+    ap.add_argument("-v","--verbose", action="store_true", help="show the output of every writer")
+    a = ap.parse_args()
+    try:
+        watch(a.dir, a.tables, a.poll, a.debounce, a.once, a.verbose)
+    except KeyboardInterrupt:
+        print("Stopped.")
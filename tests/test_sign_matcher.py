@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from sign_matcher import SignMatcher
+from mask_and_recount import affix_matcher, strip_suffix_prefix
+
+def ends(m, tokens):
+    return sorted((x.start, x.end, x.pattern) for x in m.iter_matches(tokens))
+
+def test_add_after_match_does_not_duplicate():
+    tokens = "AB81 AB02 AB22 AB67 5".split()
+    m = SignMatcher().add("AB22 AB67", "unit").add("AB67", "sign")
+    assert ends(m, tokens) == [(2, 4, ("AB22", "AB67")), (3, 4, ("AB67",))]
+    m.add("AB81 AB02", "stem")
+    assert ends(m, tokens) == [(0, 2, ("AB81", "AB02")), (2, 4, ("AB22", "AB67")), (3, 4, ("AB67",))]
+    m.add("AB02 AB22 AB67", "stem")
+    assert ends(m, tokens) == [(0, 2, ("AB81", "AB02")), (1, 4, ("AB02", "AB22", "AB67")),
+                               (2, 4, ("AB22", "AB67")), (3, 4, ("AB67",))]
+    m.build()
+    assert len(list(m.iter_matches(tokens))) == 4
+
+def test_prefix_that_overlaps_the_suffix_falls_back_to_a_shorter_one():
+    m = affix_matcher(["AB22 AB67"], ["AB54", "AB54 AB01 AB22"])
+    assert strip_suffix_prefix("AB54 AB01 AB22 AB67".split(), m) == ["AB01"]
+    assert strip_suffix_prefix("AB54 AB01 AB22 AB09".split(), m) == ["AB09"]